@@ -1,15 +1,10 @@
-import streamlit as st
-import pandas as pd
+from datetime import date, timedelta
 from pathlib import Path
 
-from circadia.storage import DuckDBStorage
-from circadia.features import (
-    calculate_sleep_score,
-    calculate_activity_score,
-    calculate_recovery_score,
-)
-from circadia.features.composite import get_readiness_status
+import pandas as pd
+import streamlit as st
 
+from circadia.dashboard import SNAPSHOT_METRICS, DashboardData
 
 st.set_page_config(page_title="Circadia Dashboard", layout="wide")
 
@@ -17,84 +12,86 @@ st.title("🌙 Circadia - Health Metrics Dashboard")
 
 DB_PATH = Path("./data/circadia.duckdb")
 
+SLEEP_COLUMNS = [
+    "total_minutes_asleep",
+    "total_minutes_in_bed",
+    "efficiency",
+    "minutes_deep",
+    "minutes_rem",
+    "minutes_light",
+    "minutes_awake",
+    "sleep_score",
+]
+ACTIVITY_COLUMNS = ["steps", "calories", "distance", "active_minutes_total", "activity_score"]
+RHR_COLUMNS = ["resting_hr", "recovery_score"]
+HRV_COLUMNS = ["hrv_rmssd", "hrv_deep"]
+
 if not DB_PATH.exists():
     st.error("No database found. Run the pipeline first!")
     st.stop()
 
-storage = DuckDBStorage(DB_PATH)
+
+@st.cache_resource
+def get_data() -> DashboardData:
+    # One read-only connection and result cache shared by every session and rerun.
+    return DashboardData(DB_PATH)
+
+
+data = get_data()
+
+snapshot = data.snapshot()
+devices = snapshot["device"].unique().tolist()
 
 st.sidebar.header("Date Range")
 days = st.sidebar.slider("Days to display", 7, 90, 30)
+device = st.sidebar.selectbox("Device", devices) if len(devices) > 1 else None
 
-query = f"""
-SELECT * FROM sleep_summary
-ORDER BY date DESC
-LIMIT {days}
-"""
-sleep_df = storage.execute(query).df()
-
-query = f"""
-SELECT * FROM daily_summary
-ORDER BY date DESC
-LIMIT {days}
-"""
-activity_df = storage.execute(query).df()
-
-query = f"""
-SELECT * FROM resting_hr
-ORDER BY date DESC
-LIMIT {days}
-"""
-rhr_df = storage.execute(query).df()
-
-query = f"""
-SELECT * FROM hrv
-ORDER BY date DESC
-LIMIT {days}
-"""
-hrv_df = storage.execute(query).df()
+daily = data.daily(days, device)
 
 st.header("📊 Today's Scores")
 
-col1, col2, col3, col4 = st.columns(4)
-
-if not sleep_df.empty:
-    latest_sleep = sleep_df.iloc[0]
-    sleep_score = calculate_sleep_score(
-        type(
-            "obj",
-            (),
-            {
-                "total_minutes_asleep": latest_sleep.get("minutes_asleep", 0),
-                "total_minutes_in_bed": latest_sleep.get("minutes_in_bed", 0),
-                "efficiency": latest_sleep.get("efficiency", 0),
-                "minutes_light": latest_sleep.get("minutes_light", 0),
-                "minutes_rem": latest_sleep.get("minutes_rem", 0),
-                "minutes_deep": latest_sleep.get("minutes_deep", 0),
-                "minutes_to_fall_asleep": latest_sleep.get("minutes_to_fall_asleep", 0),
-                "waso": latest_sleep.get("minutes_after_wakeup", 0),
-            },
-        )()
+if snapshot.empty:
+    st.info("No scores yet. Run the pipeline to compute them.")
+else:
+    metrics = (
+        snapshot[snapshot["device"] == (device or devices[0])]
+        .set_index("metric")
+        .reindex(SNAPSHOT_METRICS)
     )
-    col1.metric("Sleep Score", f"{sleep_score:.0f}/100")
+
+    def latest(metric: str, spec: str = ".0f") -> str:
+        value = metrics.at[metric, "latest"]
+        return "N/A" if pd.isna(value) else format(value, spec)
+
+    def trend(metric: str) -> str | None:
+        value = metrics.at[metric, "trend"]
+        return None if pd.isna(value) else f"{value:+.1f} vs 30-day mean"
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    col1.metric("Sleep Score", f"{latest('sleep_score')}/100", trend("sleep_score"))
     col1.caption(
-        f"Duration: {latest_sleep.get('minutes_asleep', 0)}min | Efficiency: {latest_sleep.get('efficiency', 0)}%"
+        f"Duration: {latest('total_minutes_asleep')}min | Efficiency: {latest('efficiency')}%"
     )
 
-if not activity_df.empty:
-    latest_activity = activity_df.iloc[0]
-    activity_score = latest_activity.get("steps", 0) / 100
-    activity_score = min(activity_score, 100)
-    col2.metric("Activity", f"{latest_activity.get('steps', 0):,} steps")
-    col2.caption(f"Calories: {latest_activity.get('calories', 0):.0f}")
+    col2.metric("Activity Score", f"{latest('activity_score')}/100", trend("activity_score"))
+    col2.caption(f"Steps: {latest('steps', ',.0f')} | Calories: {latest('calories')}")
 
-if not rhr_df.empty:
-    latest_rhr = rhr_df.iloc[0]
-    col3.metric("Resting HR", f"{latest_rhr.get('value', 'N/A')} bpm")
+    col3.metric("Recovery Score", f"{latest('recovery_score')}/100", trend("recovery_score"))
+    status = metrics.at["recovery_score", "status"]
+    col3.caption(f"Readiness: {'N/A' if pd.isna(status) else status}")
 
-if not hrv_df.empty:
-    latest_hrv = hrv_df.iloc[0]
-    col4.metric("HRV (RMSSD)", f"{latest_hrv.get('daily_rmssd', 'N/A')}")
+    col4.metric(
+        "Resting HR", f"{latest('resting_hr')} bpm", trend("resting_hr"), delta_color="inverse"
+    )
+
+    col5.metric("HRV (RMSSD)", latest("hrv_rmssd", ".1f"), trend("hrv_rmssd"))
+
+    with st.expander("7/30/90-day averages"):
+        st.dataframe(
+            metrics[["latest", "latest_date", "mean_7d", "mean_30d", "mean_90d", "trend"]],
+            use_container_width=True,
+        )
 
 st.divider()
 
@@ -102,46 +99,58 @@ st.header("📈 Trends")
 
 tab1, tab2, tab3 = st.tabs(["Sleep", "Activity", "Recovery"])
 
+trends = daily.set_index("date")
+
 with tab1:
-    if not sleep_df.empty:
-        sleep_df = sleep_df.sort_values("date")
+    if trends["total_minutes_asleep"].notna().any():
         st.line_chart(
-            sleep_df.set_index("date")[
-                ["minutes_asleep", "minutes_deep", "minutes_rem", "minutes_light"]
-            ]
+            trends[["total_minutes_asleep", "minutes_deep", "minutes_rem", "minutes_light"]]
         )
         st.caption("Minutes: Total asleep (blue), Deep (green), REM (orange), Light (red)")
     else:
         st.info("No sleep data available")
 
 with tab2:
-    if not activity_df.empty:
-        activity_df = activity_df.sort_values("date")
-        st.line_chart(activity_df.set_index("date")[["steps"]])
+    if trends["steps"].notna().any():
+        st.line_chart(trends[["steps"]])
     else:
         st.info("No activity data available")
 
 with tab3:
-    if not rhr_df.empty:
-        rhr_df = rhr_df.sort_values("date")
-        st.line_chart(rhr_df.set_index("date")[["value"]])
+    if trends["resting_hr"].notna().any():
+        st.line_chart(trends[["resting_hr"]])
     else:
         st.info("No recovery data available")
 
 st.divider()
 
-st.header("📋 Raw Data")
+st.header("💓 Intraday Heart Rate")
 
-tab_sleep, tab_activity, tab_rhr, tab_hrv = st.tabs(["Sleep", "Activity", "RHR", "HRV"])
+last_day = daily["date"].max() if not daily.empty else date.today()
+window = st.date_input("Window", value=(last_day, last_day))
+
+# The picker returns a single date until both ends of the range are chosen.
+if len(window) == 2:
+    start, end = window
+    heart_rate = data.heart_rate(start, end + timedelta(days=1))
+    if not heart_rate.empty:
+        st.line_chart(heart_rate.set_index("timestamp")[["value"]])
+        st.caption(f"{len(heart_rate):,} points, per-bucket minimum and maximum")
+    else:
+        st.info("No intraday heart rate for this window")
 
-with tab_sleep:
-    st.dataframe(sleep_df, use_container_width=True)
+st.divider()
 
-with tab_activity:
-    st.dataframe(activity_df, use_container_width=True)
+st.header("📋 Raw Data")
 
-with tab_rhr:
-    st.dataframe(rhr_df, use_container_width=True)
+tab_sleep, tab_activity, tab_rhr, tab_hrv = st.tabs(["Sleep", "Activity", "RHR", "HRV"])
 
-with tab_hrv:
-    st.dataframe(hrv_df, use_container_width=True)
+for tab, columns in [
+    (tab_sleep, SLEEP_COLUMNS),
+    (tab_activity, ACTIVITY_COLUMNS),
+    (tab_rhr, RHR_COLUMNS),
+    (tab_hrv, HRV_COLUMNS),
+]:
+    with tab:
+        rows = daily[["date", "device", *columns]].dropna(subset=columns, how="all")
+        st.dataframe(rows.iloc[::-1], use_container_width=True)
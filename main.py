@@ -4,8 +4,10 @@ from pathlib import Path
 
 from circadia.config import get_config
 from circadia.fitbit import FitbitAuth, FitbitClient
+from circadia.ml import IncrementalTrainer, ModelRegistry
 from circadia.pipeline import Pipeline, Scheduler
 from circadia.storage import DuckDBStorage
+from circadia.telemetry import PROFILER, REGISTRY
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,8 +26,20 @@ def main() -> None:
         logging.info("Copy .env.example to .env and fill in your Fitbit OAuth credentials")
         return
 
+    if config.profiling.modes:
+        PROFILER.configure(config.profiling.modes, config.profiling.path, config.profiling.top)
+
+    if config.metrics.port is not None:
+        REGISTRY.serve(config.metrics.port, config.metrics.host)
+    if config.metrics.path is not None:
+        REGISTRY.write_periodically(config.metrics.path, config.metrics.interval_seconds)
+
     db_path = config.database.path
-    storage = DuckDBStorage(db_path)
+    storage = DuckDBStorage(
+        db_path,
+        cache_max_entries=config.database.query_cache_max_entries,
+        cache_max_bytes=config.database.query_cache_max_bytes,
+    )
     storage.init_schema()
     logging.info(f"Database initialized at {db_path}")
 
@@ -67,7 +81,15 @@ def main() -> None:
         pipeline.run_daily(days_back=config.scheduling.auto_date_range_days)
 
     logging.info("Starting scheduled updates...")
-    scheduler = Scheduler(pipeline, timezone)
+    model_updater = None
+    if config.models.auto_update:
+        model_updater = IncrementalTrainer(
+            storage,
+            ModelRegistry(config.models.registry_path),
+            full_refit_days=config.models.full_refit_days,
+            refit_window_days=config.models.refit_window_days,
+        )
+    scheduler = Scheduler(pipeline, timezone, model_updater)
     scheduler.run()
 
 
@@ -1,41 +1,67 @@
 from pathlib import Path
-from typing import Optional
 
-from pydantic import BaseModel, Field
-from pydantic_settings import BaseSettings
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-class FitbitConfig(BaseModel):
+class _EnvSettings(BaseSettings):
+    """Settings read from the environment and .env under each field's alias."""
+
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+
+class FitbitConfig(_EnvSettings):
     client_id: str = Field(default="", alias="FITBIT_CLIENT_ID")
     client_secret: str = Field(default="", alias="FITBIT_CLIENT_SECRET")
-    refresh_token: Optional[str] = Field(default=None, alias="FITBIT_REFRESH_TOKEN")
-    access_token: Optional[str] = None
+    refresh_token: str | None = Field(default=None, alias="FITBIT_REFRESH_TOKEN")
+    access_token: str | None = None
     device_name: str = Field(default="Charge 6", alias="FITBIT_DEVICE_NAME")
 
 
-class DatabaseConfig(BaseModel):
+class DatabaseConfig(_EnvSettings):
     path: Path = Field(default=Path("./data/circadia.duckdb"), alias="DUCKDB_PATH")
+    query_cache_max_entries: int = Field(default=256, alias="QUERY_CACHE_MAX_ENTRIES")
+    query_cache_max_bytes: int = Field(default=256 * 1024 * 1024, alias="QUERY_CACHE_MAX_BYTES")
+
+
+class ModelConfig(_EnvSettings):
+    registry_path: Path = Field(default=Path("./data/models"), alias="MODEL_REGISTRY_PATH")
+    auto_update: bool = Field(default=False, alias="MODEL_AUTO_UPDATE")
+    full_refit_days: int = Field(default=30, alias="MODEL_FULL_REFIT_DAYS")
+    refit_window_days: int = Field(default=365, alias="MODEL_REFIT_WINDOW_DAYS")
 
 
-class SchedulingConfig(BaseModel):
+class SchedulingConfig(_EnvSettings):
     backfill: bool = Field(default=False, alias="BACKFILL")
     auto_date_range_days: int = Field(default=1, alias="AUTO_DATE_RANGE_DAYS")
-    manual_start_date: Optional[str] = Field(default=None, alias="MANUAL_START_DATE")
-    manual_end_date: Optional[str] = Field(default=None, alias="MANUAL_END_DATE")
+    manual_start_date: str | None = Field(default=None, alias="MANUAL_START_DATE")
+    manual_end_date: str | None = Field(default=None, alias="MANUAL_END_DATE")
 
 
-class Config(BaseSettings):
+class MetricsConfig(_EnvSettings):
+    port: int | None = Field(default=None, alias="METRICS_PORT")
+    host: str = Field(default="127.0.0.1", alias="METRICS_HOST")
+    # For the node_exporter textfile collector.
+    path: Path | None = Field(default=None, alias="METRICS_PATH")
+    interval_seconds: float = Field(default=15.0, alias="METRICS_INTERVAL_SECONDS")
+
+
+class ProfilingConfig(_EnvSettings):
+    # "cpu", "memory", "cpu,memory" or "all"; unset disables profiling.
+    modes: str | None = Field(default=None, alias="CIRCADIA_PROFILE")
+    path: Path = Field(default=Path("./data/profiles"), alias="CIRCADIA_PROFILE_DIR")
+    top: int = Field(default=30, alias="CIRCADIA_PROFILE_TOP")
+
+
+class Config(_EnvSettings):
     fitbit: FitbitConfig = Field(default_factory=FitbitConfig)
     database: DatabaseConfig = Field(default_factory=DatabaseConfig)
     scheduling: SchedulingConfig = Field(default_factory=SchedulingConfig)
+    models: ModelConfig = Field(default_factory=ModelConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    profiling: ProfilingConfig = Field(default_factory=ProfilingConfig)
     timezone: str = Field(default="Automatic", alias="LOCAL_TIMEZONE")
 
-    model_config = {
-        "env_file": ".env",
-        "env_file_encoding": "utf-8",
-        "extra": "ignore",
-    }
-
 
 def get_config() -> Config:
     return Config()
@@ -0,0 +1,9 @@
+from .data import DashboardData
+from .snapshot import SNAPSHOT_METRICS, SNAPSHOT_WINDOWS, refresh_dashboard_snapshot
+
+__all__ = [
+    "SNAPSHOT_METRICS",
+    "SNAPSHOT_WINDOWS",
+    "DashboardData",
+    "refresh_dashboard_snapshot",
+]
@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from collections.abc import Callable
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from ..features.batch import DAILY_FEATURES_QUERY
+from ..storage import DuckDBStorage, HeartRateRollup
+from ..storage.rollup import DEFAULT_MAX_POINTS
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size) of the database file and its WAL, None for a missing file.
+FileState = tuple[tuple[int, int] | None, ...]
+
+# Daily metrics joined with the scores refresh_daily_features stores at ingest.
+DAILY_VIEW_QUERY = f"""
+SELECT
+    d.*,
+    f.sleep_score,
+    f.recovery_score,
+    f.activity_score,
+    f.health_score
+FROM ({DAILY_FEATURES_QUERY}) d
+LEFT JOIN daily_features f ON f.date = d.date AND f.device = d.device
+"""
+
+
+class DashboardData:
+    """
+    Read side of the Streamlit dashboard.
+
+    One read-only storage is shared by every session, and each view is a
+    single query that goes through its result cache, keyed on the data
+    versions of the tables it reads. Widget reruns are then served from
+    memory until the pipeline ingests something. The database file is
+    checked at most every refresh_seconds and the versions re-read when it
+    has changed.
+
+    DuckDB lets one process write or several read a file, not both. The
+    connection is only held while a view or the versions are being read, so
+    a short-lived writer can run between reruns, but main.py keeps its
+    read-write connection open for as long as the scheduler runs: while it
+    does, views that miss the cache fail to open the file.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        refresh_seconds: float = 5.0,
+        cache_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.storage = DuckDBStorage(db_path, cache_max_bytes=cache_max_bytes, read_only=True)
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._file_state: FileState | None = None
+        self._checked = float("-inf")
+
+    def _current_file_state(self) -> FileState:
+        path = self.storage.db_path
+        state: list[tuple[int, int] | None] = []
+        for candidate in (path, path.with_name(path.name + ".wal")):
+            try:
+                stat = candidate.stat()
+                state.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                state.append(None)
+        return tuple(state)
+
+    def _check_for_updates(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.refresh_seconds:
+            return
+        self._checked = now
+        state = self._current_file_state()
+        if state != self._file_state:
+            if self._file_state is not None:
+                logger.info("Database changed on disk, reopening")
+            self._file_state = state
+            self.storage.reload_versions()
+
+    def _read(self, view: Callable[[], Any]) -> pd.DataFrame:
+        with self._lock:
+            try:
+                self._check_for_updates()
+                frame: pd.DataFrame = view().to_pandas()
+                return frame
+            finally:
+                # Cache hits never open it; misses release it for writers.
+                self.storage.close()
+
+    def _view(self, query: str, params: list[Any]) -> pd.DataFrame:
+        return self._read(lambda: self.storage.query(query, params))
+
+    def daily(self, days: int = 30, device: str | None = None) -> pd.DataFrame:
+        """
+        One row per date (and device) for the last days days with data, oldest
+        first: sleep, activity, heart rate, HRV, SpO2 and the daily scores.
+        """
+        params: list[Any] = []
+        where = ""
+        if device:
+            where = "WHERE device = ?"
+            params.append(device)
+        params.append(days)
+        query = f"""
+        SELECT * FROM ({DAILY_VIEW_QUERY})
+        {where}
+        QUALIFY date > max(date) OVER () - CAST(? AS INTEGER)
+        ORDER BY date, device
+        """
+        return self._view(query, params)
+
+    def snapshot(self, device: str | None = None) -> pd.DataFrame:
+        """dashboard_snapshot rows: latest value, status and trailing means per metric."""
+        params: list[Any] = [device] if device else []
+        where = "WHERE device = ?" if device else ""
+        return self._view(
+            f"SELECT * FROM dashboard_snapshot {where} ORDER BY device, metric", params
+        )
+
+    def heart_rate(
+        self,
+        start: str | date | datetime,
+        end: str | date | datetime,
+        device: str | None = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+    ) -> pd.DataFrame:
+        """Intraday heart rate over [start, end), min/max downsampled to at most max_points."""
+        rollup = HeartRateRollup(self.storage)
+        return self._read(lambda: rollup.downsample(start, end, device, max_points))
+
+    def close(self) -> None:
+        with self._lock:
+            self.storage.close()
+            self._file_state = None
+            self._checked = float("-inf")
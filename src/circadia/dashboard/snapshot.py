@@ -0,0 +1,105 @@
+import logging
+from datetime import datetime
+from typing import Any
+
+from ..features.sql import install_scoring_macros
+from ..storage import DuckDBStorage
+from .data import DAILY_VIEW_QUERY
+
+logger = logging.getLogger(__name__)
+
+SCORE_METRICS = ("sleep_score", "recovery_score", "activity_score", "health_score")
+SNAPSHOT_METRICS = (
+    *SCORE_METRICS,
+    "total_minutes_asleep",
+    "efficiency",
+    "steps",
+    "calories",
+    "active_minutes_total",
+    "resting_hr",
+    "hrv_rmssd",
+    "spo2_avg",
+    "breathing_rate",
+)
+# Trailing windows of the mean_*d columns, ending on each device's latest day.
+SNAPSHOT_WINDOWS = (7, 30, 90)
+
+
+def refresh_dashboard_snapshot(storage: DuckDBStorage, device: str | None = None) -> int:
+    """
+    Rewrite dashboard_snapshot for one device, or every device.
+
+    Each row holds one metric's latest value and date, its readiness status
+    for scores, trailing means over SNAPSHOT_WINDOWS and trend (7-day mean
+    minus 30-day mean). Windows end on the device's most recent day with
+    data, and values older than the longest window are left out, so the
+    table stays at a few rows per device. Returns the number of rows written.
+    """
+    install_scoring_macros(storage)
+    longest = max(SNAPSHOT_WINDOWS)
+    params: list[Any] = [device] if device else []
+    where = "WHERE device = ?" if device else ""
+
+    metrics = ", ".join(f"CAST({metric} AS DOUBLE) AS {metric}" for metric in SNAPSHOT_METRICS)
+    means = ", ".join(
+        f"avg(value) FILTER (WHERE date > as_of - {window}) AS mean_{window}d"
+        for window in SNAPSHOT_WINDOWS
+    )
+    scores = ", ".join(f"'{metric}'" for metric in SCORE_METRICS)
+
+    conn = storage.conn
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(f"DELETE FROM dashboard_snapshot {where}", params)
+        inserted = conn.execute(
+            f"""
+            INSERT INTO dashboard_snapshot (
+                device, metric, as_of, latest_date, latest, status,
+                {", ".join(f"mean_{window}d" for window in SNAPSHOT_WINDOWS)},
+                trend, updated_at
+            )
+            WITH recent AS (
+                SELECT date, device, max(date) OVER (PARTITION BY device) AS as_of, {metrics}
+                FROM ({DAILY_VIEW_QUERY})
+                {where}
+                QUALIFY date > as_of - CAST(? AS INTEGER)
+            ),
+            values AS (
+                UNPIVOT recent
+                ON {", ".join(SNAPSHOT_METRICS)}
+                INTO NAME metric VALUE value
+            ),
+            summary AS (
+                SELECT
+                    device,
+                    metric,
+                    any_value(as_of) AS as_of,
+                    max(date) AS latest_date,
+                    arg_max(value, date) AS latest,
+                    {means}
+                FROM values
+                GROUP BY device, metric
+            )
+            SELECT
+                device,
+                metric,
+                as_of,
+                latest_date,
+                latest,
+                CASE WHEN metric IN ({scores}) THEN readiness_status(latest) END,
+                {", ".join(f"mean_{window}d" for window in SNAPSHOT_WINDOWS)},
+                mean_7d - mean_30d,
+                ?
+            FROM summary
+            """,
+            [*params, longest, datetime.now()],
+        ).fetchone()
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    rows = int(inserted[0]) if inserted else 0
+    storage.bump_version("dashboard_snapshot")
+    logger.info(f"Refreshed {rows} dashboard snapshot rows")
+    return rows
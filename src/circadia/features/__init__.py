@@ -1,21 +1,76 @@
-from .sleep import SleepFeatures, calculate_sleep_score
 from .activity import ActivityFeatures, calculate_activity_score
+from .anomaly import DETECTORS, AnomalyDetector, DetectorSpec, DetectorState
+from .baseline import BaselineState, BaselineStore
+from .batch import FeatureBatch, FeatureRow
+from .cardio import (
+    IntradayHeartRateFeatures,
+    compute_intraday_hr_features,
+    iter_intraday_hr_features,
+    refresh_intraday_hr_features,
+)
 from .composite import (
     RecoveryFeatures,
-    extract_recovery_features,
-    calculate_recovery_score,
     calculate_health_score,
+    calculate_recovery_score,
+    extract_recovery_features,
     get_readiness_status,
 )
+from .graph import DEFAULT_GRAPH, FeatureGraph, FeatureNode, evaluate_features
+from .lagged import LAG_METRICS, LaggedFeatures, LagSpec
+from .sleep import (
+    SleepFeatures,
+    SleepRegularityTracker,
+    calculate_sleep_regularity,
+    calculate_sleep_regularity_index,
+    calculate_sleep_score,
+    refresh_sleep_regularity,
+)
+from .store import FeatureStore
+from .vectorized import (
+    calculate_activity_score_batch,
+    calculate_health_score_batch,
+    calculate_recovery_score_batch,
+    calculate_scores_batch,
+    calculate_sleep_score_batch,
+)
 
 __all__ = [
-    "SleepFeatures",
-    "calculate_sleep_score",
+    "DEFAULT_GRAPH",
+    "DETECTORS",
+    "LAG_METRICS",
     "ActivityFeatures",
-    "calculate_activity_score",
+    "AnomalyDetector",
+    "BaselineState",
+    "BaselineStore",
+    "DetectorSpec",
+    "DetectorState",
+    "FeatureBatch",
+    "FeatureGraph",
+    "FeatureNode",
+    "FeatureRow",
+    "FeatureStore",
+    "IntradayHeartRateFeatures",
+    "LagSpec",
+    "LaggedFeatures",
     "RecoveryFeatures",
-    "extract_recovery_features",
-    "calculate_recovery_score",
+    "SleepFeatures",
+    "SleepRegularityTracker",
+    "calculate_activity_score",
+    "calculate_activity_score_batch",
     "calculate_health_score",
+    "calculate_health_score_batch",
+    "calculate_recovery_score",
+    "calculate_recovery_score_batch",
+    "calculate_scores_batch",
+    "calculate_sleep_regularity",
+    "calculate_sleep_regularity_index",
+    "calculate_sleep_score",
+    "calculate_sleep_score_batch",
+    "compute_intraday_hr_features",
+    "evaluate_features",
+    "extract_recovery_features",
     "get_readiness_status",
+    "iter_intraday_hr_features",
+    "refresh_intraday_hr_features",
+    "refresh_sleep_regularity",
 ]
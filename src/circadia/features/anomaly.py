@@ -0,0 +1,330 @@
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ..storage import DuckDBStorage
+from ..telemetry import profiled
+from .baseline import BaselineStore
+
+logger = logging.getLogger(__name__)
+
+ALERT_COLUMNS = [
+    "timestamp",
+    "device",
+    "metric",
+    "direction",
+    "value",
+    "expected",
+    "zscore",
+    "score",
+    "created_at",
+]
+
+
+@dataclass(frozen=True)
+class DetectorSpec:
+    metric: str
+    # Daily baseline (see BASELINE_METRICS) seeding the reference level for a new device.
+    baseline: str | None
+    # Which deviations are concerning: "high", "low" or "both".
+    direction: str
+    halflife: timedelta
+    # CUSUM allowance in standard deviations, and the decision threshold in
+    # standard-deviation minutes, so both are independent of the sampling rate.
+    slack: float
+    threshold: float
+    # Floor on the standard deviation so a flat signal doesn't alert on small steps.
+    min_std: float
+    warmup: int = 30
+    # Longer gaps (off-wrist, charging) restart the CUSUM sums.
+    max_gap: timedelta = timedelta(minutes=15)
+    cooldown: timedelta = timedelta(minutes=30)
+    # Intraday steps per minute from which the person counts as active. Samples
+    # from an active minute until activity_recovery after it are not scored and
+    # do not move the level, so exercise is neither an alert nor the new normal.
+    active_steps: int | None = None
+    activity_recovery: timedelta = timedelta(minutes=10)
+
+
+DETECTORS = {
+    "heart_rate": DetectorSpec(
+        "heart_rate",
+        baseline="resting_hr",
+        direction="high",
+        halflife=timedelta(hours=2),
+        slack=2.0,
+        threshold=20.0,
+        min_std=5.0,
+        active_steps=60,
+    ),
+    "spo2": DetectorSpec(
+        "spo2",
+        baseline="spo2_avg",
+        direction="low",
+        halflife=timedelta(hours=6),
+        slack=1.5,
+        threshold=10.0,
+        min_std=1.0,
+    ),
+}
+
+
+@dataclass
+class DetectorState:
+    metric: str
+    device: str
+    count: int = 0
+    level: float | None = None
+    variance: float = 0.0
+    cusum_high: float = 0.0
+    cusum_low: float = 0.0
+    last_timestamp: datetime | None = None
+    last_alert: datetime | None = None
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(value: datetime | None) -> float | None:
+    return None if value is None else (value - _EPOCH).total_seconds()
+
+
+def _datetime(seconds: float) -> datetime:
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+class AnomalyDetector:
+    """
+    Online EWMA/CUSUM detector for intraday samples, fed as they are ingested.
+
+    Each (metric, device) keeps an exponentially weighted level and variance,
+    seeded from the person's daily baseline, and two CUSUM sums of how far
+    samples run above or below that level. An alert is written once a sum
+    crosses the threshold. Work per sample is O(1), state is a handful of
+    floats per device persisted in detector_state, and samples at or before
+    the last one seen are skipped, so refetched days never re-alert and
+    history is never re-read. For specs with active_steps, samples taken
+    while steps_intraday shows the person moving are skipped as well.
+    """
+
+    def __init__(
+        self,
+        storage: DuckDBStorage,
+        specs: dict[str, DetectorSpec] | None = None,
+    ):
+        self.storage = storage
+        self.specs = specs or DETECTORS
+        self._states: dict[tuple[str, str], DetectorState] = {}
+
+    def state(self, metric: str, device: str) -> DetectorState:
+        key = (metric, device)
+        if key not in self._states:
+            self._states[key] = self._load(self.specs[metric], device)
+        return self._states[key]
+
+    def _load(self, spec: DetectorSpec, device: str) -> DetectorState:
+        row = self.storage.execute(
+            """
+            SELECT count, level, variance, cusum_high, cusum_low, last_timestamp, last_alert
+            FROM detector_state WHERE metric = ? AND device = ?
+            """,
+            [spec.metric, device],
+        ).fetchone()
+        if row is not None:
+            return DetectorState(spec.metric, device, *row)
+
+        state = DetectorState(spec.metric, device)
+        if spec.baseline:
+            baseline = BaselineStore(self.storage).get(spec.baseline, device)
+            if baseline.ewma is not None:
+                state.level = baseline.ewma
+                state.variance = baseline.ewm_var
+                state.count = spec.warmup
+        return state
+
+    def _save(self, state: DetectorState) -> None:
+        self.storage.execute(
+            "INSERT OR REPLACE INTO detector_state VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                state.metric,
+                state.device,
+                state.count,
+                state.level,
+                state.variance,
+                state.cusum_high,
+                state.cusum_low,
+                state.last_timestamp,
+                state.last_alert,
+                datetime.now(),
+            ],
+        )
+
+    @profiled("features.anomaly")
+    def observe(self, metric: str, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Feed newly ingested timestamp/device/value rows and write any alerts.
+
+        Returns the alerts raised, in the alerts table's column layout.
+        """
+        spec = self.specs[metric]
+        alerts: list[dict[str, Any]] = []
+        for device, group in rows.groupby("device", sort=False):
+            state = self.state(metric, str(device))
+            timestamps = group["timestamp"].to_numpy(dtype="datetime64[us]")
+            values = group["value"].to_numpy(dtype=np.float64, na_value=np.nan)
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, values = timestamps[order], values[order]
+
+            keep = ~np.isnan(values)
+            if state.last_timestamp is not None:
+                keep &= timestamps > np.datetime64(state.last_timestamp, "us")
+            if not keep.any():
+                continue
+
+            timestamps = timestamps[keep]
+            active = self._active(spec, str(device), timestamps)
+            seconds = timestamps.astype(np.int64) / 1e6
+            alerts.extend(
+                self._run(spec, state, seconds.tolist(), values[keep].tolist(), active.tolist())
+            )
+            self._save(state)
+
+        frame = pd.DataFrame(alerts, columns=ALERT_COLUMNS)
+        if len(frame):
+            self.storage.upsert("alerts", frame)
+            logger.warning(f"Raised {len(frame)} {metric} alerts")
+        return frame
+
+    def _active(self, spec: DetectorSpec, device: str, timestamps: np.ndarray) -> np.ndarray:
+        """Whether each sample falls in an active minute or its recovery period."""
+        if spec.active_steps is None:
+            return np.zeros(len(timestamps), dtype=bool)
+        recovery = np.timedelta64(int(spec.activity_recovery.total_seconds()), "s")
+        minute = np.timedelta64(60, "s")
+        rows = self.storage.execute(
+            """
+            SELECT timestamp FROM steps_intraday
+            WHERE device = ? AND value >= ? AND timestamp BETWEEN ? AND ?
+            ORDER BY timestamp
+            """,
+            [
+                device,
+                spec.active_steps,
+                (timestamps[0] - minute - recovery).item(),
+                timestamps[-1].item(),
+            ],
+        ).fetchnumpy()
+        starts = np.asarray(rows["timestamp"], dtype="datetime64[us]")
+        if not len(starts):
+            return np.zeros(len(timestamps), dtype=bool)
+        # The latest active minute starting at or before each sample.
+        latest = np.searchsorted(starts, timestamps, side="right") - 1
+        return (latest >= 0) & (timestamps < starts[np.maximum(latest, 0)] + minute + recovery)
+
+    def _run(
+        self,
+        spec: DetectorSpec,
+        state: DetectorState,
+        seconds: list[float],
+        values: list[float],
+        active: list[bool],
+    ) -> list[dict[str, Any]]:
+        decay = math.log(2) / spec.halflife.total_seconds()
+        max_gap = spec.max_gap.total_seconds()
+        cooldown = spec.cooldown.total_seconds()
+        check_high = spec.direction in ("high", "both")
+        check_low = spec.direction in ("low", "both")
+
+        previous = _seconds(state.last_timestamp)
+        last_alert = _seconds(state.last_alert)
+        level, variance = state.level, state.variance
+        count, high, low = state.count, state.cusum_high, state.cusum_low
+        alerts = []
+
+        for t, x, moving in zip(seconds, values, active):
+            dt = t - previous if previous is not None else math.inf
+            previous = t
+            if moving:
+                high = low = 0.0
+                continue
+            if level is None:
+                level, variance, count = x, 0.0, 1
+                continue
+
+            if dt > max_gap:
+                high = low = 0.0
+            elif count >= spec.warmup:
+                std = max(math.sqrt(variance), spec.min_std)
+                z = (x - level) / std
+                minutes = dt / 60
+                high = max(0.0, high + (z - spec.slack) * minutes)
+                low = max(0.0, low + (-z - spec.slack) * minutes)
+
+                for direction, enabled, score in (
+                    ("high", check_high, high),
+                    ("low", check_low, low),
+                ):
+                    if not enabled or score <= spec.threshold:
+                        continue
+                    if last_alert is None or t - last_alert >= cooldown:
+                        alerts.append(
+                            {
+                                "timestamp": _datetime(t),
+                                "device": state.device,
+                                "metric": spec.metric,
+                                "direction": direction,
+                                "value": x,
+                                "expected": level,
+                                "zscore": z,
+                                "score": score,
+                                "created_at": datetime.now(),
+                            }
+                        )
+                        last_alert = t
+                    if direction == "high":
+                        high = 0.0
+                    else:
+                        low = 0.0
+
+            # Irregular sampling: weight each sample by the time since the last
+            # one, capped so a gap doesn't wipe out the level learned before it.
+            alpha = 1.0 - math.exp(-decay * min(dt, max_gap))
+            diff = x - level
+            increment = alpha * diff
+            level += increment
+            variance = (1 - alpha) * (variance + diff * increment)
+            count += 1
+
+        state.level, state.variance, state.count = level, variance, count
+        state.cusum_high, state.cusum_low = high, low
+        state.last_timestamp = _datetime(previous) if previous is not None else None
+        state.last_alert = _datetime(last_alert) if last_alert is not None else None
+        return alerts
+
+    def alerts(
+        self,
+        start: str | None = None,
+        end: str | None = None,
+        device: str | None = None,
+    ) -> pd.DataFrame:
+        conditions = []
+        params: list[Any] = []
+        if start:
+            conditions.append("timestamp >= CAST(? AS TIMESTAMP)")
+            params.append(start)
+        if end:
+            conditions.append("timestamp < CAST(? AS TIMESTAMP)")
+            params.append(end)
+        if device:
+            conditions.append("device = ?")
+            params.append(device)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        alerts: pd.DataFrame = self.storage.query(
+            f"SELECT * FROM alerts {where} ORDER BY timestamp", params
+        ).to_pandas()
+        return alerts
@@ -0,0 +1,181 @@
+import logging
+import math
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any
+
+from ..storage import DuckDBStorage
+from ..telemetry import profiled
+
+logger = logging.getLogger(__name__)
+
+# metric -> (table, column) it is read from
+BASELINE_METRICS = {
+    "resting_hr": ("resting_hr", "value"),
+    "hrv_rmssd": ("hrv", "daily_rmssd"),
+    "skin_temp": ("skin_temperature", "relative_value"),
+    "breathing_rate": ("breathing_rate", "value"),
+    "spo2_avg": ("spo2", "avg"),
+}
+
+DEFAULT_HALFLIFE_DAYS = 14.0
+
+
+@dataclass
+class BaselineState:
+    metric: str
+    device: str
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    ewma: float | None = None
+    ewm_var: float = 0.0
+    last_date: date | None = None
+
+    def update(self, value: float, alpha: float) -> None:
+        """O(1) update: Welford for the all-time stats, exponential weighting for the recent ones."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.ewma is None:
+            self.ewma = value
+            self.ewm_var = 0.0
+        else:
+            diff = value - self.ewma
+            increment = alpha * diff
+            self.ewma += increment
+            self.ewm_var = (1 - alpha) * (self.ewm_var + diff * increment)
+
+    @property
+    def variance(self) -> float | None:
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def std(self) -> float | None:
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    @property
+    def ewm_std(self) -> float | None:
+        return math.sqrt(self.ewm_var) if self.count > 1 else None
+
+    def deviation(self, value: float, recent: bool = True) -> float | None:
+        center = self.ewma if recent else self.mean
+        return value - center if center is not None and self.count else None
+
+    def zscore(self, value: float, recent: bool = True) -> float | None:
+        """Standard score against the recent (EWMA) or all-time baseline."""
+        spread = self.ewm_std if recent else self.std
+        deviation = self.deviation(value, recent)
+        if deviation is None or not spread:
+            return None
+        return deviation / spread
+
+
+class BaselineStore:
+    """
+    Persisted per-person baselines for each metric and device.
+
+    New days are folded into the stored state in O(1) each, so z-scores for
+    today are available without rescanning history. Only closed days (before
+    today) are folded, since today's values keep changing until the day ends;
+    today is scored against the baseline of the days before it. Days at or
+    before a state's last_date are ignored; use rebuild() after correcting old
+    data.
+    """
+
+    def __init__(self, storage: DuckDBStorage, halflife_days: float = DEFAULT_HALFLIFE_DAYS):
+        self.storage = storage
+        self.alpha = 1 - math.exp(math.log(0.5) / halflife_days)
+
+    def get(self, metric: str, device: str) -> BaselineState:
+        row = self.storage.execute(
+            """
+            SELECT count, mean, m2, ewma, ewm_var, last_date FROM baselines
+            WHERE metric = ? AND device = ?
+            """,
+            [metric, device],
+        ).fetchone()
+        if row is None:
+            return BaselineState(metric, device)
+        count, mean, m2, ewma, ewm_var, last_date = row
+        return BaselineState(metric, device, count, mean, m2, ewma, ewm_var, last_date)
+
+    def save(self, state: BaselineState) -> None:
+        self.storage.execute(
+            "INSERT OR REPLACE INTO baselines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                state.metric,
+                state.device,
+                state.count,
+                state.mean,
+                state.m2,
+                state.ewma,
+                state.ewm_var,
+                state.last_date,
+                datetime.now(),
+            ],
+        )
+        self.storage.bump_version("baselines")
+
+    def update(
+        self, metric: str, device: str, day: date, value: float, today: date | None = None
+    ) -> BaselineState:
+        state = self.get(metric, device)
+        if day >= (today or date.today()):
+            return state
+        if state.last_date is None or day > state.last_date:
+            state.update(value, self.alpha)
+            state.last_date = day
+            self.save(state)
+        return state
+
+    def _new_values(self, state: BaselineState, today: date) -> list[tuple[date, float]]:
+        table, column = BASELINE_METRICS[state.metric]
+        query = f"""
+            SELECT date, {column} FROM {table}
+            WHERE device = ? AND {column} IS NOT NULL AND date < ?
+        """
+        params: list[Any] = [state.device, today]
+        if state.last_date is not None:
+            query += " AND date > ?"
+            params.append(state.last_date)
+        rows: list[tuple[date, float]] = self.storage.execute(
+            query + " ORDER BY date", params
+        ).fetchall()
+        return rows
+
+    @profiled("features.baseline")
+    def refresh(self, device: str, today: date | None = None) -> dict[str, BaselineState]:
+        """Fold every closed day ingested since each metric's last_date into its baseline."""
+        today = today or date.today()
+        states = {}
+        for metric in BASELINE_METRICS:
+            state = self.get(metric, device)
+            rows = self._new_values(state, today)
+            for day, value in rows:
+                state.update(float(value), self.alpha)
+                state.last_date = day
+            if rows:
+                self.save(state)
+                logger.info(f"Updated {metric} baseline with {len(rows)} new days")
+            states[metric] = state
+        return states
+
+    def rebuild(self, metric: str, device: str, today: date | None = None) -> BaselineState:
+        """Recompute a baseline from the full history of closed days."""
+        state = BaselineState(metric, device)
+        for day, value in self._new_values(state, today or date.today()):
+            state.update(float(value), self.alpha)
+            state.last_date = day
+        self.save(state)
+        return state
+
+    def zscores(self, device: str, values: dict[str, float | None]) -> dict[str, float | None]:
+        return {
+            metric: self.get(metric, device).zscore(value) if value is not None else None
+            for metric, value in values.items()
+            if metric in BASELINE_METRICS
+        }
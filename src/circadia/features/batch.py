@@ -0,0 +1,368 @@
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import fields, is_dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from ..storage import DuckDBStorage
+from .vectorized import calculate_scores_batch
+
+# One row per date/device with columns named after the SleepFeatures,
+# ActivityFeatures and RecoveryFeatures fields, so the scorers and models can
+# read a batch exactly as they would read the dataclasses.
+DAILY_FEATURES_QUERY = """
+WITH keys AS (
+    SELECT date, device FROM sleep_summary
+    UNION SELECT date, device FROM daily_summary
+    UNION SELECT date, device FROM activity_minutes
+    UNION SELECT date, device FROM resting_hr
+    UNION SELECT date, device FROM hrv
+)
+SELECT
+    k.date,
+    k.device,
+    s.minutes_asleep AS total_minutes_asleep,
+    s.minutes_in_bed AS total_minutes_in_bed,
+    s.efficiency,
+    s.minutes_light,
+    s.minutes_rem,
+    s.minutes_deep,
+    s.minutes_awake,
+    s.minutes_after_wakeup,
+    s.minutes_to_fall_asleep,
+    s.minutes_after_wakeup AS waso,
+    ds.steps,
+    ds.calories,
+    ds.distance,
+    am.minutes_sedentary,
+    am.minutes_lightly_active,
+    am.minutes_fairly_active,
+    am.minutes_very_active,
+    am.minutes_lightly_active + am.minutes_fairly_active + am.minutes_very_active
+        AS active_minutes_total,
+    z.normal_minutes AS hr_zone_normal,
+    z.fat_burn_minutes AS hr_zone_fat_burn,
+    z.cardio_minutes AS hr_zone_cardio,
+    z.peak_minutes AS hr_zone_peak,
+    coalesce(z.active_zone_minutes, 0) AS active_zone_minutes,
+    r.value AS resting_hr,
+    h.daily_rmssd AS hrv_rmssd,
+    h.deep_rmssd AS hrv_deep,
+    sp.avg AS spo2_avg,
+    b.value AS breathing_rate,
+    t.relative_value AS skin_temp_variation
+FROM keys k
+LEFT JOIN sleep_summary s ON s.date = k.date AND s.device = k.device AND s.is_main_sleep
+LEFT JOIN daily_summary ds ON ds.date = k.date AND ds.device = k.device
+LEFT JOIN activity_minutes am ON am.date = k.date AND am.device = k.device
+LEFT JOIN hr_zones z ON z.date = k.date AND z.device = k.device
+LEFT JOIN resting_hr r ON r.date = k.date AND r.device = k.device
+LEFT JOIN hrv h ON h.date = k.date AND h.device = k.device
+LEFT JOIN spo2 sp ON sp.date = k.date AND sp.device = k.device
+LEFT JOIN breathing_rate b ON b.date = k.date AND b.device = k.device
+LEFT JOIN skin_temperature t ON t.date = k.date AND t.device = k.device
+"""
+
+
+def daily_features_sql(
+    columns: Sequence[str] | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    device: str | None = None,
+    conditions: Sequence[str] = (),
+    order_by: str = "device, date",
+) -> tuple[str, list[Any]]:
+    """Query and parameters selecting columns (all by default) of DAILY_FEATURES_QUERY."""
+    conditions = list(conditions)
+    params: list[Any] = []
+    if start_date:
+        conditions.append("date >= CAST(? AS DATE)")
+        params.append(start_date)
+    if end_date:
+        conditions.append("date <= CAST(? AS DATE)")
+        params.append(end_date)
+    if device:
+        conditions.append("device = ?")
+        params.append(device)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    selected = "*" if columns is None else ", ".join(["date", "device", *columns])
+    query = f"""
+    SELECT {selected} FROM ({DAILY_FEATURES_QUERY})
+    {where}
+    ORDER BY {order_by}
+    """
+    return query, params
+
+
+class FeatureRow:
+    """
+    Read-only view of one row of a FeatureBatch.
+
+    Attribute access mirrors the feature dataclasses, so a row can be passed to
+    the scalar scorers. Missing values read as None.
+    """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "FeatureBatch", index: int):
+        self._batch = batch
+        self._index = index
+
+    def __getattr__(self, name: str) -> float | None:
+        try:
+            column = self._batch.columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        value = column[self._index]
+        return None if np.isnan(value) else float(value)
+
+    @property
+    def date(self) -> str:
+        return str(self._batch.dates[self._index])
+
+    @property
+    def device(self) -> str:
+        batch = self._batch
+        return batch.device_names[int(batch.device_codes[self._index])]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "date": self.date,
+            "device": self.device,
+            **{name: getattr(self, name) for name in self._batch.columns},
+        }
+
+    def __repr__(self) -> str:
+        return f"FeatureRow(date={self.date!r}, device={self.device!r})"
+
+
+class FeatureBatch:
+    """
+    Columnar daily features: one float64 array per feature, NaN for missing.
+
+    Dates are datetime64[D] and devices are stored as integer codes into
+    device_names, so a batch costs a few bytes per value however many days
+    and devices it holds. Batches can be passed straight to the *_batch
+    scorers and to CircadiaModel; indexing with an int gives a FeatureRow,
+    with a slice or boolean mask a smaller FeatureBatch, and with a column
+    name that column's array.
+    """
+
+    __slots__ = ("columns", "dates", "device_codes", "device_names")
+
+    def __init__(
+        self,
+        dates: Sequence[Any] | np.ndarray,
+        devices: Sequence[str] | np.ndarray,
+        columns: Mapping[str, Any],
+    ):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        names, codes = np.unique(np.asarray(devices, dtype=object), return_inverse=True)
+        self.device_names: list[str] = [str(name) for name in names]
+        self.device_codes = codes.astype(np.int32)
+        self.columns = {
+            name: np.asarray(values, dtype=np.float64) for name, values in columns.items()
+        }
+        for name, values in self.columns.items():
+            if values.shape != self.dates.shape:
+                raise ValueError(
+                    f"Column {name} has {len(values)} rows, expected {len(self.dates)}"
+                )
+        if self.device_codes.shape != self.dates.shape:
+            raise ValueError(f"Got {len(codes)} devices for {len(self.dates)} dates")
+
+    @classmethod
+    def _from_parts(
+        cls,
+        dates: np.ndarray,
+        device_codes: np.ndarray,
+        device_names: list[str],
+        columns: dict[str, np.ndarray],
+    ) -> "FeatureBatch":
+        batch = cls.__new__(cls)
+        batch.dates = dates
+        batch.device_codes = device_codes
+        batch.device_names = device_names
+        batch.columns = columns
+        return batch
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any]) -> "FeatureBatch":
+        """Build a batch from feature dataclasses, keeping their numeric fields."""
+        records = list(records)
+        if not records:
+            return cls([], [], {})
+        if not is_dataclass(records[0]):
+            raise TypeError(f"Expected feature dataclasses, got {type(records[0]).__name__}")
+
+        names = [
+            f.name
+            for f in fields(records[0])
+            if f.name not in ("date", "device")
+            and isinstance(getattr(records[0], f.name), (int, float, type(None)))
+        ]
+        columns = {
+            name: np.array(
+                [np.nan if (v := getattr(r, name)) is None else v for r in records],
+                dtype=np.float64,
+            )
+            for name in names
+        }
+        return cls([r.date for r in records], [r.device for r in records], columns)
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table | pa.RecordBatch) -> "FeatureBatch":
+        columns = {
+            name: table.column(name).to_numpy(zero_copy_only=False)
+            for name in table.schema.names
+            if name not in ("date", "device")
+        }
+        columns = {
+            name: np.where(pd.isna(values), np.nan, values).astype(np.float64)
+            if values.dtype == object
+            else values
+            for name, values in columns.items()
+        }
+        return cls(
+            table.column("date").to_numpy(zero_copy_only=False),
+            table.column("device").to_numpy(zero_copy_only=False),
+            columns,
+        )
+
+    @classmethod
+    def from_pandas(cls, df: pd.DataFrame) -> "FeatureBatch":
+        columns = {
+            name: df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            for name in df.columns
+            if name not in ("date", "device")
+        }
+        return cls(df["date"].to_numpy(dtype="datetime64[D]"), df["device"].to_numpy(), columns)
+
+    @classmethod
+    def from_storage(
+        cls,
+        storage: DuckDBStorage,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        device: str | None = None,
+        columns: Sequence[str] | None = None,
+    ) -> "FeatureBatch":
+        """
+        Load every date/device in range in one query, ordered by device then date.
+        Pass columns to read only those features.
+        """
+        query, params = daily_features_sql(columns, start_date, end_date, device)
+        return cls.from_arrow(storage.query(query, params))
+
+    @classmethod
+    def concat(cls, batches: Sequence["FeatureBatch"]) -> "FeatureBatch":
+        """Stack batches row-wise; columns missing from a batch are filled with NaN."""
+        names = list(dict.fromkeys(name for batch in batches for name in batch.columns))
+        columns = {
+            name: np.concatenate(
+                [batch.columns.get(name, np.full(len(batch), np.nan)) for batch in batches]
+            )
+            for name in names
+        }
+        return cls(
+            np.concatenate([batch.dates for batch in batches]),
+            np.concatenate([batch.devices for batch in batches]),
+            columns,
+        )
+
+    @property
+    def devices(self) -> np.ndarray:
+        return np.asarray(self.device_names, dtype=object)[self.device_codes]
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.dates.nbytes
+            + self.device_codes.nbytes
+            + sum(values.nbytes for values in self.columns.values())
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.columns
+
+    def __iter__(self) -> Iterator[FeatureRow]:
+        return (FeatureRow(self, i) for i in range(len(self)))
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, str):
+            return self.columns[key]
+        if isinstance(key, (int, np.integer)):
+            index = int(key) + len(self) if key < 0 else int(key)
+            if not 0 <= index < len(self):
+                raise IndexError(f"Row {key} out of range for {len(self)} rows")
+            return FeatureRow(self, index)
+        return self._from_parts(
+            self.dates[key],
+            self.device_codes[key],
+            self.device_names,
+            {name: values[key] for name, values in self.columns.items()},
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"FeatureBatch(rows={len(self)}, devices={len(self.device_names)}, "
+            f"columns={len(self.columns)})"
+        )
+
+    def select(self, names: Iterable[str]) -> "FeatureBatch":
+        """New batch sharing this one's arrays, keeping only the named columns."""
+        return self._from_parts(
+            self.dates,
+            self.device_codes,
+            self.device_names,
+            {name: self.columns[name] for name in names},
+        )
+
+    def with_columns(self, **columns: Any) -> "FeatureBatch":
+        """New batch sharing this one's arrays, with columns added or replaced."""
+        added = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        for name, values in added.items():
+            if values.shape != self.dates.shape:
+                raise ValueError(f"Column {name} has {len(values)} rows, expected {len(self)}")
+        return self._from_parts(
+            self.dates, self.device_codes, self.device_names, {**self.columns, **added}
+        )
+
+    def score(self, sleep_score: np.ndarray | None = None) -> "FeatureBatch":
+        """Add sleep, activity, recovery and health score columns."""
+        return self.with_columns(**calculate_scores_batch(self, sleep_score=sleep_score))
+
+    def to_matrix(
+        self,
+        names: Sequence[str],
+        fill_value: float | None = None,
+        dtype: Any = np.float64,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        (rows, len(names)) array in the given column order, e.g. for model input.
+        Pass out to fill an existing array, such as a slice of a larger one, instead.
+        """
+        if out is not None and out.shape != (len(self), len(names)):
+            raise ValueError(f"out has shape {out.shape}, expected {(len(self), len(names))}")
+        matrix = np.empty((len(self), len(names)), dtype=dtype) if out is None else out
+        for j, name in enumerate(names):
+            matrix[:, j] = self.columns[name]
+        if fill_value is not None:
+            matrix[np.isnan(matrix)] = fill_value
+        return matrix
+
+    def to_arrow(self) -> pa.Table:
+        return pa.table({"date": self.dates, "device": self.devices, **self.columns})
+
+    def to_pandas(self) -> pd.DataFrame:
+        return pd.DataFrame({"date": self.dates, "device": self.devices, **self.columns})
@@ -0,0 +1,180 @@
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+from ..storage import ArrowExporter, DuckDBStorage
+
+WINDOW_SECONDS = 300
+MAX_SAMPLE_GAP_SECONDS = 15
+SUCCESSIVE_GAP_SECONDS = 5
+OVERNIGHT_END_SECONDS = 6 * 3600
+MIN_WINDOW_SAMPLES = 10
+
+
+@dataclass
+class IntradayHeartRateFeatures:
+    date: str
+    device: str
+    samples: int
+    minutes_covered: float
+    hr_mean: float
+    hr_sd: float
+    hr_p5: float
+    hr_p50: float
+    hr_p95: float
+    minutes_above_100: float
+    minutes_above_120: float
+    # Lowest trailing 5-minute mean heart rate ending before 06:00.
+    overnight_min_hr: float | None
+    # Variability is derived from per-second mean heart rate, not true RR
+    # intervals, so these are proxies for SDNN / RMSSD / pNN50.
+    sdnn_proxy: float
+    sdann_proxy: float | None
+    rmssd_proxy: float | None
+    pnn50_proxy: float | None
+
+
+def _rolling_mean(seconds: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Mean over the trailing WINDOW_SECONDS ending at every sample, NaN where
+    the window holds fewer than MIN_WINDOW_SAMPLES samples.
+    """
+    first = np.searchsorted(seconds, seconds - WINDOW_SECONDS, side="right")
+    last = np.arange(1, seconds.size + 1)
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    counts = last - first
+    return np.where(counts >= MIN_WINDOW_SAMPLES, (sums[last] - sums[first]) / counts, np.nan)
+
+
+def compute_intraday_hr_features(
+    timestamps: np.ndarray, values: np.ndarray, date: str, device: str
+) -> IntradayHeartRateFeatures | None:
+    """
+    Compute one day's features from its intraday heart rate series.
+
+    timestamps must be sorted datetime64 values within a single day. Every
+    statistic is a vectorized pass over the arrays: the overnight minimum uses
+    a trailing 5-minute rolling mean built from cumulative sums, and SDANN the
+    fixed 5-minute segments its definition calls for. Returns None for a day
+    without a single valid sample.
+    """
+    hr = values.astype(np.float64)
+    valid = ~np.isnan(hr)
+    hr, timestamps = hr[valid], timestamps[valid]
+    if hr.size == 0:
+        return None
+    seconds = (timestamps - timestamps.astype("datetime64[D]")).astype("timedelta64[s]")
+    seconds = seconds.astype(np.int64)
+
+    # Each sample stands for the time until the next one, capped so that
+    # off-wrist gaps do not count as time at that heart rate.
+    durations = np.minimum(np.diff(seconds, append=seconds[-1] + 1), MAX_SAMPLE_GAP_SECONDS)
+
+    p5, p50, p95 = np.percentile(hr, [5, 50, 95])
+
+    rolling = _rolling_mean(seconds, hr)[seconds < OVERNIGHT_END_SECONDS]
+    overnight_min = float(np.nanmin(rolling)) if np.any(~np.isnan(rolling)) else None
+
+    rr = 60000.0 / np.maximum(hr, 1)
+    consecutive = np.diff(seconds) <= SUCCESSIVE_GAP_SECONDS
+    rr_diffs = np.diff(rr)[consecutive]
+    rmssd = float(np.sqrt(np.mean(rr_diffs**2))) if rr_diffs.size else None
+    pnn50 = float(np.mean(np.abs(rr_diffs) > 50)) if rr_diffs.size else None
+
+    segments = seconds // WINDOW_SECONDS
+    n_segments = 86400 // WINDOW_SECONDS
+    counts = np.bincount(segments, minlength=n_segments)
+    filled = counts >= MIN_WINDOW_SAMPLES
+    rr_segment_means = np.divide(
+        np.bincount(segments, weights=rr, minlength=n_segments),
+        counts,
+        out=np.full(n_segments, np.nan),
+        where=filled,
+    )
+    sdann = float(np.nanstd(rr_segment_means)) if np.count_nonzero(filled) > 1 else None
+
+    return IntradayHeartRateFeatures(
+        date=date,
+        device=device,
+        samples=int(hr.size),
+        minutes_covered=float(durations.sum() / 60),
+        hr_mean=float(hr.mean()),
+        hr_sd=float(hr.std()),
+        hr_p5=float(p5),
+        hr_p50=float(p50),
+        hr_p95=float(p95),
+        minutes_above_100=float(durations[hr > 100].sum() / 60),
+        minutes_above_120=float(durations[hr > 120].sum() / 60),
+        overnight_min_hr=overnight_min,
+        sdnn_proxy=float(rr.std()),
+        sdann_proxy=sdann,
+        rmssd_proxy=rmssd,
+        pnn50_proxy=pnn50,
+    )
+
+
+def iter_intraday_hr_features(
+    storage: DuckDBStorage,
+    device: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    batch_size: int = 65_536,
+) -> Iterator[IntradayHeartRateFeatures]:
+    """
+    Stream heart_rate_intraday for a device and yield features day by day.
+
+    Rows arrive as Arrow record batches in timestamp order; only the day
+    currently being assembled is held in memory.
+    """
+    exporter = ArrowExporter(storage, batch_size=batch_size)
+    reader = exporter.reader(
+        "heart_rate_intraday", order=True, start_date=start_date, end_date=end_date, device=device
+    )
+
+    day: np.datetime64 | None = None
+    ts_parts: list[np.ndarray] = []
+    hr_parts: list[np.ndarray] = []
+
+    def finish() -> IntradayHeartRateFeatures | None:
+        return compute_intraday_hr_features(
+            np.concatenate(ts_parts), np.concatenate(hr_parts), str(day), device
+        )
+
+    for batch in reader:
+        timestamps = batch.column("timestamp").to_numpy()
+        values = batch.column("value").to_numpy(zero_copy_only=False)
+        days = timestamps.astype("datetime64[D]")
+        # Positions where the calendar day changes inside this batch.
+        boundaries = np.flatnonzero(days[1:] != days[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(days)]))
+        for start, end in zip(starts, ends):
+            if start == end:
+                continue
+            if day is not None and days[start] != day:
+                if (features := finish()) is not None:
+                    yield features
+                ts_parts, hr_parts = [], []
+            day = days[start]
+            ts_parts.append(timestamps[start:end])
+            hr_parts.append(values[start:end])
+
+    if ts_parts and (features := finish()) is not None:
+        yield features
+
+
+def refresh_intraday_hr_features(
+    storage: DuckDBStorage,
+    device: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> int:
+    """Recompute intraday_hr_features for a date range. Returns the rows written."""
+    features = [asdict(f) for f in iter_intraday_hr_features(storage, device, start_date, end_date)]
+    if not features:
+        return 0
+    rows = pd.DataFrame(features)
+    rows["date"] = pd.to_datetime(rows["date"]).dt.date
+    return storage.upsert("intraday_hr_features", rows)
@@ -0,0 +1,159 @@
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+import numpy as np
+
+from .batch import FeatureBatch
+from .vectorized import (
+    calculate_activity_score_batch,
+    calculate_health_score_batch,
+    calculate_recovery_score_batch,
+    calculate_sleep_score_batch,
+)
+
+SLEEP_INPUTS = (
+    "efficiency",
+    "total_minutes_asleep",
+    "minutes_rem",
+    "minutes_deep",
+    "minutes_to_fall_asleep",
+    "waso",
+)
+ACTIVITY_INPUTS = ("steps", "active_minutes_total", "minutes_very_active", "active_zone_minutes")
+RECOVERY_INPUTS = ("hrv_rmssd", "resting_hr", "sleep_score", "spo2_avg", "breathing_rate")
+
+
+@dataclass(frozen=True)
+class FeatureNode:
+    name: str
+    # Source columns or other nodes, passed to compute() as keyword arrays.
+    inputs: tuple[str, ...]
+    compute: Callable[..., np.ndarray]
+    # Bump whenever compute() changes so stored values are not reused.
+    version: int = 1
+
+
+class FeatureGraph:
+    """
+    Declarative DAG of derived features.
+
+    Names that are not nodes are source columns read from the input batch.
+    Evaluating a set of names runs only the nodes they depend on, each once,
+    in dependency order, with intermediate results shared between consumers.
+    """
+
+    def __init__(self, nodes: Iterable[FeatureNode] = ()):
+        self.nodes: dict[str, FeatureNode] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: FeatureNode) -> FeatureNode:
+        self.nodes[node.name] = node
+        return node
+
+    def feature(
+        self, name: str, inputs: Iterable[str], version: int = 1
+    ) -> Callable[[Callable[..., np.ndarray]], Callable[..., np.ndarray]]:
+        """Decorator registering a function as a node."""
+
+        def register(compute: Callable[..., np.ndarray]) -> Callable[..., np.ndarray]:
+            self.add(FeatureNode(name, tuple(inputs), compute, version))
+            return compute
+
+        return register
+
+    def copy(self) -> "FeatureGraph":
+        return FeatureGraph(self.nodes.values())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.nodes
+
+    def __getitem__(self, name: str) -> FeatureNode:
+        return self.nodes[name]
+
+    def plan(self, names: Iterable[str], available: Iterable[str] = ()) -> list[FeatureNode]:
+        """Nodes needed for names in dependency order, skipping already available ones."""
+        available = set(available)
+        ordered: list[FeatureNode] = []
+        visiting: set[str] = set()
+        done: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in done or name in available or name not in self.nodes:
+                return
+            if name in visiting:
+                raise ValueError(f"Feature graph has a cycle through {name}")
+            visiting.add(name)
+            node = self.nodes[name]
+            for dependency in node.inputs:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(node)
+
+        for name in names:
+            visit(name)
+        return ordered
+
+    def sources(self, names: Iterable[str]) -> list[str]:
+        """Source columns names depend on, in first-use order."""
+        names = list(names)
+        columns = [name for name in names if name not in self.nodes]
+        for node in self.plan(names):
+            columns.extend(name for name in node.inputs if name not in self.nodes)
+        return list(dict.fromkeys(columns))
+
+    def lineage(self, name: str) -> str:
+        """Versions of a node and everything upstream of it, e.g. 'sleep_score@1,...'."""
+        return ",".join(f"{node.name}@{node.version}" for node in self.plan([name]))
+
+    def evaluate(
+        self, batch: FeatureBatch, names: Iterable[str], reuse: bool = False
+    ) -> FeatureBatch:
+        """
+        Add the requested node columns to batch.
+
+        With reuse=True, node columns already present in batch are taken as
+        is instead of being recomputed.
+        """
+        names = list(names)
+        values: dict[str, np.ndarray] = {}
+        for node in self.plan(names, available=batch.names if reuse else ()):
+            arguments = {
+                name: values[name] if name in values else batch[name] for name in node.inputs
+            }
+            values[node.name] = np.asarray(node.compute(**arguments), dtype=np.float64)
+        return batch.with_columns(**{name: values[name] for name in names if name in values})
+
+
+def default_graph() -> FeatureGraph:
+    graph = FeatureGraph()
+
+    @graph.feature("sleep_score", SLEEP_INPUTS)
+    def sleep_score(**columns: np.ndarray) -> np.ndarray:
+        return calculate_sleep_score_batch(columns)
+
+    @graph.feature("activity_score", ACTIVITY_INPUTS)
+    def activity_score(**columns: np.ndarray) -> np.ndarray:
+        return calculate_activity_score_batch(columns)
+
+    @graph.feature("recovery_score", RECOVERY_INPUTS)
+    def recovery_score(**columns: np.ndarray) -> np.ndarray:
+        return calculate_recovery_score_batch(columns)
+
+    @graph.feature("health_score", ("sleep_score", "activity_score", "recovery_score"))
+    def health_score(
+        sleep_score: np.ndarray, activity_score: np.ndarray, recovery_score: np.ndarray
+    ) -> np.ndarray:
+        return calculate_health_score_batch(sleep_score, activity_score, recovery_score)
+
+    return graph
+
+
+DEFAULT_GRAPH = default_graph()
+
+
+def evaluate_features(
+    batch: FeatureBatch, names: Iterable[str], graph: FeatureGraph | None = None
+) -> FeatureBatch:
+    return (graph or DEFAULT_GRAPH).evaluate(batch, names)
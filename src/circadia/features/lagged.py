@@ -0,0 +1,256 @@
+import hashlib
+import logging
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Any
+
+from ..storage import DuckDBStorage
+from ..telemetry import profiled
+from .batch import DAILY_FEATURES_QUERY, FeatureBatch
+from .sql import SCORED_FEATURES_QUERY, install_scoring_macros
+
+logger = logging.getLogger(__name__)
+
+# Daily source columns that get lags, rolling windows and next-day targets.
+LAG_METRICS = (
+    "resting_hr",
+    "hrv_rmssd",
+    "total_minutes_asleep",
+    "efficiency",
+    "minutes_deep",
+    "minutes_rem",
+    "steps",
+    "active_minutes_total",
+    "calories",
+    "spo2_avg",
+    "breathing_rate",
+    "skin_temp_variation",
+    "sleep_score",
+    "recovery_score",
+    "activity_score",
+    "health_score",
+)
+
+
+@dataclass(frozen=True)
+class LagSpec:
+    metrics: tuple[str, ...] = LAG_METRICS
+    # Lags t-1 ... t-lags, on calendar days: a missing day gives NULL, not the day before it.
+    lags: int = 3
+    # Trailing windows in days, ending on and including t.
+    windows: tuple[int, ...] = (7, 28)
+
+    def __post_init__(self) -> None:
+        # Lists from a saved spec would make the dataclass unhashable.
+        object.__setattr__(self, "metrics", tuple(self.metrics))
+        object.__setattr__(self, "windows", tuple(self.windows))
+
+    @property
+    def feature_names(self) -> list[str]:
+        """Model inputs for day t: today's values, lags, window stats and the forecast weekday."""
+        names = []
+        for metric in self.metrics:
+            names.append(metric)
+            names.extend(f"{metric}_lag{lag}" for lag in range(1, self.lags + 1))
+            for window in self.windows:
+                names.extend([f"{metric}_mean{window}", f"{metric}_std{window}"])
+        return [*names, "dow_sin", "dow_cos", "is_weekend"]
+
+    @property
+    def target_names(self) -> list[str]:
+        return [f"next_{metric}" for metric in self.metrics]
+
+    @property
+    def lookback(self) -> int:
+        """Days before t that any feature of t reads."""
+        return max(self.lags, max(self.windows, default=1) - 1)
+
+    @property
+    def key(self) -> str:
+        digest = hashlib.sha256(repr(sorted(asdict(self).items())).encode())
+        return digest.hexdigest()[:12]
+
+    @property
+    def table(self) -> str:
+        return f"lagged_features_{self.key}"
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def lagged_features_sql(spec: LagSpec, device: str | None = None) -> str:
+    """
+    SELECT computing every feature and target of spec in one pass of DuckDB
+    window functions. Scores are computed with the scoring macros, which must be
+    installed on the connection.
+
+    Parameters are the first and last daily row to read, the device if given,
+    then the first and last date to return. The rows read should start
+    spec.lookback days before and end one day after the dates returned, so
+    those get full windows and their next-day target.
+    """
+    frame = "PARTITION BY device ORDER BY date RANGE BETWEEN"
+    windows = {"next_day": f"{frame} INTERVAL 1 DAY FOLLOWING AND INTERVAL 1 DAY FOLLOWING"}
+    for lag in range(1, spec.lags + 1):
+        windows[f"lag{lag}"] = (
+            f"{frame} INTERVAL {lag} DAY PRECEDING AND INTERVAL {lag} DAY PRECEDING"
+        )
+    for window in spec.windows:
+        windows[f"last{window}"] = f"{frame} INTERVAL {window - 1} DAY PRECEDING AND CURRENT ROW"
+
+    columns = []
+    for metric in spec.metrics:
+        columns.append(metric)
+        columns.extend(
+            f"max({metric}) OVER lag{lag} AS {metric}_lag{lag}" for lag in range(1, spec.lags + 1)
+        )
+        for window in spec.windows:
+            columns.append(f"avg({metric}) OVER last{window} AS {metric}_mean{window}")
+            columns.append(f"stddev_samp({metric}) OVER last{window} AS {metric}_std{window}")
+    # Weekday of the day being forecast, t + 1.
+    columns.extend(
+        [
+            "sin(2 * pi() * dayofweek(date + 1) / 7) AS dow_sin",
+            "cos(2 * pi() * dayofweek(date + 1) / 7) AS dow_cos",
+            "CAST(dayofweek(date + 1) IN (0, 6) AS DOUBLE) AS is_weekend",
+        ]
+    )
+    columns.extend(f"max({metric}) OVER next_day AS next_{metric}" for metric in spec.metrics)
+
+    return f"""
+    SELECT * FROM (
+        SELECT date, device, {", ".join(columns)}
+        FROM ({SCORED_FEATURES_QUERY})
+        WHERE date BETWEEN ? AND ? {"AND device = ?" if device else ""}
+        WINDOW {", ".join(f"{name} AS ({definition})" for name, definition in windows.items())}
+    )
+    WHERE date BETWEEN ? AND ?
+    """
+
+
+class LaggedFeatures:
+    """
+    Next-day forecasting features, materialized per date and device.
+
+    Each row for day t holds that day's metrics, their values on the previous
+    spec.lags calendar days, trailing-window means and standard deviations,
+    the weekday of t + 1, and next_* targets holding the metrics on t + 1.
+    Everything is computed inside DuckDB with window functions and cached in
+    one table per spec, so training and serving read precomputed rows. Call
+    refresh() for dates whose daily data changed; load() fills in dates that
+    were never computed.
+    """
+
+    def __init__(self, storage: DuckDBStorage, spec: LagSpec | None = None):
+        self.storage = storage
+        self.spec = spec or LagSpec()
+        self._created = False
+
+    def _ensure_table(self) -> None:
+        if self._created:
+            return
+        install_scoring_macros(self.storage)
+        columns = ", ".join(
+            f"{name} DOUBLE" for name in [*self.spec.feature_names, *self.spec.target_names]
+        )
+        self.storage.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.spec.table} (
+                date DATE NOT NULL,
+                device VARCHAR NOT NULL,
+                {columns},
+                PRIMARY KEY (date, device)
+            )
+            """
+        )
+        self._created = True
+
+    @profiled("features.lagged")
+    def refresh(
+        self,
+        start_date: str | date,
+        end_date: str | date,
+        device: str | None = None,
+    ) -> int:
+        """
+        Recompute every date whose features or target read daily data in range:
+        the day before start_date, whose target is start_date, through
+        spec.lookback days after end_date.
+        """
+        self._ensure_table()
+        first = _as_date(start_date) - timedelta(days=1)
+        last = _as_date(end_date) + timedelta(days=self.spec.lookback)
+        params: list[Any] = [first - timedelta(days=self.spec.lookback), last + timedelta(days=1)]
+        if device:
+            params.append(device)
+        params.extend([first, last])
+
+        query = lagged_features_sql(self.spec, device)
+        rows: int = self.storage.execute(
+            f"INSERT OR REPLACE INTO {self.spec.table} {query}", params
+        ).fetchone()[0]
+        self.storage.bump_version(self.spec.table)
+        logger.info(f"Refreshed {rows} lagged feature rows for {first} to {last}")
+        return rows
+
+    def _conditions(
+        self, start_date: str | None, end_date: str | None, device: str | None
+    ) -> tuple[str, list[Any]]:
+        conditions = []
+        params: list[Any] = []
+        if start_date:
+            conditions.append("date >= CAST(? AS DATE)")
+            params.append(start_date)
+        if end_date:
+            conditions.append("date <= CAST(? AS DATE)")
+            params.append(end_date)
+        if device:
+            conditions.append("device = ?")
+            params.append(device)
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+    def load(
+        self,
+        names: Iterable[str] | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        device: str | None = None,
+    ) -> FeatureBatch:
+        """
+        Cached rows in range, ordered by device then date, with the named
+        columns (every feature and target by default). Dates with daily data
+        but no cached row are computed first.
+        """
+        self._ensure_table()
+        where, params = self._conditions(start_date, end_date, device)
+        first, last = self.storage.execute(
+            f"""
+            SELECT min(date), max(date) FROM (
+                SELECT date, device FROM ({DAILY_FEATURES_QUERY}) {where}
+            ) ANTI JOIN {self.spec.table} USING (date, device)
+            """,
+            params,
+        ).fetchone()
+        if first is not None:
+            self.refresh(first, last, device)
+
+        names = (
+            [*self.spec.feature_names, *self.spec.target_names]
+            if names is None
+            else list(dict.fromkeys(names))
+        )
+        return FeatureBatch.from_arrow(
+            self.storage.query(
+                f"""
+                SELECT date, device, {", ".join(names)} FROM {self.spec.table}
+                {where}
+                ORDER BY device, date
+                """,
+                params,
+            )
+        )
+
+
+def _as_date(value: str | date) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value
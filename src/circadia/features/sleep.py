@@ -1,6 +1,19 @@
+import math
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ..storage import DuckDBStorage
+
+MINUTES_PER_DAY = 1440
+# Sleep days run noon to noon so a night is never split at midnight; row d
+# covers 12:00 on d-1 through 12:00 on d, matching Fitbit's dateOfSleep.
+DAY_OFFSET_MINUTES = 720
+ASLEEP_LEVELS = (0, 1, 2)  # deep, light/asleep, rem/restless in sleep_levels
 
 
 @dataclass
@@ -17,8 +30,8 @@ class SleepFeatures:
     minutes_after_wakeup: int
     minutes_to_fall_asleep: int
     waso: int  # Wake After Sleep Onset
-    sleep_midpoint_minutes: Optional[float] = None
-    sleep_regularity_index: Optional[float] = None
+    sleep_midpoint_minutes: float | None = None  # Clock time, minutes after midnight
+    sleep_regularity_index: float | None = None
 
 
 def extract_sleep_features(sleep_record: dict[str, Any], date: str, device: str) -> SleepFeatures:
@@ -50,8 +63,10 @@ def extract_sleep_features(sleep_record: dict[str, Any], date: str, device: str)
         try:
             start = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
             end = datetime.fromisoformat(end_time.replace("Z", "+00:00"))
-            duration = (end - start).total_seconds() / 60
-            sleep_midpoint = duration / 2
+            midpoint = start + (end - start) / 2
+            sleep_midpoint = (
+                midpoint.hour * 60 + midpoint.minute + midpoint.second / 60
+            ) % MINUTES_PER_DAY
         except Exception:
             pass
 
@@ -116,15 +131,255 @@ def calculate_sleep_score(features: SleepFeatures) -> float:
     return round(total, 1)
 
 
+def build_sleep_wake_matrix(
+    timestamps: np.ndarray,
+    levels: np.ndarray,
+    durations: np.ndarray,
+    start_date: str,
+    end_date: str,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Expand sleep_levels segments into a minute-level sleep/wake matrix.
+
+    Returns (asleep, has_data): asleep is a (days, 1440) boolean matrix of
+    noon-to-noon sleep days from start_date to end_date, and has_data marks
+    the days with any recorded sleep so missing nights are not read as awake.
+    """
+    first = np.datetime64(start_date, "D")
+    n_days = int((np.datetime64(end_date, "D") - first).astype(int)) + 1
+    total = n_days * MINUTES_PER_DAY
+    origin = first.astype("datetime64[m]") - np.timedelta64(DAY_OFFSET_MINUTES, "m")
+
+    begin = (timestamps.astype("datetime64[m]") - origin).astype(np.int64)
+    end = begin + np.ceil(durations / 60).astype(np.int64)
+    asleep = np.isin(levels, ASLEEP_LEVELS)
+
+    # Difference array: +1 where a sleep segment starts, -1 where it ends.
+    marks = np.zeros(total + 1, dtype=np.int64)
+    np.add.at(marks, np.clip(begin[asleep], 0, total), 1)
+    np.add.at(marks, np.clip(end[asleep], 0, total), -1)
+    matrix = (np.cumsum(marks[:-1]) > 0).reshape(n_days, MINUTES_PER_DAY)
+
+    touched = np.zeros(total + 1, dtype=np.int64)
+    np.add.at(touched, np.clip(begin, 0, total), 1)
+    np.add.at(touched, np.clip(end, 0, total), -1)
+    has_data = (np.cumsum(touched[:-1]) > 0).reshape(n_days, MINUTES_PER_DAY).any(axis=1)
+
+    return matrix, has_data
+
+
+def load_sleep_wake_matrix(
+    storage: DuckDBStorage, device: str, start_date: str, end_date: str
+) -> tuple[np.ndarray, np.ndarray]:
+    rows = storage.execute(
+        """
+        SELECT timestamp, level, duration_seconds FROM sleep_levels
+        WHERE device = ?
+            AND timestamp >= CAST(? AS DATE) - INTERVAL 12 HOUR
+            AND timestamp < CAST(? AS DATE) + INTERVAL 12 HOUR
+        ORDER BY timestamp
+        """,
+        [device, start_date, end_date],
+    ).fetchnumpy()
+    return build_sleep_wake_matrix(
+        rows["timestamp"].astype("datetime64[m]"),
+        np.asarray(rows["level"]),
+        np.asarray(rows["duration_seconds"], dtype=np.float64),
+        start_date,
+        end_date,
+    )
+
+
+def _pair_agreement(asleep: np.ndarray, has_data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Fraction of matching minutes between each day and the next, and whether both have data."""
+    agreement = (asleep[1:] == asleep[:-1]).mean(axis=1)
+    valid = has_data[1:] & has_data[:-1]
+    return agreement, valid
+
+
+def sleep_midpoints(asleep: np.ndarray, has_data: np.ndarray) -> np.ndarray:
+    """Circular mean clock time (minutes after midnight) of each day's sleep, NaN if none."""
+    clock = (np.arange(MINUTES_PER_DAY) + DAY_OFFSET_MINUTES) % MINUTES_PER_DAY
+    angles = 2 * np.pi * clock / MINUTES_PER_DAY
+    counts = asleep.sum(axis=1)
+    sin = asleep @ np.sin(angles)
+    cos = asleep @ np.cos(angles)
+    midpoints = (np.arctan2(sin, cos) * MINUTES_PER_DAY / (2 * np.pi)) % MINUTES_PER_DAY
+    return np.where((counts > 0) & has_data, midpoints, np.nan)
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sums over window elements, aligned with values; NaN until a window is full."""
+    if window < 1:
+        raise ValueError(f"window must be at least 1, got {window}")
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    out = np.full(len(values), np.nan)
+    if window <= len(values):
+        out[window - 1 :] = sums[window:] - sums[: len(sums) - window]
+    return out
+
+
+def _circular_stats(midpoints: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rolling circular mean and circular SD of midpoints, in minutes."""
+    valid = ~np.isnan(midpoints)
+    angles = np.where(valid, 2 * np.pi * midpoints / MINUTES_PER_DAY, 0.0)
+    n = _rolling_sum(valid.astype(np.float64), window)
+    sin = _rolling_sum(np.where(valid, np.sin(angles), 0.0), window)
+    cos = _rolling_sum(np.where(valid, np.cos(angles), 0.0), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (np.arctan2(sin, cos) * MINUTES_PER_DAY / (2 * np.pi)) % MINUTES_PER_DAY
+        resultant = np.hypot(sin, cos) / n
+        sd = np.sqrt(-2 * np.log(np.clip(resultant, 1e-12, 1))) * MINUTES_PER_DAY / (2 * np.pi)
+    enough = n >= 2
+    return np.where(enough, mean, np.nan), np.where(enough, sd, np.nan)
+
+
+def _circular_difference(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    half = MINUTES_PER_DAY / 2
+    return np.asarray((a - b + half) % MINUTES_PER_DAY - half)
+
+
+def calculate_sleep_regularity(
+    asleep: np.ndarray,
+    has_data: np.ndarray,
+    dates: list[str],
+    window_days: int = 7,
+) -> pd.DataFrame:
+    """
+    Rolling sleep regularity and circadian phase for every day of a history.
+
+    SRI follows Phillips et al. (2017): the probability of being in the same
+    state at the same clock minute on consecutive days, scaled to -100..100,
+    averaged over the window's day pairs where both days have data. Phase is
+    the rolling circular mean of nightly sleep midpoints.
+    """
+    if window_days < 2:
+        raise ValueError(f"window_days must be at least 2, got {window_days}")
+    agreement, valid = _pair_agreement(asleep, has_data)
+    pairs = window_days - 1
+    agree_sum = _rolling_sum(np.where(valid, agreement, 0.0), pairs)
+    pair_count = _rolling_sum(valid.astype(np.float64), pairs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sri = np.where(pair_count >= pairs / 2, 200 * agree_sum / pair_count - 100, np.nan)
+    # Day 0 has no preceding pair.
+    sri = np.concatenate(([np.nan], sri))[: len(asleep)]
+
+    midpoints = sleep_midpoints(asleep, has_data)
+    phase, phase_sd = _circular_stats(midpoints, window_days)
+
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "sleep_regularity_index": sri,
+            "sleep_midpoint_minutes": midpoints,
+            "midpoint_phase_minutes": phase,
+            "midpoint_sd_minutes": phase_sd,
+            "midpoint_deviation_minutes": _circular_difference(midpoints, phase),
+        }
+    )
+
+
 def calculate_sleep_regularity_index(
-    sleep_records: list[SleepFeatures], window_days: int = 7
-) -> float:
+    asleep: np.ndarray, has_data: np.ndarray | None = None, window_days: int = 7
+) -> float | None:
+    """
+    Sleep regularity index (-100..100, higher is more regular) over the last
+    window_days rows of a minute-level sleep/wake matrix.
+    """
+    if has_data is None:
+        has_data = np.ones(len(asleep), dtype=bool)
+    asleep, has_data = asleep[-window_days:], has_data[-window_days:]
+    if len(asleep) < 2:
+        return None
+
+    agreement, valid = _pair_agreement(asleep, has_data)
+    if not valid.any():
+        return None
+    return float(200 * agreement[valid].mean() - 100)
+
+
+class SleepRegularityTracker:
     """
-    Calculate sleep regularity index over a window.
-    Based on variance in sleep onset and offset times.
-    Lower is more regular.
+    Incremental SRI and phase: each new night costs one 1440-minute comparison
+    against the previous night, and only window_days of state is retained.
+    Like calculate_sleep_regularity, nothing is reported until window_days
+    nights have been added.
     """
-    if len(sleep_records) < window_days:
-        return 0.0
 
-    return 0.0  # Placeholder - requires actual timestamps
+    def __init__(self, window_days: int = 7):
+        if window_days < 2:
+            raise ValueError(f"window_days must be at least 2, got {window_days}")
+        self.window_days = window_days
+        self._nights = 0
+        self._previous: np.ndarray | None = None
+        self._agreements: deque[float | None] = deque(maxlen=window_days - 1)
+        self._midpoints: deque[float] = deque(maxlen=window_days)
+
+    @classmethod
+    def load(
+        cls, storage: DuckDBStorage, device: str, end_date: str, window_days: int = 7
+    ) -> "SleepRegularityTracker":
+        """Seed a tracker from the last window_days nights up to end_date."""
+        start = (np.datetime64(end_date, "D") - np.timedelta64(window_days - 1, "D")).astype(str)
+        asleep, has_data = load_sleep_wake_matrix(storage, device, start, end_date)
+        tracker = cls(window_days)
+        for row, present in zip(asleep, has_data):
+            tracker.update(row if present else None)
+        return tracker
+
+    def update(self, night: np.ndarray | None) -> dict[str, float | None]:
+        """Add the next night's 1440-minute sleep vector (None if no data)."""
+        if night is not None and self._previous is not None:
+            self._agreements.append(float(np.mean(night == self._previous)))
+        else:
+            self._agreements.append(None)
+        self._previous = night
+        self._nights += 1
+
+        midpoint = math.nan
+        if night is not None and night.any():
+            midpoint = float(sleep_midpoints(night[None, :], np.array([True]))[0])
+        self._midpoints.append(midpoint)
+
+        return {
+            "sleep_regularity_index": self.sleep_regularity_index,
+            "sleep_midpoint_minutes": None if math.isnan(midpoint) else midpoint,
+            "midpoint_phase_minutes": self.phase,
+        }
+
+    @property
+    def sleep_regularity_index(self) -> float | None:
+        values = [a for a in self._agreements if a is not None]
+        if self._nights < self.window_days or len(values) < (self.window_days - 1) / 2:
+            return None
+        return 200 * sum(values) / len(values) - 100
+
+    @property
+    def phase(self) -> float | None:
+        midpoints = np.array(self._midpoints)
+        if self._nights < self.window_days or np.count_nonzero(~np.isnan(midpoints)) < 2:
+            return None
+        mean, _ = _circular_stats(midpoints, len(midpoints))
+        return float(mean[-1])
+
+
+def refresh_sleep_regularity(
+    storage: DuckDBStorage, device: str, start_date: str, end_date: str, window_days: int = 7
+) -> int:
+    """
+    Recompute sleep_regularity for [start_date, end_date]. A tracker seeded
+    with the nights before start_date is stepped through the range, so the
+    cost is one night comparison per day however long the history is.
+    """
+    first = np.datetime64(start_date, "D")
+    before = str(first - np.timedelta64(1, "D"))
+    tracker = SleepRegularityTracker.load(storage, device, before, window_days)
+    asleep, has_data = load_sleep_wake_matrix(storage, device, start_date, end_date)
+    dates = first + np.arange(len(asleep))
+    rows = pd.DataFrame(
+        [
+            {"date": day, "device": device, **tracker.update(night if present else None)}
+            for day, night, present in zip(dates.astype(object), asleep, has_data)
+        ]
+    )
+    return storage.upsert("sleep_regularity", rows)
@@ -0,0 +1,236 @@
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+from ..storage import DuckDBStorage
+from ..telemetry import profiled
+from .batch import DAILY_FEATURES_QUERY
+
+logger = logging.getLogger(__name__)
+
+
+def get_scoring_macros() -> list[str]:
+    """
+    DuckDB macros mirroring the Python scorers in sleep.py, activity.py and composite.py.
+
+    Each macro follows the same operation order as its Python counterpart so
+    the double arithmetic matches, and circadia_round1 reproduces Python's
+    round(x, 1) exactly. NULL inputs follow the Python None branches where the
+    scorer has them; otherwise the score is NULL.
+    """
+    return [
+        # TwoSum recovers the rounding error of x * 10, so the halfway comparison
+        # is exact instead of depending on the inexact product.
+        """
+        CREATE OR REPLACE MACRO circadia_round1_exact(s, err) AS
+            CASE
+                WHEN (s - (floor(s) + 0.5)) + err > 0 THEN (floor(s) + 1) / 10
+                WHEN (s - (floor(s) + 0.5)) + err < 0 THEN floor(s) / 10
+                WHEN floor(s) % 2 = 0 THEN floor(s) / 10
+                ELSE (floor(s) + 1) / 10
+            END;
+        """,
+        """
+        CREATE OR REPLACE MACRO circadia_round1(x) AS
+            circadia_round1_exact(
+                x * 8 + x * 2,
+                (x * 8 - ((x * 8 + x * 2) - ((x * 8 + x * 2) - x * 8)))
+                    + (x * 2 - ((x * 8 + x * 2) - x * 8))
+            );
+        """,
+        """
+        CREATE OR REPLACE MACRO calculate_sleep_score(
+            efficiency, minutes_asleep, minutes_rem, minutes_deep, minutes_to_fall_asleep, waso
+        ) AS
+            CASE
+                WHEN efficiency IS NULL OR minutes_asleep IS NULL OR minutes_rem IS NULL
+                    OR minutes_deep IS NULL OR minutes_to_fall_asleep IS NULL OR waso IS NULL
+                THEN NULL
+                ELSE circadia_round1(
+                    least(efficiency::DOUBLE / 100 * 30, 30)
+                    + CASE
+                        WHEN minutes_asleep >= 480 THEN 25
+                        ELSE (minutes_asleep::DOUBLE / 480) * 25
+                    END
+                    + CASE
+                        WHEN minutes_asleep > 0
+                        THEN least((minutes_rem::DOUBLE / minutes_asleep) * 100 / 25 * 15, 15)
+                        ELSE 0
+                    END
+                    + CASE
+                        WHEN minutes_asleep > 0
+                        THEN least((minutes_deep::DOUBLE / minutes_asleep) * 100 / 20 * 15, 15)
+                        ELSE 0
+                    END
+                    + CASE
+                        WHEN minutes_to_fall_asleep <= 15 THEN 10
+                        WHEN minutes_to_fall_asleep <= 30 THEN 5
+                        ELSE 0
+                    END
+                    + greatest(5 - (waso::DOUBLE / 10), 0)
+                )
+            END;
+        """,
+        """
+        CREATE OR REPLACE MACRO calculate_activity_score(
+            steps, active_minutes_total, minutes_very_active, active_zone_minutes
+        ) AS
+            CASE
+                WHEN steps IS NULL OR active_minutes_total IS NULL
+                    OR minutes_very_active IS NULL OR active_zone_minutes IS NULL
+                THEN NULL
+                ELSE circadia_round1(
+                    CASE
+                        WHEN steps >= 10000 THEN 35
+                        WHEN steps >= 7500 THEN 28
+                        WHEN steps >= 5000 THEN 21
+                        WHEN steps >= 2500 THEN 14
+                        ELSE (steps::DOUBLE / 2500) * 14
+                    END
+                    + least((active_minutes_total::DOUBLE / 30) * 35, 35)
+                    + CASE
+                        WHEN active_minutes_total > 0
+                        THEN least(minutes_very_active::DOUBLE / active_minutes_total * 20, 20)
+                        ELSE 0
+                    END
+                    + least(active_zone_minutes::DOUBLE / 30 * 10, 10)
+                )
+            END;
+        """,
+        """
+        CREATE OR REPLACE MACRO calculate_recovery_score(
+            hrv_rmssd, resting_hr, sleep_score, spo2_avg, breathing_rate
+        ) AS
+            CASE
+                WHEN hrv_rmssd IS NULL AND resting_hr IS NULL THEN 50.0
+                ELSE circadia_round1(
+                    CASE
+                        WHEN hrv_rmssd IS NULL THEN 0
+                        WHEN hrv_rmssd >= 50 THEN 30
+                        WHEN hrv_rmssd >= 30 THEN 20
+                        WHEN hrv_rmssd >= 20 THEN 10
+                        ELSE 5
+                    END
+                    + CASE
+                        WHEN resting_hr IS NULL THEN 0
+                        WHEN resting_hr <= 50 THEN 20
+                        WHEN resting_hr <= 60 THEN 15
+                        WHEN resting_hr <= 70 THEN 10
+                        ELSE 5
+                    END
+                    + sleep_score::DOUBLE * 0.3
+                    + CASE
+                        WHEN spo2_avg IS NULL THEN 0
+                        WHEN spo2_avg >= 97 THEN 10
+                        WHEN spo2_avg >= 95 THEN 7
+                        WHEN spo2_avg >= 93 THEN 4
+                        ELSE 0
+                    END
+                    + CASE
+                        WHEN breathing_rate IS NULL THEN 0
+                        WHEN breathing_rate BETWEEN 12 AND 16 THEN 10
+                        WHEN breathing_rate BETWEEN 10 AND 18 THEN 6
+                        ELSE 2
+                    END
+                )
+            END;
+        """,
+        """
+        CREATE OR REPLACE MACRO calculate_health_score(
+            sleep_score, activity_score, recovery_score
+        ) AS
+            circadia_round1(recovery_score * 0.4 + sleep_score * 0.35 + activity_score * 0.25);
+        """,
+        """
+        CREATE OR REPLACE MACRO readiness_status(score) AS
+            CASE
+                WHEN score IS NULL THEN NULL
+                WHEN score >= 80 THEN 'Highly Ready'
+                WHEN score >= 60 THEN 'Ready'
+                WHEN score >= 40 THEN 'Moderate'
+                WHEN score >= 20 THEN 'Low'
+                ELSE 'Rest Day'
+            END;
+        """,
+    ]
+
+
+# DAILY_FEATURES_QUERY plus the four scores, computed with the scoring macros.
+SCORED_FEATURES_QUERY = f"""
+SELECT
+    *,
+    calculate_health_score(sleep_score, activity_score, recovery_score) AS health_score
+FROM (
+    SELECT
+        *,
+        calculate_recovery_score(
+            hrv_rmssd, resting_hr, sleep_score, spo2_avg, breathing_rate
+        ) AS recovery_score
+    FROM (
+        SELECT
+            *,
+            calculate_sleep_score(
+                efficiency, total_minutes_asleep, minutes_rem, minutes_deep,
+                minutes_to_fall_asleep, waso
+            ) AS sleep_score,
+            calculate_activity_score(
+                steps, active_minutes_total, minutes_very_active, active_zone_minutes
+            ) AS activity_score
+        FROM ({DAILY_FEATURES_QUERY})
+    )
+)
+"""
+
+
+def install_scoring_macros(storage: DuckDBStorage) -> None:
+    for stmt in get_scoring_macros():
+        storage.execute(stmt)
+
+
+@profiled("features.daily")
+def refresh_daily_features(
+    storage: DuckDBStorage,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    dates: Iterable[str] | None = None,
+    device: str | None = None,
+) -> int:
+    """
+    Recompute daily_features inside DuckDB for the given dates.
+
+    Pass a start/end range or an explicit list of changed dates; with neither,
+    the whole history is rescored. Returns the number of rows written.
+    """
+    install_scoring_macros(storage)
+
+    conditions = []
+    params: list[Any] = []
+    if dates is not None:
+        dates = list(dates)
+        if not dates:
+            return 0
+        conditions.append("date IN (SELECT unnest(CAST(? AS DATE[])))")
+        params.append(dates)
+    if start_date:
+        conditions.append("date >= CAST(? AS DATE)")
+        params.append(start_date)
+    if end_date:
+        conditions.append("date <= CAST(? AS DATE)")
+        params.append(end_date)
+    if device:
+        conditions.append("device = ?")
+        params.append(device)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    query = f"""
+    INSERT OR REPLACE INTO daily_features (
+        date, device, sleep_score, recovery_score, activity_score, health_score
+    )
+    SELECT date, device, sleep_score, recovery_score, activity_score, health_score
+    FROM ({SCORED_FEATURES_QUERY})
+    {where}
+    """
+    rows = int(storage.execute(query, params).fetchone()[0])
+    storage.bump_version("daily_features")
+    logger.info(f"Refreshed {rows} daily_features rows")
+    return rows
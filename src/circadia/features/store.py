@@ -0,0 +1,155 @@
+import logging
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ..storage import DuckDBStorage
+from ..telemetry import profiled
+from .batch import FeatureBatch
+from .graph import DEFAULT_GRAPH, FeatureGraph, FeatureNode
+
+logger = logging.getLogger(__name__)
+
+
+def input_hashes(batch: FeatureBatch, inputs: Iterable[str], lineage: str = "") -> np.ndarray:
+    """Per-row uint64 hash of the given input columns and the feature lineage."""
+    frame = pd.DataFrame(batch.to_matrix(list(inputs)))
+    frame["lineage"] = lineage
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+class FeatureStore:
+    """
+    Computed features persisted per (date, device, feature_name, feature_version).
+
+    Each stored value carries a hash of the source columns it was computed
+    from and of the versions of every node upstream of it. On load, a value is
+    reused while that hash still matches; otherwise, or when the feature's
+    version has been bumped, it is recomputed and written back. Values from
+    older versions are kept, so the table records which version produced what.
+    """
+
+    def __init__(self, storage: DuckDBStorage, graph: FeatureGraph | None = None):
+        self.storage = storage
+        self.graph = (graph or DEFAULT_GRAPH).copy()
+
+    def register(self, node: FeatureNode) -> None:
+        self.graph.add(node)
+
+    def _stored(self, node: FeatureNode, batch: FeatureBatch, device: str | None) -> pd.DataFrame:
+        conditions = ["feature_name = ?", "feature_version = ?"]
+        params: list[Any] = [node.name, node.version]
+        if len(batch):
+            conditions.append("date BETWEEN ? AND ?")
+            params.extend([batch.dates.min().item(), batch.dates.max().item()])
+        if device:
+            conditions.append("device = ?")
+            params.append(device)
+        stored: pd.DataFrame = self.storage.query(
+            f"""
+            SELECT date, device, value, input_hash FROM feature_store
+            WHERE {" AND ".join(conditions)}
+            """,
+            params,
+        ).to_pandas()
+        return stored
+
+    def _lookup(
+        self, node: FeatureNode, batch: FeatureBatch, hashes: np.ndarray, device: str | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Stored values aligned to batch rows, and a mask of rows that need computing."""
+        keys = pd.DataFrame({"date": batch.dates, "device": batch.devices, "input_hash": hashes})
+        stored = self._stored(node, batch, device)
+        keys["date"] = keys["date"].astype("datetime64[s]")
+        stored["date"] = stored["date"].astype("datetime64[s]")
+        # A stored value is fresh only if it was computed from identical inputs.
+        merged = keys.merge(stored, on=["date", "device", "input_hash"], how="left", indicator=True)
+
+        values = merged["value"].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        stale = (merged["_merge"] == "left_only").to_numpy()
+        return values, stale
+
+    def evaluate(
+        self, batch: FeatureBatch, names: Iterable[str], device: str | None = None
+    ) -> FeatureBatch:
+        """
+        Add the requested node columns to batch, like FeatureGraph.evaluate.
+
+        Values come from the store where fresh; the stale rows of all requested
+        nodes are evaluated together, so shared dependencies run once, and
+        written back.
+        """
+        nodes = [self.graph[name] for name in dict.fromkeys(names) if name in self.graph]
+        hashes, values, stale = {}, {}, {}
+        for node in nodes:
+            hashes[node.name] = input_hashes(
+                batch, self.graph.sources([node.name]), self.graph.lineage(node.name)
+            )
+            values[node.name], stale[node.name] = self._lookup(
+                node, batch, hashes[node.name], device
+            )
+
+        pending = [node.name for node in nodes if stale[node.name].any()]
+        if pending:
+            any_stale = np.logical_or.reduce([stale[name] for name in pending])
+            computed = self.graph.evaluate(batch[any_stale], pending)
+            rows = []
+            for name in pending:
+                mask = stale[name]
+                values[name][mask] = computed[name][mask[any_stale]]
+                rows.append(
+                    pd.DataFrame(
+                        {
+                            "date": batch.dates[mask],
+                            "device": batch.devices[mask],
+                            "feature_name": name,
+                            "feature_version": self.graph[name].version,
+                            "value": values[name][mask],
+                            "input_hash": hashes[name][mask],
+                            "computed_at": datetime.now(),
+                        }
+                    )
+                )
+                logger.info(
+                    f"Computed {name} v{self.graph[name].version} for {int(mask.sum())} "
+                    f"of {len(batch)} rows"
+                )
+            self.storage.upsert("feature_store", pd.concat(rows, ignore_index=True))
+
+        return batch.with_columns(**values)
+
+    @profiled("features.store")
+    def load(
+        self,
+        names: Iterable[str] | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        device: str | None = None,
+    ) -> FeatureBatch:
+        """
+        Batch holding exactly the requested columns (every graph node by default).
+
+        Only the source columns the requested names depend on are read.
+        """
+        names = list(self.graph.nodes) if names is None else list(dict.fromkeys(names))
+        batch = FeatureBatch.from_storage(
+            self.storage, start_date, end_date, device, columns=self.graph.sources(names)
+        )
+        return self.evaluate(batch, names, device).select(names)
+
+    def prune(self, name: str | None = None) -> int:
+        """Delete values from superseded feature versions."""
+        deleted = 0
+        for node in self.graph.nodes.values():
+            if name is not None and node.name != name:
+                continue
+            deleted += self.storage.execute(
+                "DELETE FROM feature_store WHERE feature_name = ? AND feature_version <> ?",
+                [node.name, node.version],
+            ).fetchone()[0]
+        if deleted:
+            self.storage.bump_version("feature_store")
+        return deleted
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+if TYPE_CHECKING:
+    from typing import TypeAlias
+
+    # batch.py imports this module, so FeatureBatch is only named for type checking.
+    from .batch import FeatureBatch
+
+    ColumnarInput: TypeAlias = (
+        Mapping[str, Any] | pd.DataFrame | pa.Table | pa.RecordBatch | FeatureBatch
+    )
+
+
+def _column(data: ColumnarInput, name: str) -> np.ndarray:
+    if isinstance(data, (pa.Table, pa.RecordBatch)):
+        values = data.column(name).to_numpy(zero_copy_only=False)
+    else:
+        values = data[name]
+        if isinstance(values, pd.Series):
+            values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.atleast_1d(np.asarray(values, dtype=np.float64))
+
+
+def _has_column(data: ColumnarInput, name: str) -> bool:
+    if isinstance(data, (pa.Table, pa.RecordBatch)):
+        return name in data.schema.names
+    return name in data
+
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    """
+    Vectorized equivalent of round(x, 1).
+
+    np.round scales by ten before rounding half-to-even, so it can disagree
+    with Python's correctly rounded round() when x * 10 sits on a .5 boundary.
+    Those few values are handed to round() so batch and scalar scores match.
+    """
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half & np.isfinite(values)):
+        rounded[i] = round(float(values[i]), 1)
+    return rounded
+
+
+def calculate_sleep_score_batch(data: ColumnarInput) -> np.ndarray:
+    """
+    Vectorized calculate_sleep_score over columns named like SleepFeatures fields:
+    efficiency, total_minutes_asleep, minutes_rem, minutes_deep,
+    minutes_to_fall_asleep and waso. Rows with missing inputs score NaN.
+    """
+    efficiency = _column(data, "efficiency")
+    duration = _column(data, "total_minutes_asleep")
+    rem = _column(data, "minutes_rem")
+    deep = _column(data, "minutes_deep")
+    latency = _column(data, "minutes_to_fall_asleep")
+    waso = _column(data, "waso")
+
+    efficiency_score = np.minimum(efficiency / 100 * 30, 30)
+
+    target_minutes = 480
+    duration_score = np.where(duration >= target_minutes, 25, (duration / target_minutes) * 25)
+
+    has_sleep = duration > 0
+    safe_duration = np.where(has_sleep, duration, 1)
+    rem_pct = (rem / safe_duration) * 100
+    deep_pct = (deep / safe_duration) * 100
+    rem_score = np.where(has_sleep, np.minimum(rem_pct / 25 * 15, 15), 0)
+    deep_score = np.where(has_sleep, np.minimum(deep_pct / 20 * 15, 15), 0)
+
+    latency_score = np.select([latency <= 15, latency <= 30], [10, 5], 0)
+
+    waso_score = np.maximum(5 - (waso / 10), 0)
+
+    total = efficiency_score + duration_score + rem_score + deep_score + latency_score + waso_score
+    # Guarded branches (zero duration, latency bands) can hide a missing input.
+    missing = np.isnan(np.stack([efficiency, duration, rem, deep, latency, waso])).any(axis=0)
+    total[missing] = np.nan
+
+    return _round1(total)
+
+
+def calculate_activity_score_batch(data: ColumnarInput) -> np.ndarray:
+    """
+    Vectorized calculate_activity_score over columns named like ActivityFeatures
+    fields: steps, active_minutes_total, minutes_very_active and active_zone_minutes.
+    Rows with missing inputs score NaN.
+    """
+    steps = _column(data, "steps")
+    active_total = _column(data, "active_minutes_total")
+    very_active = _column(data, "minutes_very_active")
+    zone_minutes = _column(data, "active_zone_minutes")
+
+    steps_score = np.select(
+        [steps >= 10000, steps >= 7500, steps >= 5000, steps >= 2500],
+        [35, 28, 21, 14],
+        (steps / 2500) * 14,
+    )
+
+    target_active = 30
+    active_score = np.minimum((active_total / target_active) * 35, 35)
+
+    has_active = active_total > 0
+    very_pct = very_active / np.where(has_active, active_total, 1)
+    intensity_score = np.where(has_active, np.minimum(very_pct * 20, 20), 0)
+
+    zone_score = np.minimum(zone_minutes / 30 * 10, 10)
+
+    total = steps_score + active_score + intensity_score + zone_score
+    total[np.isnan(np.stack([steps, active_total, very_active, zone_minutes])).any(axis=0)] = np.nan
+
+    return _round1(total)
+
+
+def calculate_recovery_score_batch(data: ColumnarInput) -> np.ndarray:
+    """
+    Vectorized calculate_recovery_score over columns named like RecoveryFeatures
+    fields: hrv_rmssd, resting_hr, sleep_score, spo2_avg and breathing_rate.
+    Missing values (NaN/null) take the same branches as None in the scalar version.
+    """
+    hrv = _column(data, "hrv_rmssd")
+    rhr = _column(data, "resting_hr")
+    sleep = _column(data, "sleep_score")
+    spo2 = _column(data, "spo2_avg")
+    br = _column(data, "breathing_rate")
+
+    hrv_score = np.select(
+        [np.isnan(hrv), hrv >= 50, hrv >= 30, hrv >= 20],
+        [0, 30, 20, 10],
+        5,
+    )
+    rhr_score = np.select(
+        [np.isnan(rhr), rhr <= 50, rhr <= 60, rhr <= 70],
+        [0, 20, 15, 10],
+        5,
+    )
+    sleep_score = sleep * 0.3
+    spo2_score = np.select(
+        [np.isnan(spo2), spo2 >= 97, spo2 >= 95, spo2 >= 93],
+        [0, 10, 7, 4],
+        0,
+    )
+    br_score = np.select(
+        [np.isnan(br), (br >= 12) & (br <= 16), (br >= 10) & (br <= 18)],
+        [0, 10, 6],
+        2,
+    )
+
+    total = _round1(hrv_score + rhr_score + sleep_score + spo2_score + br_score)
+    return np.where(np.isnan(hrv) & np.isnan(rhr), 50.0, total)
+
+
+def calculate_health_score_batch(
+    sleep_scores: np.ndarray,
+    activity_scores: np.ndarray,
+    recovery_scores: np.ndarray,
+) -> np.ndarray:
+    """Vectorized calculate_health_score from already computed component scores."""
+    health = recovery_scores * 0.4 + sleep_scores * 0.35 + activity_scores * 0.25
+    return _round1(np.asarray(health, dtype=np.float64))
+
+
+def calculate_scores_batch(
+    data: ColumnarInput, sleep_score: np.ndarray | None = None
+) -> dict[str, np.ndarray]:
+    """
+    Score a whole history in one pass.
+
+    data holds the sleep, activity and recovery columns side by side (one row
+    per date/device). The recovery score uses the computed sleep score unless
+    the input already carries a sleep_score column or one is passed in.
+    """
+    sleep_scores = calculate_sleep_score_batch(data)
+    activity_scores = calculate_activity_score_batch(data)
+
+    if sleep_score is None:
+        sleep_score = (
+            _column(data, "sleep_score") if _has_column(data, "sleep_score") else sleep_scores
+        )
+
+    recovery_input = {
+        name: _column(data, name)
+        for name in ("hrv_rmssd", "resting_hr", "spo2_avg", "breathing_rate")
+    }
+    recovery_input["sleep_score"] = sleep_score
+    recovery_scores = calculate_recovery_score_batch(recovery_input)
+
+    return {
+        "sleep_score": sleep_scores,
+        "activity_score": activity_scores,
+        "recovery_score": recovery_scores,
+        "health_score": calculate_health_score_batch(
+            sleep_scores, activity_scores, recovery_scores
+        ),
+    }
@@ -1,14 +1,41 @@
 import logging
+import re
 import time
 from typing import Any, Optional
 
 import httpx
 import pytz
 
+from ..telemetry import REGISTRY
 from .auth import FitbitAuth
 
 logger = logging.getLogger(__name__)
 
+API_REQUESTS = REGISTRY.counter(
+    "circadia_api_requests_total", "Fitbit API responses", ["endpoint", "status"]
+)
+API_SECONDS = REGISTRY.histogram(
+    "circadia_api_request_seconds", "Fitbit API request latency", ["endpoint"]
+)
+API_BYTES = REGISTRY.counter(
+    "circadia_api_response_bytes_total", "Fitbit API response body bytes", ["endpoint"]
+)
+RATE_LIMIT_REMAINING = REGISTRY.gauge(
+    "circadia_api_rate_limit_remaining", "Requests left in the current Fitbit rate limit window"
+)
+BACKOFF_SECONDS = REGISTRY.counter(
+    "circadia_api_backoff_seconds_total", "Time spent sleeping before retries", ["reason"]
+)
+RETRIES = REGISTRY.counter("circadia_api_retries_total", "Fitbit API retries", ["reason"])
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_ID = re.compile(r"/\d{3,}(?=[/.]|$)")
+
+
+def endpoint_label(url: str) -> str:
+    """URL path with dates and ids replaced, so each endpoint is one label value."""
+    return _ID.sub("/{id}", _DATE.sub("{date}", url))
+
 
 class FitbitRateLimitError(Exception):
     def __init__(self, retry_after: int):
@@ -47,11 +74,19 @@ class FitbitClient:
         retry_count: int = 0,
     ) -> dict[str, Any] | httpx.Response:
         full_url = f"{self.BASE_URL}{url}"
+        endpoint = endpoint_label(url)
 
         try:
+            start = time.perf_counter()
             response = self.client.request(
                 method, full_url, headers=self._get_headers(), params=params
             )
+            API_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            API_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            API_BYTES.inc(len(response.content), endpoint=endpoint)
+            remaining = response.headers.get("Fitbit-Rate-Limit-Remaining")
+            if remaining is not None:
+                RATE_LIMIT_REMAINING.set(float(remaining))
 
             if response.status_code == 200:
                 if url.endswith(".tcx"):
@@ -61,17 +96,22 @@ class FitbitClient:
             elif response.status_code == 429:
                 retry_after = int(response.headers.get("Fitbit-Rate-Limit-Reset", 300)) + 60
                 logger.warning(f"Rate limited. Retrying after {retry_after} seconds")
+                RETRIES.inc(reason="rate_limit")
+                BACKOFF_SECONDS.inc(retry_after, reason="rate_limit")
                 time.sleep(retry_after)
                 return self._request(method, url, params, retry_count + 1)
 
             elif response.status_code == 401:
                 logger.warning("Token expired, refreshing...")
+                RETRIES.inc(reason="token_expired")
                 self.auth.refresh()
                 return self._request(method, url, params, retry_count)
 
             elif response.status_code in (500, 502, 503, 504):
                 if retry_count < 3:
                     logger.warning(f"Server error {response.status_code}, retrying...")
+                    RETRIES.inc(reason="server_error")
+                    BACKOFF_SECONDS.inc(120, reason="server_error")
                     time.sleep(120)
                     return self._request(method, url, params, retry_count + 1)
                 raise Exception(f"Server error after 3 retries: {response.status_code}")
@@ -82,6 +122,9 @@ class FitbitClient:
 
         except httpx.ConnectError as e:
             logger.error(f"Connection error: {e}, retrying in 30 seconds")
+            API_REQUESTS.inc(endpoint=endpoint, status="connection_error")
+            RETRIES.inc(reason="connection_error")
+            BACKOFF_SECONDS.inc(30, reason="connection_error")
             time.sleep(30)
             return self._request(method, url, params, retry_count + 1)
 
@@ -1,10 +1,26 @@
+from .dataset import DatasetBuilder, TrainingSet
+from .incremental import IncrementalTrainer
 from .model import CircadiaModel, get_default_features
-from .train import ModelTrainer
 from .predict import Predictor
+from .registry import ModelMetadata, ModelRegistry, hash_training_data, load_model
+from .service import ScoringClient, ScoringService
+from .train import ModelTrainer
+from .tuning import PARAM_GRIDS, HyperparameterSearch
 
 __all__ = [
+    "PARAM_GRIDS",
     "CircadiaModel",
-    "get_default_features",
+    "DatasetBuilder",
+    "HyperparameterSearch",
+    "IncrementalTrainer",
+    "ModelMetadata",
+    "ModelRegistry",
     "ModelTrainer",
     "Predictor",
+    "ScoringClient",
+    "ScoringService",
+    "TrainingSet",
+    "get_default_features",
+    "hash_training_data",
+    "load_model",
 ]
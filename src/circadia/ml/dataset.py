@@ -0,0 +1,165 @@
+import logging
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from ..features.batch import FeatureBatch, daily_features_sql
+from ..features.graph import FeatureGraph
+from ..features.store import FeatureStore
+from ..storage import DuckDBStorage
+from ..storage.export import DEFAULT_BATCH_SIZE, _record_batch_reader
+from ..telemetry import profiled
+from .model import MISSING_FILL_VALUE, get_default_features
+
+logger = logging.getLogger(__name__)
+
+# Targets that are trained on a different column than their name.
+TARGET_COLUMNS = {"sleep_score": "total_minutes_asleep"}
+
+
+def target_column(target: str) -> str:
+    return TARGET_COLUMNS.get(target, target)
+
+
+@dataclass
+class TrainingSet:
+    X: np.ndarray
+    # One column per target, in targets order.
+    Y: np.ndarray
+    dates: np.ndarray
+    feature_names: list[str]
+    targets: list[str]
+
+    @property
+    def target(self) -> str:
+        return self.targets[0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.Y[:, 0]
+
+    def target_values(self, target: str) -> np.ndarray:
+        return self.Y[:, self.targets.index(target)]
+
+    def __len__(self) -> int:
+        return len(self.Y)
+
+
+class DatasetBuilder:
+    """
+    Streams the training matrix out of DuckDB without materializing the join.
+
+    Rows arrive as Arrow record batches of batch_size rows. Graph features such
+    as sleep_score are read per batch through the FeatureStore, the same values
+    prediction uses, and each batch is written once into preallocated arrays
+    (build) or handed to the caller (iter_batches), so peak memory is the
+    output arrays plus one batch however many devices and years are selected.
+    Missing values are filled with 0, rows without a resting heart rate are
+    skipped, and rows come out in date order. Pass several targets to read all
+    of them in the same pass.
+    """
+
+    def __init__(
+        self,
+        storage: DuckDBStorage,
+        feature_names: Sequence[str] | None = None,
+        target: str | Sequence[str] = "sleep_score",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dtype: Any = np.float32,
+        graph: FeatureGraph | None = None,
+    ):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.storage = storage
+        self.feature_names = list(feature_names or get_default_features())
+        self.targets = [target] if isinstance(target, str) else list(dict.fromkeys(target))
+        if not self.targets:
+            raise ValueError("At least one target is required")
+        self.target_columns = [target_column(name) for name in self.targets]
+        self.batch_size = batch_size
+        self.dtype = np.dtype(dtype)
+        self.store = FeatureStore(storage, graph)
+        self.graph = self.store.graph
+
+    def _query(
+        self, start_date: str | None, end_date: str | None, device: str | None
+    ) -> tuple[str, list[Any]]:
+        return daily_features_sql(
+            self.graph.sources([*self.feature_names, *self.target_columns]),
+            start_date,
+            end_date,
+            device,
+            conditions=["resting_hr IS NOT NULL"],
+            order_by="date, device",
+        )
+
+    def _batches(
+        self, cursor: Any, query: str, params: list[Any], device: str | None
+    ) -> Iterator[FeatureBatch]:
+        nodes = [
+            name
+            for name in dict.fromkeys([*self.feature_names, *self.target_columns])
+            if name in self.graph
+        ]
+        result = cursor.execute(query, params)
+        for record_batch in _record_batch_reader(result, self.batch_size):
+            if record_batch.num_rows:
+                yield self.store.evaluate(FeatureBatch.from_arrow(record_batch), nodes, device)
+
+    def iter_batches(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        device: str | None = None,
+    ) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (X, y, dates) per record batch for the first target, e.g. to feed partial_fit."""
+        query, params = self._query(start_date, end_date, device)
+        cursor = self.storage.conn.cursor()
+        try:
+            for batch in self._batches(cursor, query, params, device):
+                X = batch.to_matrix(
+                    self.feature_names, fill_value=MISSING_FILL_VALUE, dtype=self.dtype
+                )
+                y = np.nan_to_num(batch[self.target_columns[0]], nan=0.0).astype(self.dtype)
+                yield X, y, batch.dates
+        finally:
+            cursor.close()
+
+    @profiled("train.dataset")
+    def build(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        device: str | None = None,
+    ) -> TrainingSet:
+        query, params = self._query(start_date, end_date, device)
+        cursor = self.storage.conn.cursor()
+        try:
+            # Count and stream in one transaction so both see the same rows.
+            cursor.execute("BEGIN TRANSACTION")
+            count = cursor.execute(f"SELECT count(*) FROM ({query})", params).fetchone()
+            rows = int(count[0]) if count else 0
+            X = np.empty((rows, len(self.feature_names)), dtype=self.dtype)
+            Y = np.empty((rows, len(self.targets)), dtype=self.dtype)
+            dates = np.empty(rows, dtype="datetime64[D]")
+
+            offset = 0
+            for batch in self._batches(cursor, query, params, device):
+                stop = offset + len(batch)
+                batch.to_matrix(
+                    self.feature_names, fill_value=MISSING_FILL_VALUE, out=X[offset:stop]
+                )
+                batch.to_matrix(self.target_columns, fill_value=0.0, out=Y[offset:stop])
+                dates[offset:stop] = batch.dates
+                offset = stop
+            cursor.execute("COMMIT")
+        finally:
+            cursor.close()
+
+        logger.info(
+            f"Built {rows} x {len(self.feature_names)} training set "
+            f"({(X.nbytes + Y.nbytes) / 1e6:.1f} MB)"
+        )
+        return TrainingSet(X, Y, dates, self.feature_names, self.targets)
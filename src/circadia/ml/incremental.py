@@ -0,0 +1,130 @@
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+
+from ..storage import DuckDBStorage
+from .dataset import DatasetBuilder
+from .model import CircadiaModel
+from .registry import ModelMetadata, ModelRegistry, hash_training_data
+from .train import ModelTrainer
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalTrainer:
+    """
+    Keeps a registered model current by training only on days it has not seen.
+
+    Each update reads the rows after the model's trained_through date and
+    folds them in with CircadiaModel.partial_fit. A full refit (with CV)
+    replaces the incremental path when there is no model yet, when
+    full_refit_days have passed since the last one, or when the new rows have
+    drifted from the scaler statistics the model was trained with. Model
+    types without partial_fit (tree ensembles, ridge) are refitted on the
+    trailing refit_window_days instead.
+    """
+
+    def __init__(
+        self,
+        storage: DuckDBStorage,
+        registry: ModelRegistry,
+        name: str = "sleep_score",
+        target: str = "sleep_score",
+        model_type: str = "sgd",
+        full_refit_days: int = 30,
+        drift_threshold: float = 4.0,
+        refit_window_days: int = 365,
+    ):
+        self.storage = storage
+        self.registry = registry
+        self.name = name
+        self.target = target
+        self.model_type = model_type
+        self.full_refit_days = full_refit_days
+        self.drift_threshold = drift_threshold
+        self.refit_window_days = refit_window_days
+        self.trainer = ModelTrainer(storage)
+
+    def _load_current(self) -> tuple[CircadiaModel | None, ModelMetadata | None]:
+        if not self.registry.versions(self.name):
+            return None, None
+        metadata = self.registry.metadata(self.name)
+        # A private, writable copy: models from the registry cache are shared and mmapped.
+        model = CircadiaModel().load(self.registry.artifact_path(self.name, metadata.version))
+        return model, metadata
+
+    @staticmethod
+    def drift_score(model: CircadiaModel, X: np.ndarray) -> float:
+        """Largest per-feature z-score of the new rows' mean against the cached scaler stats."""
+        scaler = model.pipeline.named_steps["scaler"]
+        scale = np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+        z = np.abs(X.mean(axis=0) - scaler.mean_) / (scale / np.sqrt(len(X)))
+        return float(z.max())
+
+    def full_refit(self) -> ModelMetadata:
+        result = self.trainer.train(self.target, self.model_type)
+        return self.registry.register_training(result, self.name)
+
+    def window_refit(self, model: CircadiaModel, through: date) -> ModelMetadata:
+        """Refit from scratch on the refit_window_days ending at through."""
+        start = through - timedelta(days=self.refit_window_days - 1)
+        result = self.trainer.train(
+            self.target, model.model_type, start_date=start.isoformat(), params=model.params
+        )
+        return self.registry.register_training(result, self.name)
+
+    def update(self, today: date | None = None) -> ModelMetadata | None:
+        """Bring the model up to date. Returns the new version, or None if there was nothing new."""
+        model, metadata = self._load_current()
+        if model is None or metadata is None or metadata.trained_through is None:
+            logger.info(f"No trained {self.name} model yet, running a full fit")
+            return self.full_refit()
+
+        today = today or date.today()
+        if (
+            metadata.last_full_fit is None
+            or (today - date.fromisoformat(metadata.last_full_fit)).days >= self.full_refit_days
+        ):
+            logger.info(f"Scheduled full refit of {self.name}")
+            return self.full_refit()
+
+        start = date.fromisoformat(metadata.trained_through) + timedelta(days=1)
+        # Same loader, fill value and dtype as the full fit the model came from.
+        builder = DatasetBuilder(self.storage, model.feature_names, self.target)
+        dataset = builder.build(start_date=start.isoformat())
+        if not len(dataset):
+            logger.info(f"{self.name} is up to date through {metadata.trained_through}")
+            return None
+        X, y = dataset.X, dataset.y
+        trained_through = str(dataset.dates.max())
+
+        if not model.supports_partial_fit:
+            logger.info(f"Refitting {self.name} on the last {self.refit_window_days} days")
+            return self.window_refit(model, date.fromisoformat(trained_through))
+
+        drift = self.drift_score(model, X)
+        if drift > self.drift_threshold:
+            logger.warning(f"Input drift {drift:.1f} exceeds threshold, refitting {self.name}")
+            return self.full_refit()
+
+        try:
+            model.partial_fit(X, y)
+        except (TypeError, ValueError) as e:
+            logger.info(f"{e}, running a full refit")
+            return self.full_refit()
+
+        logger.info(f"Updated {self.name} with {len(y)} new days")
+        return self.registry.register(
+            model,
+            self.name,
+            target=self.target,
+            training_start=metadata.training_start,
+            training_end=trained_through,
+            n_samples=(metadata.n_samples or 0) + len(y),
+            metrics={**metadata.metrics, "incremental_rows": len(y), "drift": drift},
+            # The model now reflects its previous data followed by the new rows.
+            data_hash=hash_training_data(X, y, previous=metadata.data_hash),
+            trained_through=trained_through,
+            last_full_fit=metadata.last_full_fit,
+        )
@@ -1,12 +1,18 @@
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any
 
+import joblib
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.linear_model import Ridge
-from sklearn.model_selection import cross_val_score
-from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge, SGDRegressor
+from sklearn.model_selection import TimeSeriesSplit, cross_val_score
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ..features.batch import FeatureBatch
+
+# Stands in for missing feature values, in training and prediction alike.
+MISSING_FILL_VALUE = 0.0
 
 
 class CircadiaModel:
@@ -14,14 +20,36 @@ class CircadiaModel:
         self,
         model_type: str = "gradient_boosting",
         random_state: int = 42,
+        params: dict[str, Any] | None = None,
     ):
         self.model_type = model_type
         self.random_state = random_state
-        self.model: Optional[Pipeline] = None
+        # Regressor hyperparameters overriding the defaults below, e.g. from tuning.
+        self.params = dict(params or {})
+        self.model: Pipeline | None = None
         self.feature_names: list[str] = []
+        # LagSpec settings for models trained on lagged features to forecast the next day.
+        self.lag_spec: dict[str, Any] | None = None
         self.is_fitted = False
 
-    def _create_pipeline(self) -> Pipeline:
+    @property
+    def horizon(self) -> int:
+        """Days between the features' date and the predicted day."""
+        return 1 if self.lag_spec is not None else 0
+
+    @property
+    def pipeline(self) -> Pipeline:
+        """The fitted scaler and regressor."""
+        if self.model is None:
+            raise ValueError("Model not fitted. Call fit() first.")
+        return self.model
+
+    @property
+    def supports_partial_fit(self) -> bool:
+        """Whether the regressor can learn from new rows without a full refit (sgd)."""
+        return hasattr(self._create_regressor(), "partial_fit")
+
+    def _create_regressor(self) -> Any:
         if self.model_type == "random_forest":
             regressor = RandomForestRegressor(
                 n_estimators=100,
@@ -30,6 +58,8 @@ class CircadiaModel:
             )
         elif self.model_type == "ridge":
             regressor = Ridge(alpha=1.0)
+        elif self.model_type == "sgd":
+            regressor = SGDRegressor(alpha=1e-4, random_state=self.random_state)
         else:
             regressor = GradientBoostingRegressor(
                 n_estimators=100,
@@ -38,29 +68,63 @@ class CircadiaModel:
                 random_state=self.random_state,
             )
 
+        regressor.set_params(**self.params)
+        return regressor
+
+    def _create_pipeline(self) -> Pipeline:
         return Pipeline(
             [
                 ("scaler", StandardScaler()),
-                ("regressor", regressor),
+                ("regressor", self._create_regressor()),
             ]
         )
 
-    def fit(self, X: np.ndarray, y: np.ndarray) -> "CircadiaModel":
+    def _as_matrix(self, X: np.ndarray | FeatureBatch) -> np.ndarray:
+        if not isinstance(X, FeatureBatch):
+            return X
+        if not self.feature_names:
+            self.feature_names = get_default_features()
+        return X.to_matrix(self.feature_names, fill_value=MISSING_FILL_VALUE)
+
+    def fit(self, X: np.ndarray | FeatureBatch, y: np.ndarray) -> "CircadiaModel":
+        X = self._as_matrix(X)
         self.model = self._create_pipeline()
         self.model.fit(X, y)
         self.is_fitted = True
         return self
 
-    def predict(self, X: np.ndarray) -> np.ndarray:
+    def partial_fit(self, X: np.ndarray | FeatureBatch, y: np.ndarray) -> "CircadiaModel":
+        """
+        Update a fitted model with new rows only, folding them into the cached
+        scaler statistics as well. Only estimators with their own partial_fit
+        (sgd) qualify; tree ensembles and ridge need a fit() on a data window.
+        """
+        X = self._as_matrix(X)
         if not self.is_fitted:
+            return self.fit(X, y)
+        if not self.supports_partial_fit:
+            raise ValueError(f"{self.model_type} models cannot be updated incrementally")
+
+        scaler = self.pipeline.named_steps["scaler"]
+        scaler.partial_fit(X)
+        self.pipeline.named_steps["regressor"].partial_fit(scaler.transform(X), y)
+        return self
+
+    def predict(self, X: np.ndarray | FeatureBatch) -> np.ndarray:
+        if not self.is_fitted or self.model is None:
             raise ValueError("Model not fitted. Call fit() first.")
-        return self.model.predict(X)
+        predictions: np.ndarray = self.model.predict(self._as_matrix(X))
+        return predictions
 
-    def cross_validate(self, X: np.ndarray, y: np.ndarray, cv: int = 5) -> dict[str, float]:
+    def cross_validate(
+        self, X: np.ndarray | FeatureBatch, y: np.ndarray, cv: int = 5
+    ) -> dict[str, float]:
+        X = self._as_matrix(X)
         if self.model is None:
             self.model = self._create_pipeline()
 
-        scores = cross_val_score(self.model, X, y, cv=cv, scoring="r2")
+        # Rows are in date order; each fold trains on the past and scores the future.
+        scores = cross_val_score(self.model, X, y, cv=TimeSeriesSplit(n_splits=cv), scoring="r2")
         return {
             "mean_r2": float(np.mean(scores)),
             "std_r2": float(np.std(scores)),
@@ -68,20 +132,35 @@ class CircadiaModel:
         }
 
     def save(self, path: Path) -> None:
-        import pickle
-
         if not self.is_fitted:
             raise ValueError("Model not fitted. Cannot save.")
 
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "wb") as f:
-            pickle.dump(self.model, f)
-
-    def load(self, path: Path) -> "CircadiaModel":
-        import pickle
+        # Uncompressed so the arrays can be memory-mapped on load.
+        joblib.dump(
+            {
+                "pipeline": self.model,
+                "model_type": self.model_type,
+                "feature_names": self.feature_names,
+                "random_state": self.random_state,
+                "params": self.params,
+                "lag_spec": self.lag_spec,
+            },
+            path,
+        )
 
-        with open(path, "rb") as f:
-            self.model = pickle.load(f)
+    def load(self, path: Path, mmap_mode: str | None = None) -> "CircadiaModel":
+        artifact = joblib.load(path, mmap_mode=mmap_mode)
+        if isinstance(artifact, Pipeline):
+            # Files written before save() kept the model type and feature names.
+            self.model = artifact
+        else:
+            self.model = artifact["pipeline"]
+            self.model_type = artifact["model_type"]
+            self.feature_names = list(artifact["feature_names"])
+            self.random_state = artifact.get("random_state", self.random_state)
+            self.params = artifact.get("params", {})
+            self.lag_spec = artifact.get("lag_spec")
         self.is_fitted = True
         return self
 
@@ -92,7 +171,7 @@ def get_default_features() -> list[str]:
         "hrv_rmssd",
         "sleep_score",
         "steps",
-        "active_minutes",
+        "active_minutes_total",
         "spo2_avg",
         "breathing_rate",
         "minutes_deep",
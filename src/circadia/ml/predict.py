@@ -1,11 +1,18 @@
 import logging
+from collections.abc import Iterable
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any
 
 import numpy as np
+import pandas as pd
 
+from ..features.batch import FeatureBatch
+from ..features.lagged import LaggedFeatures, LagSpec
+from ..features.store import FeatureStore
 from ..storage import DuckDBStorage
-from .model import CircadiaModel
+from ..telemetry import profiled
+from .model import MISSING_FILL_VALUE, CircadiaModel, get_default_features
+from .registry import load_model
 
 logger = logging.getLogger(__name__)
 
@@ -14,80 +21,123 @@ class Predictor:
     def __init__(self, storage: DuckDBStorage, model_path: Path):
         self.storage = storage
         self.model_path = model_path
-        self.model: Optional[CircadiaModel] = None
+        self.model: CircadiaModel | None = None
 
     def load_model(self) -> CircadiaModel:
         if not self.model_path.exists():
             raise FileNotFoundError(f"Model not found at {self.model_path}")
 
-        model = CircadiaModel()
-        model.load(self.model_path)
-        self.model = model
-        return model
-
-    def predict_next_day(self) -> dict[str, Any]:
-        if self.model is None:
-            self.load_model()
-
-        query = """
-        SELECT
-            r.date,
-            r.value as resting_hr,
-            h.daily_rmssd as hrv_rmssd,
-            s.efficiency as sleep_efficiency,
-            s.minutes_asleep,
-            s.minutes_deep,
-            s.minutes_rem,
-            a.steps,
-            a.active_minutes_total as active_minutes,
-            a.calories,
-            sp.avg as spo2_avg,
-            b.value as breathing_rate
-        FROM resting_hr r
-        LEFT JOIN hrv h ON r.date = h.date AND r.device = h.device
-        LEFT JOIN sleep_summary s ON r.date = s.date AND r.device = s.device
-        LEFT JOIN daily_summary a ON r.date = a.date AND r.device = a.device
-        LEFT JOIN spo2 sp ON r.date = sp.date AND r.device = sp.device
-        LEFT JOIN breathing_rate b ON r.date = b.date AND r.device = b.device
-        ORDER BY r.date DESC
-        LIMIT 1
+        self.model = load_model(self.model_path)
+        return self.model
+
+    def _loaded(self) -> CircadiaModel:
+        return self.model if self.model is not None else self.load_model()
+
+    @property
+    def feature_names(self) -> list[str]:
+        return self._loaded().feature_names or get_default_features()
+
+    def _feature_matrix(self, batch: FeatureBatch) -> np.ndarray:
+        """Model input for every row, with missing values filled as in training."""
+        return batch.to_matrix(self.feature_names, fill_value=MISSING_FILL_VALUE)
+
+    def load_features(
+        self,
+        dates: Iterable[str] | None = None,
+        devices: Iterable[str] | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> FeatureBatch:
+        """Feature rows for the given dates/devices (or range), read in a single query."""
+        if dates is not None:
+            dates = np.unique(np.asarray(list(dates), dtype="datetime64[D]"))
+            if len(dates):
+                start_date = start_date or str(dates[0])
+                end_date = end_date or str(dates[-1])
+        devices = list(devices) if devices is not None else None
+        device = devices[0] if devices is not None and len(devices) == 1 else None
+
+        names = [*self.feature_names, "resting_hr"]
+        lag_spec = self._loaded().lag_spec
+        if lag_spec is not None:
+            # Next-day models read the precomputed lagged rows.
+            lagged = LaggedFeatures(self.storage, LagSpec(**lag_spec))
+            batch = lagged.load(names, start_date, end_date, device)
+        else:
+            batch = FeatureStore(self.storage).load(names, start_date, end_date, device)
+        keep = ~np.isnan(batch["resting_hr"])
+        if dates is not None:
+            keep &= np.isin(batch.dates, dates)
+        if devices is not None:
+            keep &= np.isin(batch.devices, devices)
+        selected: FeatureBatch = batch[keep]
+        return selected
+
+    @profiled("predict.batch")
+    def predict_batch(self, batch: FeatureBatch) -> np.ndarray:
+        if not len(batch):
+            return np.empty(0)
+        return self._loaded().predict(self._feature_matrix(batch))
+
+    @profiled("predict.dates")
+    def predict_dates(
+        self,
+        dates: Iterable[str] | None = None,
+        devices: Iterable[str] | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> pd.DataFrame:
         """
+        Predict every requested date/device with one query and one model.predict call.
 
-        df = self.storage.execute(query).df()
+        Returns one row per date and device with the prediction made from that
+        day's features.
+        """
+        batch = self.load_features(dates, devices, start_date, end_date)
+        return pd.DataFrame(
+            {
+                "date": batch.dates,
+                "device": batch.devices,
+                "prediction": self.predict_batch(batch),
+            }
+        )
+
+    @profiled("predict.next_day")
+    def predict_next_day(self) -> dict[str, Any]:
+        batch = self.load_features()
 
-        if df.empty:
+        if not len(batch):
             raise ValueError("No recent data found for prediction")
 
-        features = [
-            df["resting_hr"].iloc[0] or 60,
-            df["hrv_rmssd"].iloc[0] or 30,
-            df["sleep_efficiency"].iloc[0] or 85,
-            df["steps"].iloc[0] or 5000,
-            df["active_minutes"].iloc[0] or 20,
-            df["spo2_avg"].iloc[0] or 97,
-            df["breathing_rate"].iloc[0] or 14,
-            df["minutes_deep"].iloc[0] or 60,
-            df["minutes_rem"].iloc[0] or 90,
-            df["calories"].iloc[0] or 2000,
-        ]
-
-        X = np.array([features])
-        prediction = self.model.predict(X)[0]
+        latest = batch[[int(np.argmax(batch.dates))]]
+        X = self._feature_matrix(latest)
+        model = self._loaded()
+        prediction = model.predict(X)[0]
 
         return {
             "prediction": float(prediction),
-            "date": str(df["date"].iloc[0]),
-            "features": dict(zip(self.model.feature_names, features)),
+            "date": str(latest.dates[0]),
+            "target_date": str(latest.dates[0] + model.horizon),
+            "features": dict(zip(self.feature_names, X[0].tolist())),
         }
 
+    @profiled("predict.range")
     def predict_range(self, days: int = 7) -> list[dict[str, Any]]:
-        predictions = []
-        for _ in range(days):
-            try:
-                pred = self.predict_next_day()
-                predictions.append(pred)
-            except Exception as e:
-                logger.warning(f"Prediction failed: {e}")
-                break
-
-        return predictions
+        """Predictions for the most recent days with data, oldest first."""
+        try:
+            batch = self.load_features()
+            batch = batch[np.isin(batch.dates, np.unique(batch.dates)[-days:])]
+            predictions = self.predict_batch(batch)
+        except Exception:
+            logger.exception("Prediction failed")
+            return []
+
+        order = np.argsort(batch.dates, kind="stable")
+        return [
+            {
+                "prediction": float(predictions[i]),
+                "date": str(batch.dates[i]),
+                "device": batch.devices[i],
+            }
+            for i in order
+        ]
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .model import CircadiaModel
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_NAME = "model.joblib"
+METADATA_NAME = "metadata.json"
+HASH_BLOCK_ROWS = 65_536
+
+
+@dataclass
+class ModelMetadata:
+    name: str
+    version: int
+    model_type: str
+    feature_names: list[str]
+    params: dict[str, Any] = field(default_factory=dict)
+    target: str | None = None
+    training_start: str | None = None
+    training_end: str | None = None
+    n_samples: int | None = None
+    metrics: dict[str, Any] = field(default_factory=dict)
+    data_hash: str | None = None
+    # Last date the model has seen, and when it was last fitted from scratch.
+    trained_through: str | None = None
+    last_full_fit: str | None = None
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+
+def hash_training_data(X: np.ndarray, y: np.ndarray, previous: str | None = None) -> str:
+    """
+    Content hash of a training set, to tell whether two models saw the same data.
+
+    Pass the hash of the data a model was already trained on to hash an
+    incremental update as that data followed by X and y.
+    """
+    digest = hashlib.sha256()
+    if previous:
+        digest.update(previous.encode())
+    for array in (X, y):
+        digest.update(str(array.shape).encode())
+        # Hash in row blocks so a float32 set isn't copied whole into float64.
+        for start in range(0, len(array), HASH_BLOCK_ROWS):
+            block = np.ascontiguousarray(array[start : start + HASH_BLOCK_ROWS], dtype=np.float64)
+            digest.update(block.tobytes())
+    return digest.hexdigest()[:16]
+
+
+class _ModelCache:
+    """Process-wide LRU of loaded models keyed by artifact path and mtime."""
+
+    def __init__(self, max_models: int = 8):
+        self.max_models = max_models
+        self._models: OrderedDict[tuple[str, int], CircadiaModel] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path: Path, mmap_mode: str | None = "r") -> CircadiaModel:
+        path = path.resolve()
+        key = (str(path), path.stat().st_mtime_ns)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+        model = CircadiaModel().load(path, mmap_mode=mmap_mode)
+
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+MODEL_CACHE = _ModelCache()
+
+
+def load_model(path: Path, mmap_mode: str | None = "r") -> CircadiaModel:
+    """
+    Load a saved model through the process-wide cache.
+
+    Repeated loads of an unchanged artifact return the same shared instance,
+    so callers must not refit it. Arrays are memory-mapped read-only, so
+    processes loading the same file share its pages instead of each holding
+    a copy.
+    """
+    return MODEL_CACHE.load(path, mmap_mode=mmap_mode)
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on disk: <root>/<name>/<version>/{model.joblib,metadata.json}.
+
+    Versions are consecutive integers per name. Artifacts are written
+    uncompressed so their arrays can be memory-mapped on load.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def versions(self, name: str) -> list[int]:
+        directory = self.root / name
+        if not directory.exists():
+            return []
+        return sorted(
+            int(path.name)
+            for path in directory.iterdir()
+            if path.name.isdigit() and (path / ARTIFACT_NAME).exists()
+        )
+
+    def names(self) -> list[str]:
+        if not self.root.exists():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if self.versions(path.name))
+
+    def latest_version(self, name: str) -> int:
+        versions = self.versions(name)
+        if not versions:
+            raise FileNotFoundError(f"No registered versions of model {name} in {self.root}")
+        return versions[-1]
+
+    def artifact_path(self, name: str, version: int | None = None) -> Path:
+        version = self.latest_version(name) if version is None else version
+        return self.root / name / str(version) / ARTIFACT_NAME
+
+    def register(
+        self,
+        model: CircadiaModel,
+        name: str,
+        target: str | None = None,
+        training_start: str | None = None,
+        training_end: str | None = None,
+        n_samples: int | None = None,
+        metrics: dict[str, Any] | None = None,
+        data_hash: str | None = None,
+        trained_through: str | None = None,
+        last_full_fit: str | None = None,
+    ) -> ModelMetadata:
+        versions = self.versions(name)
+        version = versions[-1] + 1 if versions else 1
+        directory = self.root / name / str(version)
+
+        model.save(directory / ARTIFACT_NAME)
+        metadata = ModelMetadata(
+            name=name,
+            version=version,
+            model_type=model.model_type,
+            feature_names=list(model.feature_names),
+            params=dict(model.params),
+            target=target,
+            training_start=training_start,
+            training_end=training_end,
+            n_samples=n_samples,
+            metrics=metrics or {},
+            data_hash=data_hash,
+            trained_through=trained_through,
+            last_full_fit=last_full_fit,
+        )
+        (directory / METADATA_NAME).write_text(json.dumps(asdict(metadata), indent=2))
+        logger.info(f"Registered model {name} v{version}")
+        return metadata
+
+    def register_training(self, result: dict[str, Any], name: str | None = None) -> ModelMetadata:
+        """Register the output of ModelTrainer.train()."""
+        return self.register(
+            result["model"],
+            name or result["target"],
+            target=result["target"],
+            training_start=result.get("start_date"),
+            training_end=result.get("end_date"),
+            n_samples=result.get("n_samples"),
+            metrics=result.get("cv_results"),
+            data_hash=result.get("data_hash"),
+            trained_through=result.get("trained_through"),
+            last_full_fit=date.today().isoformat(),
+        )
+
+    def register_trainings(self, results: dict[str, dict[str, Any]]) -> dict[str, ModelMetadata]:
+        """Register the output of ModelTrainer.train_many(), one model per target."""
+        return {target: self.register_training(result) for target, result in results.items()}
+
+    def metadata(self, name: str, version: int | None = None) -> ModelMetadata:
+        path = self.artifact_path(name, version).with_name(METADATA_NAME)
+        return ModelMetadata(**json.loads(path.read_text()))
+
+    def load(self, name: str, version: int | None = None) -> CircadiaModel:
+        return load_model(self.artifact_path(name, version))
@@ -0,0 +1,405 @@
+import argparse
+import json
+import logging
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from ..storage import DuckDBStorage
+from .predict import Predictor
+from .registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+# Raised by malformed client requests; answered with an error instead of a prediction.
+_BAD_REQUEST = (AttributeError, KeyError, TypeError, ValueError)
+
+
+@dataclass
+class _Request:
+    model: str
+    date: str
+    device: str
+    future: Future[float] = field(default_factory=Future)
+    received: float = field(default_factory=time.perf_counter)
+
+
+class LatencyTracker:
+    """Rolling window of request latencies in milliseconds."""
+
+    def __init__(self, window: int = 10_000):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, milliseconds: float) -> None:
+        with self._lock:
+            self._samples.append(milliseconds)
+            self.total += 1
+
+    def summary(self) -> dict[str, float]:
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=np.float64)
+            total = self.total
+        if not samples.size:
+            return {"requests": total, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        p50, p99 = np.percentile(samples, [50, 99])
+        return {
+            "requests": total,
+            "p50_ms": float(p50),
+            "p99_ms": float(p99),
+            "max_ms": float(samples.max()),
+        }
+
+
+class ScoringService:
+    """
+    In-process scoring daemon that keeps models, features and the connection warm.
+
+    Requests from any thread are queued and a single worker thread drains
+    them in micro-batches: it waits up to max_wait_ms for more requests to
+    arrive, loads the features for every uncached (date, device) of a model in
+    one query and calls predict once. Predictions are cached per model version
+    until a writer bumps a data version, so repeat requests skip the model
+    entirely. The worker is the only thread that touches DuckDB.
+    """
+
+    def __init__(
+        self,
+        storage: DuckDBStorage,
+        registry: ModelRegistry,
+        default_device: str | None = None,
+        max_batch: int = 256,
+        max_wait_ms: float = 2.0,
+        cache_size: int = 100_000,
+        refresh_seconds: float = 1.0,
+    ):
+        self.storage = storage
+        self.registry = registry
+        self.default_device = default_device
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self.refresh_seconds = refresh_seconds
+        self.latency = LatencyTracker()
+
+        self._queue: queue.Queue[_Request | None] = queue.Queue()
+        self._predictors: dict[str, tuple[int, Predictor]] = {}
+        self._cache: OrderedDict[tuple[str, int, str, str], float] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._versions_checked = 0.0
+        self._worker: threading.Thread | None = None
+
+    def start(self) -> "ScoringService":
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="scoring", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self) -> None:
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def warm(self, models: Iterable[str]) -> None:
+        """Load models ahead of the first request. Call before serving."""
+        for name in models:
+            self._predictor(name)
+
+    def submit(self, model: str, date: str, device: str | None = None) -> Future[float]:
+        request = _Request(model, date, device or self.default_device or "")
+        self._queue.put(request)
+        return request.future
+
+    def predict(
+        self, model: str, date: str, device: str | None = None, timeout: float = 30.0
+    ) -> float:
+        return self.submit(model, date, device).result(timeout)
+
+    def predict_many(
+        self, requests: Iterable[dict[str, Any]], timeout: float = 30.0
+    ) -> list[dict[str, Any]]:
+        futures = [(r, self.submit(r["model"], r["date"], r.get("device"))) for r in requests]
+        results = []
+        for request, future in futures:
+            try:
+                error = future.exception(timeout)
+            except TimeoutError as e:
+                error = e
+            if error is None:
+                results.append({**request, "prediction": future.result()})
+            else:
+                results.append({**request, "error": str(error)})
+        return results
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self.latency.summary(),
+            "cached_predictions": len(self._cache),
+            "models": {name: version for name, (version, _) in self._predictors.items()},
+        }
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)
+                    break
+                batch.append(request)
+
+            groups: dict[str, list[_Request]] = {}
+            for request in batch:
+                groups.setdefault(request.model, []).append(request)
+            for model, requests in groups.items():
+                try:
+                    self._refresh_versions()
+                    self._score(model, requests)
+                except Exception as e:
+                    logger.exception(f"Scoring {model} failed")
+                    for request in requests:
+                        if not request.future.done():
+                            self._finish(request, e)
+
+    def _refresh_versions(self) -> None:
+        """Drop cached predictions once any table has changed, checking at most once per interval."""
+        now = time.monotonic()
+        if now - self._versions_checked < self.refresh_seconds:
+            return
+        self._versions_checked = now
+        versions = self.storage.reload_versions()
+        if versions != self._versions:
+            self._versions = versions
+            self._cache.clear()
+
+    def _predictor(self, model: str) -> tuple[int, Predictor]:
+        version = self.registry.latest_version(model)
+        current = self._predictors.get(model)
+        if current is None or current[0] != version:
+            predictor = Predictor(self.storage, self.registry.artifact_path(model, version))
+            predictor.load_model()
+            current = self._predictors[model] = (version, predictor)
+            logger.info(f"Serving {model} v{version}")
+        return current
+
+    def _finish(self, request: _Request, result: float | BaseException) -> None:
+        if isinstance(result, BaseException):
+            request.future.set_exception(result)
+        else:
+            request.future.set_result(result)
+        self.latency.record((time.perf_counter() - request.received) * 1000)
+
+    def _score(self, model: str, requests: list[_Request]) -> None:
+        version, predictor = self._predictor(model)
+
+        pending = []
+        for request in requests:
+            key = (model, version, request.device, request.date)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._finish(request, self._cache[key])
+            else:
+                pending.append(request)
+        if not pending:
+            return
+
+        features = predictor.load_features(
+            dates=[r.date for r in pending], devices={r.device for r in pending}
+        )
+        predictions = predictor.predict_batch(features)
+        found = {
+            (device, str(date)): float(value)
+            for device, date, value in zip(features.devices, features.dates, predictions)
+        }
+        for request in pending:
+            value = found.get((request.device, request.date))
+            if value is None:
+                self._finish(
+                    request, LookupError(f"No features for {request.device} on {request.date}")
+                )
+                continue
+            self._cache[(model, version, request.device, request.date)] = value
+            self._finish(request, value)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def serve_http(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        """
+        Serve predictions over HTTP.
+
+        GET /predict?model=sleep_score&date=2024-01-01&device=Charge%206 scores
+        one day; POST /predict with {"requests": [{"model", "date", "device"}, ...]}
+        scores many; GET /stats reports latency percentiles.
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: Any) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                if url.path == "/stats":
+                    return self._reply(200, service.stats())
+                if url.path != "/predict":
+                    return self._reply(404, {"error": "not found"})
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                for name in ("model", "date"):
+                    if name not in query:
+                        return self._reply(400, {"error": f"missing parameter {name!r}"})
+                result = service.predict_many([query])[0]
+                self._reply(404 if "error" in result else 200, result)
+
+            def do_POST(self) -> None:
+                if urlparse(self.path).path != "/predict":
+                    return self._reply(404, {"error": "not found"})
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length))
+                    self._reply(200, {"results": service.predict_many(body["requests"])})
+                except _BAD_REQUEST as e:
+                    self._reply(400, {"error": str(e)})
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format % args)
+
+        self.start()
+        with ThreadingHTTPServer((host, port), Handler) as server:
+            server.daemon_threads = True
+            logger.info(f"Serving predictions on http://{host}:{port}")
+            server.serve_forever()
+
+    def serve_unix(self, socket_path: Path) -> None:
+        """
+        Serve predictions on a Unix socket.
+
+        Connections stay open; each line is a JSON request like
+        {"model": "sleep_score", "date": "2024-01-01", "device": "Charge 6"}
+        (or {"stats": true}) and is answered with one JSON line.
+        """
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        if request.get("stats"):
+                            response = service.stats()
+                        else:
+                            response = service.predict_many([request])[0]
+                    except _BAD_REQUEST as e:
+                        response = {"error": str(e)}
+                    try:
+                        self.wfile.write(json.dumps(response).encode() + b"\n")
+                        self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        return
+
+        self.start()
+        if socket_path.exists():
+            socket_path.unlink()
+        with socketserver.ThreadingUnixStreamServer(str(socket_path), Handler) as server:
+            # Clients keep connections open, so don't wait for them on shutdown.
+            server.daemon_threads = True
+            logger.info(f"Serving predictions on {socket_path}")
+            try:
+                server.serve_forever()
+            finally:
+                socket_path.unlink(missing_ok=True)
+
+
+class ScoringClient:
+    """Client for serve_unix that keeps its connection open between requests."""
+
+    def __init__(self, socket_path: Path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(socket_path))
+        self._reader = self.sock.makefile("rb")
+
+    def request(self, payload: dict[str, Any]) -> dict[str, Any]:
+        self.sock.sendall(json.dumps(payload).encode() + b"\n")
+        response: dict[str, Any] = json.loads(self._reader.readline())
+        return response
+
+    def predict(self, model: str, date: str, device: str | None = None) -> dict[str, Any]:
+        return self.request({"model": model, "date": date, "device": device})
+
+    def stats(self) -> dict[str, Any]:
+        return self.request({"stats": True})
+
+    def close(self) -> None:
+        self._reader.close()
+        self.sock.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    from ..config import get_config
+
+    parser = argparse.ArgumentParser(
+        prog="circadia-serve", description="Serve Circadia model predictions"
+    )
+    parser.add_argument("--socket", type=Path, help="Serve on this Unix socket instead of HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--model", action="append", default=[], help="Registered model to load at startup"
+    )
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    config = get_config()
+    storage = DuckDBStorage(
+        config.database.path,
+        cache_max_entries=config.database.query_cache_max_entries,
+        cache_max_bytes=config.database.query_cache_max_bytes,
+    )
+    service = ScoringService(
+        storage,
+        ModelRegistry(config.models.registry_path),
+        default_device=config.fitbit.device_name,
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+    ).start()
+
+    try:
+        service.warm(args.model)
+        if args.socket:
+            service.serve_unix(args.socket)
+        else:
+            service.serve_http(args.host, args.port)
+    finally:
+        service.stop()
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
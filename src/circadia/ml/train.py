@@ -1,84 +1,127 @@
+import copy
 import logging
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any
 
 import numpy as np
-import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
 
+from ..features.lagged import LaggedFeatures, LagSpec
 from ..storage import DuckDBStorage
-from .model import CircadiaModel, get_default_features
+from ..telemetry import profiled
+from .dataset import DatasetBuilder, TrainingSet
+from .model import MISSING_FILL_VALUE, CircadiaModel, get_default_features
+from .registry import hash_training_data
+from .tuning import HyperparameterSearch
 
 logger = logging.getLogger(__name__)
 
 
+def _fit_regressor(regressor: Any, X: np.ndarray, y: np.ndarray) -> Any:
+    """Fit one regressor in a worker process and send it back."""
+    return regressor.fit(X, y)
+
+
 class ModelTrainer:
     def __init__(self, storage: DuckDBStorage):
         self.storage = storage
         self.feature_names = get_default_features()
 
+    def dataset_builder(
+        self, target: str | Sequence[str] = "sleep_score", **kwargs: Any
+    ) -> DatasetBuilder:
+        return DatasetBuilder(self.storage, self.feature_names, target, **kwargs)
+
+    def load_training_set(
+        self,
+        target: str = "sleep_score",
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> TrainingSet:
+        dataset = self.dataset_builder(target).build(start_date, end_date)
+        if not len(dataset):
+            raise ValueError("No training data found")
+        return dataset
+
     def load_training_data(
         self,
         target: str = "sleep_score",
-        start_date: Optional[str] = None,
-        end_date: Optional[str] = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
     ) -> tuple[np.ndarray, np.ndarray]:
-        query = f"""
-        SELECT
-            r.date,
-            r.value as resting_hr,
-            h.daily_rmssd as hrv_rmssd,
-            s.efficiency as sleep_efficiency,
-            s.minutes_asleep,
-            s.minutes_deep,
-            s.minutes_rem,
-            s.minutes_light,
-            a.steps,
-            a.active_minutes_total as active_minutes,
-            a.calories,
-            sp.avg as spo2_avg,
-            b.value as breathing_rate
-        FROM resting_hr r
-        LEFT JOIN hrv h ON r.date = h.date AND r.device = h.device
-        LEFT JOIN sleep_summary s ON r.date = s.date AND r.device = s.device
-        LEFT JOIN daily_summary a ON r.date = a.date AND r.device = a.device
-        LEFT JOIN spo2 sp ON r.date = sp.date AND r.device = sp.device
-        LEFT JOIN breathing_rate b ON r.date = b.date AND r.device = b.device
-        """
+        dataset = self.load_training_set(target, start_date, end_date)
+        return dataset.X, dataset.y
 
-        if start_date and end_date:
-            query += f" WHERE r.date BETWEEN '{start_date}' AND '{end_date}'"
-        elif start_date:
-            query += f" WHERE r.date >= '{start_date}'"
-        elif end_date:
-            query += f" WHERE r.date <= '{end_date}'"
-
-        df = self.storage.execute(query).df()
-
-        if df.empty:
-            raise ValueError("No training data found")
-
-        if target == "sleep_score":
-            y = df["minutes_asleep"].fillna(0)
-        else:
-            y = df[target].fillna(0)
+    @profiled("train")
+    def train(
+        self,
+        target: str = "sleep_score",
+        model_type: str = "gradient_boosting",
+        start_date: str | None = None,
+        end_date: str | None = None,
+        params: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        logger.info(f"Training model for {target}")
 
-        X = df[self.feature_names].fillna(0).values
+        dataset = self.load_training_set(target, start_date, end_date)
+        X, y = dataset.X, dataset.y
 
-        return X, y.values
+        model = CircadiaModel(model_type=model_type, params=params)
+        model.feature_names = self.feature_names
+        return self._fit(target, model, X, y, dataset.dates, start_date, end_date)
 
-    def train(
+    @profiled("train.next_day")
+    def train_next_day(
         self,
         target: str = "sleep_score",
         model_type: str = "gradient_boosting",
-        start_date: Optional[str] = None,
-        end_date: Optional[str] = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        params: dict[str, Any] | None = None,
+        spec: LagSpec | None = None,
     ) -> dict[str, Any]:
-        logger.info(f"Training model for {target}")
+        """
+        Train a model forecasting the target on day t + 1 from lagged features of day t.
 
-        X, y = self.load_training_data(target, start_date, end_date)
+        Rows come from the per-date LaggedFeatures cache; days whose next day
+        has no value for the target are skipped.
+        """
+        spec = spec or LagSpec()
+        column = f"next_{target}"
+        if column not in spec.target_names:
+            raise ValueError(f"{target} is not one of the lagged metrics")
+        logger.info(f"Training next-day model for {target}")
 
-        model = CircadiaModel(model_type=model_type)
+        batch = LaggedFeatures(self.storage, spec).load(
+            [*spec.feature_names, column], start_date, end_date
+        )
+        batch = batch[~np.isnan(batch[column])]
+        if not len(batch):
+            raise ValueError("No training data found")
+        batch = batch[np.argsort(batch.dates, kind="stable")]
+        X = batch.to_matrix(spec.feature_names, fill_value=MISSING_FILL_VALUE, dtype=np.float32)
 
+        model = CircadiaModel(model_type=model_type, params=params)
+        model.feature_names = spec.feature_names
+        model.lag_spec = spec.as_dict()
+        return self._fit(target, model, X, batch[column], batch.dates, start_date, end_date)
+
+    def _fit(
+        self,
+        target: str,
+        model: CircadiaModel,
+        X: np.ndarray,
+        y: np.ndarray,
+        dates: np.ndarray,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> dict[str, Any]:
         cv_results = model.cross_validate(X, y)
         logger.info(
             f"Cross-validation R2: {cv_results['mean_r2']:.3f} (+/- {cv_results['std_r2']:.3f})"
@@ -91,9 +134,157 @@ class ModelTrainer:
             "model": model,
             "cv_results": cv_results,
             "n_samples": len(y),
+            "feature_names": model.feature_names,
+            "start_date": start_date,
+            "end_date": end_date,
+            "data_hash": hash_training_data(X, y),
+            "trained_through": str(dates.max()),
+        }
+
+    @profiled("train.streaming")
+    def train_streaming(
+        self,
+        target: str = "sleep_score",
+        model_type: str = "sgd",
+        start_date: str | None = None,
+        end_date: str | None = None,
+        batch_size: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Fit an incremental learner one record batch at a time.
+
+        Memory stays at one batch however much history is selected, at the
+        cost of cross-validation; model_type must support partial_fit (sgd).
+        """
+        logger.info(f"Streaming training for {target}")
+        builder = self.dataset_builder(target, **({"batch_size": batch_size} if batch_size else {}))
+        model = CircadiaModel(model_type=model_type)
+        if not model.supports_partial_fit:
+            raise ValueError(f"{model_type} models cannot be trained batch by batch")
+        model.feature_names = self.feature_names
+
+        n_samples = 0
+        trained_through = None
+        for X, y, dates in builder.iter_batches(start_date, end_date):
+            model.partial_fit(X, y)
+            n_samples += len(y)
+            # Batches arrive in date order.
+            trained_through = dates.max()
+        if not n_samples:
+            raise ValueError("No training data found")
+
+        return {
+            "target": target,
+            "model": model,
+            "cv_results": {},
+            "n_samples": n_samples,
             "feature_names": self.feature_names,
+            "start_date": start_date,
+            "end_date": end_date,
+            "trained_through": str(trained_through),
         }
 
+    @profiled("train.many")
+    def train_many(
+        self,
+        targets: Sequence[str] = ("sleep_score", "recovery_score", "health_score"),
+        model_type: str = "gradient_boosting",
+        start_date: str | None = None,
+        end_date: str | None = None,
+        params: dict[str, Any] | None = None,
+        cv: int = 5,
+        max_workers: int | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Train one model per target from a single pass over the data.
+
+        The feature matrix and every target are read together and each CV
+        fold's scaler (and the final one) is fitted once for all targets; every
+        model gets its own copy of the final scaler, so a partial_fit on one
+        leaves the others alone. The per-target regressor fits run on a process
+        pool, since the tree ensembles hold the GIL while fitting; each task is
+        sent its own copy of the fold's scaled matrix. Returns train()-style
+        results keyed by target.
+        """
+        targets = list(dict.fromkeys(targets))
+        logger.info(f"Training models for {', '.join(targets)}")
+        dataset = self.dataset_builder(targets).build(start_date, end_date)
+        if not len(dataset):
+            raise ValueError("No training data found")
+        X, Y = dataset.X, dataset.Y
+        template = CircadiaModel(model_type=model_type, params=params)._create_regressor()
+
+        def fit_all(X_train: np.ndarray, Y_train: np.ndarray) -> list[Any]:
+            futures = [
+                pool.submit(_fit_regressor, clone(template), X_train, Y_train[:, j])
+                for j in range(len(targets))
+            ]
+            return [future.result() for future in futures]
+
+        scores = np.empty((cv, len(targets)))
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers or len(targets), len(targets))
+        ) as pool:
+            # Rows are in date order; each fold trains on the past and scores the future.
+            for fold, (train, test) in enumerate(TimeSeriesSplit(n_splits=cv).split(X)):
+                scaler = StandardScaler().fit(X[train])
+                X_test = scaler.transform(X[test])
+                for j, regressor in enumerate(fit_all(scaler.transform(X[train]), Y[train])):
+                    scores[fold, j] = r2_score(Y[test, j], regressor.predict(X_test))
+
+            scaler = StandardScaler().fit(X)
+            regressors = fit_all(scaler.transform(X), Y)
+
+        results = {}
+        for j, target in enumerate(targets):
+            model = CircadiaModel(model_type=model_type, params=params)
+            model.feature_names = self.feature_names
+            model.model = Pipeline(
+                [("scaler", copy.deepcopy(scaler)), ("regressor", regressors[j])]
+            )
+            model.is_fitted = True
+            y = Y[:, j]
+            logger.info(
+                f"{target} cross-validation R2: {scores[:, j].mean():.3f} "
+                f"(+/- {scores[:, j].std():.3f})"
+            )
+            results[target] = {
+                "target": target,
+                "model": model,
+                "cv_results": {
+                    "mean_r2": float(scores[:, j].mean()),
+                    "std_r2": float(scores[:, j].std()),
+                    "scores": scores[:, j].tolist(),
+                },
+                "n_samples": len(y),
+                "feature_names": self.feature_names,
+                "start_date": start_date,
+                "end_date": end_date,
+                "data_hash": hash_training_data(X, y),
+                "trained_through": str(dataset.dates.max()),
+            }
+        return results
+
+    @profiled("train.tune")
+    def tune(
+        self,
+        target: str = "sleep_score",
+        start_date: str | None = None,
+        end_date: str | None = None,
+        model_types: Iterable[str] = ("gradient_boosting", "random_forest", "ridge"),
+        max_workers: int | None = None,
+    ) -> dict[str, Any]:
+        """Search model types and hyperparameters, then train the best candidate."""
+        X, y = self.load_training_data(target, start_date, end_date)
+        search = HyperparameterSearch(self.storage, max_workers=max_workers)
+        summary = search.search(X, y, model_types)
+        model_type, params = search.best(summary)
+        logger.info(f"Best candidate: {model_type} {params}")
+
+        result = self.train(target, model_type, start_date, end_date, params=params)
+        result["tuning"] = summary
+        return result
+
     def save_model(self, model: CircadiaModel, path: Path) -> None:
         model.save(path)
         logger.info(f"Model saved to {path}")
@@ -0,0 +1,194 @@
+import itertools
+import json
+import logging
+import os
+import time
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import TimeSeriesSplit
+
+from ..storage import DuckDBStorage
+from .model import CircadiaModel
+from .registry import hash_training_data
+
+logger = logging.getLogger(__name__)
+
+PARAM_GRIDS: dict[str, dict[str, list[Any]]] = {
+    "gradient_boosting": {
+        "n_estimators": [100, 200],
+        "max_depth": [3, 5],
+        "learning_rate": [0.05, 0.1],
+    },
+    "random_forest": {
+        "n_estimators": [100, 300],
+        "max_depth": [5, 10, None],
+        "min_samples_leaf": [1, 5],
+    },
+    "ridge": {
+        "alpha": [0.1, 1.0, 10.0, 100.0],
+    },
+}
+
+
+def expand_grid(grid: dict[str, list[Any]]) -> list[dict[str, Any]]:
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+# Worker-side views of the training set, attached once per process.
+_shared: dict[str, Any] = {}
+
+
+def _attach(specs: dict[str, tuple[str, tuple[int, ...], str]]) -> None:
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        _shared[f"{key}_block"] = block
+
+
+def _evaluate(
+    model_type: str, params: dict[str, Any], fold: int, train_stop: int, test_stop: int
+) -> dict[str, Any]:
+    """Fit one candidate on one fold. Fold data are slices of the shared arrays, never copied."""
+    X, y = _shared["X"], _shared["y"]
+    started = time.perf_counter()
+    model = CircadiaModel(model_type=model_type, params=params)
+    model.fit(X[:train_stop], y[:train_stop])
+    predictions = model.predict(X[train_stop:test_stop])
+    actual = y[train_stop:test_stop]
+    return {
+        "model_type": model_type,
+        "params": json.dumps(params, sort_keys=True),
+        "fold": fold,
+        "r2": float(r2_score(actual, predictions)),
+        "mae": float(mean_absolute_error(actual, predictions)),
+        "fit_seconds": time.perf_counter() - started,
+    }
+
+
+class HyperparameterSearch:
+    """
+    Grid search over model types and hyperparameters with time-ordered CV.
+
+    Rows must be in date order. Folds come from TimeSeriesSplit, so every fold
+    trains on a prefix of the history and scores the block that follows it.
+    Every (candidate, fold) pair runs as its own task on a process pool; the
+    training set is copied once into shared memory and each worker slices its
+    folds from there. Fold scores are persisted in tuning_results keyed by a
+    hash of the data, so repeating a search on unchanged data reuses them.
+    """
+
+    def __init__(
+        self,
+        storage: DuckDBStorage | None = None,
+        n_splits: int = 5,
+        max_workers: int | None = None,
+    ):
+        self.storage = storage
+        self.n_splits = n_splits
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def _folds(self, n_rows: int) -> list[tuple[int, int]]:
+        # TimeSeriesSplit folds are contiguous, so (train_stop, test_stop) describes each one.
+        return [
+            (int(test[0]), int(test[-1]) + 1)
+            for _, test in TimeSeriesSplit(n_splits=self.n_splits).split(np.empty(n_rows))
+        ]
+
+    def _stored(self, data_hash: str) -> pd.DataFrame:
+        if self.storage is None:
+            return pd.DataFrame(columns=["model_type", "params", "fold"])
+        stored: pd.DataFrame = self.storage.query(
+            """
+            SELECT model_type, params, fold, r2, mae, fit_seconds FROM tuning_results
+            WHERE data_hash = ? AND n_splits = ?
+            """,
+            [data_hash, self.n_splits],
+        ).to_pandas()
+        return stored
+
+    def _run(
+        self, X: np.ndarray, y: np.ndarray, tasks: list[tuple[str, dict[str, Any], int, int, int]]
+    ) -> list[dict[str, Any]]:
+        blocks = []
+        specs = {}
+        try:
+            for key, array in (("X", X), ("y", y)):
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                blocks.append(block)
+                specs[key] = (block.name, array.shape, array.dtype.str)
+
+            with ProcessPoolExecutor(
+                max_workers=min(self.max_workers, len(tasks)),
+                initializer=_attach,
+                initargs=(specs,),
+            ) as pool:
+                futures = [pool.submit(_evaluate, *task) for task in tasks]
+                return [future.result() for future in futures]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def search(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        model_types: Iterable[str] = ("gradient_boosting", "random_forest", "ridge"),
+        grids: dict[str, dict[str, list[Any]]] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Score every candidate and return one row per candidate, best mean R2 first.
+        """
+        grids = grids or PARAM_GRIDS
+        data_hash = hash_training_data(X, y)
+        folds = self._folds(len(y))
+        stored = self._stored(data_hash)
+        done = set(zip(stored["model_type"], stored["params"], stored["fold"]))
+
+        tasks = [
+            (model_type, params, fold, train_stop, test_stop)
+            for model_type in model_types
+            for params in expand_grid(grids.get(model_type, {}))
+            for fold, (train_stop, test_stop) in enumerate(folds)
+            if (model_type, json.dumps(params, sort_keys=True), fold) not in done
+        ]
+        logger.info(
+            f"Tuning: {len(tasks)} fold fits on {min(self.max_workers, len(tasks) or 1)} "
+            f"workers ({len(done)} reused)"
+        )
+
+        results = pd.DataFrame(self._run(X, y, tasks)) if tasks else pd.DataFrame()
+        if self.storage is not None and len(results):
+            rows = results.assign(
+                data_hash=data_hash, n_splits=self.n_splits, created_at=datetime.now()
+            )
+            self.storage.upsert("tuning_results", rows)
+
+        scores = pd.concat([stored, results], ignore_index=True)
+        summary = (
+            scores.groupby(["model_type", "params"])
+            .agg(
+                mean_r2=("r2", "mean"),
+                std_r2=("r2", "std"),
+                mean_mae=("mae", "mean"),
+                fit_seconds=("fit_seconds", "sum"),
+            )
+            .reset_index()
+            .sort_values("mean_r2", ascending=False, ignore_index=True)
+        )
+        return summary
+
+    @staticmethod
+    def best(summary: pd.DataFrame) -> tuple[str, dict[str, Any]]:
+        top = summary.iloc[0]
+        return top["model_type"], json.loads(top["params"])
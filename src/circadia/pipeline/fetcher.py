@@ -1,14 +1,19 @@
 import json
 import logging
+from collections.abc import Iterable
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any
 
-from ..fitbit import FitbitAuth, FitbitClient
+from ..fitbit import FitbitClient
 from ..storage import DuckDBStorage
+from ..telemetry import profiled
+from .ingest import Ingester
 
 logger = logging.getLogger(__name__)
 
+INTRADAY_STREAMS = ("heart_rate", "steps")
+
 
 class DataFetcher:
     def __init__(
@@ -25,35 +30,76 @@ class DataFetcher:
         self.timezone = timezone
         self.raw_data_dir = raw_data_dir
         self.raw_data_dir.mkdir(parents=True, exist_ok=True)
+        self.ingester = Ingester(storage, device_name)
+        self.coverage = self.ingester.coverage
 
     def _save_raw(self, endpoint: str, date: str, data: dict[str, Any]) -> None:
         filepath = self.raw_data_dir / f"{endpoint}_{date}.json"
         with open(filepath, "w") as f:
             json.dump(data, f, indent=2)
 
-    def fetch_day(self, date: str) -> None:
+    def _missing_range(self, stream: str, start_date: str, end_date: str) -> tuple[str, str] | None:
+        missing = self.coverage.missing_dates(stream, self.device_name, start_date, end_date)
+        if not missing:
+            logger.info(f"{stream} already complete for {start_date} to {end_date}")
+            return None
+        return missing[0], missing[-1]
+
+    @profiled("fetch.day")
+    def fetch_day(self, date: str, streams: Iterable[str] = INTRADAY_STREAMS) -> None:
         logger.info(f"Fetching data for {date}")
 
-        intraday_hr = self.client.get_heart_rate_intraday(date, "1sec")
-        self._save_raw("heart_rate_intraday", date, intraday_hr)
+        heart_rate = None
+        if "heart_rate" in streams:
+            intraday_hr = self.client.get_heart_rate_intraday(date, "1sec")
+            self._save_raw("heart_rate_intraday", date, intraday_hr)
+            heart_rate = self.ingester.intraday("heart_rate", intraday_hr, date)
 
-        intraday_steps = self.client.get_steps_intraday(date, "1min")
-        self._save_raw("steps_intraday", date, intraday_steps)
+        if "steps" in streams:
+            intraday_steps = self.client.get_steps_intraday(date, "1min")
+            self._save_raw("steps_intraday", date, intraday_steps)
+            self.ingester.intraday("steps", intraday_steps, date)
+
+        if heart_rate is not None:
+            # After the steps, so the detector can tell exercise from a resting anomaly.
+            self.ingester.detector.observe("heart_rate", heart_rate)
 
         battery = self.client.get_battery_level(self.device_name)
         if battery:
             logger.info(f"Battery level: {battery['battery_level']}")
 
-    def fetch_range(self, start_date: str, end_date: str) -> None:
+    def fetch_range(self, start_date: str, end_date: str, force: bool = False) -> None:
+        """
+        Fetch intraday streams for every day in the range.
+
+        Unless force is set, days the coverage index already holds are skipped,
+        so only missing or incomplete streams are requested again. Today is
+        always refetched since it is still filling in.
+        """
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
+        today = datetime.now(self.timezone).strftime("%Y-%m-%d")
+
+        missing = {
+            stream: set(self.coverage.missing_dates(stream, self.device_name, start_date, end_date))
+            for stream in INTRADAY_STREAMS
+        }
 
         current = start
         while current <= end:
             date_str = current.strftime("%Y-%m-%d")
-            self.fetch_day(date_str)
+            streams = [
+                stream
+                for stream in INTRADAY_STREAMS
+                if force or date_str >= today or date_str in missing[stream]
+            ]
+            if streams:
+                self.fetch_day(date_str, streams)
+            else:
+                logger.info(f"Skipping {date_str}, intraday data already complete")
             current += timedelta(days=1)
 
+    @profiled("fetch.daily_aggregates")
     def fetch_daily_aggregates(self, start_date: str, end_date: str) -> dict[str, Any]:
         results = {}
 
@@ -70,10 +116,22 @@ class DataFetcher:
             logger.error(f"Failed to fetch breathing rate: {e}")
 
         try:
-            spo2 = self.client.get_spo2(start_date, end_date)
-            results["spo2"] = spo2
-        except Exception as e:
-            logger.error(f"Failed to fetch SPO2: {e}")
+            skin_temp = self.client.get_skin_temperature(start_date, end_date)
+            results["skin_temperature"] = skin_temp.get("tempSkin", [])
+        except Exception:
+            logger.exception("Failed to fetch skin temperature")
+
+        spo2_range = self._missing_range("spo2", start_date, end_date)
+        if spo2_range:
+            try:
+                spo2 = self.client.get_spo2(*spo2_range)
+                results["spo2"] = spo2
+            except Exception:
+                logger.exception("Failed to fetch SPO2")
+            try:
+                results["spo2_intraday"] = self.client.get_spo2_all(*spo2_range)
+            except Exception:
+                logger.exception("Failed to fetch intraday SPO2")
 
         try:
             weight = self.client.get_weight(start_date, end_date)
@@ -81,11 +139,13 @@ class DataFetcher:
         except Exception as e:
             logger.error(f"Failed to fetch weight: {e}")
 
-        try:
-            sleep = self.client.get_sleep(start_date, end_date)
-            results["sleep"] = sleep.get("sleep", [])
-        except Exception as e:
-            logger.error(f"Failed to fetch sleep: {e}")
+        sleep_range = self._missing_range("sleep", start_date, end_date)
+        if sleep_range:
+            try:
+                sleep = self.client.get_sleep(*sleep_range)
+                results["sleep"] = sleep.get("sleep", [])
+            except Exception:
+                logger.exception("Failed to fetch sleep")
 
         for activity in [
             "minutesSedentary",
@@ -118,6 +178,11 @@ class DataFetcher:
         except Exception as e:
             logger.error(f"Failed to fetch active zone minutes: {e}")
 
+        self.ingester.daily_aggregates(results)
+        self.ingester.refresh_derived(
+            start_date, end_date, today=datetime.now(self.timezone).date()
+        )
+
         return results
 
 
@@ -0,0 +1,181 @@
+import logging
+from collections.abc import Callable
+from datetime import date
+from typing import Any
+
+import pandas as pd
+
+from ..dashboard import refresh_dashboard_snapshot
+from ..features.anomaly import AnomalyDetector
+from ..features.baseline import BaselineStore
+from ..features.batch import DAILY_FEATURES_QUERY
+from ..features.cardio import refresh_intraday_hr_features
+from ..features.lagged import LaggedFeatures
+from ..features.sleep import refresh_sleep_regularity
+from ..features.sql import refresh_daily_features
+from ..storage import DuckDBStorage, HeartRateRollup
+from ..storage.cache import referenced_tables
+from ..storage.coverage import STREAMS, CoverageIndex
+from ..telemetry import profiled
+from .transformer import (
+    transform_activity_minutes,
+    transform_breathing_rate,
+    transform_daily_summary,
+    transform_heart_rate_intraday,
+    transform_hr_zones,
+    transform_hrv,
+    transform_skin_temperature,
+    transform_sleep,
+    transform_spo2,
+    transform_spo2_intraday,
+    transform_steps_intraday,
+    transform_weight,
+)
+
+logger = logging.getLogger(__name__)
+
+# Daily features, lagged features, baselines and the dashboard snapshot are all
+# computed from the tables behind DAILY_FEATURES_QUERY.
+DERIVED_INPUTS = frozenset(referenced_tables(DAILY_FEATURES_QUERY))
+
+INTRADAY_TRANSFORMS: dict[str, Callable[[dict[str, Any], str, str], pd.DataFrame]] = {
+    "heart_rate": transform_heart_rate_intraday,
+    "steps": transform_steps_intraday,
+}
+
+
+class Ingester:
+    """
+    Writes Fitbit API payloads into DuckDB and keeps derived tables current.
+
+    Payloads are transformed into table rows and upserted; upsert skips rows
+    that are already stored unchanged, and the tables that did change are
+    collected in changed. refresh_derived() recomputes daily and lagged
+    features, baselines and the dashboard snapshot only when one of their
+    input tables is among them, so polling a day the tracker has not synced
+    since the last fetch writes nothing and recomputes nothing. A day of
+    intraday heart rate that changed also refreshes its minute rollup and its
+    row in intraday_hr_features, and changed sleep stages refresh
+    sleep_regularity from the earliest night in the payload onwards.
+    """
+
+    def __init__(self, storage: DuckDBStorage, device_name: str):
+        self.storage = storage
+        self.device_name = device_name
+        self.coverage = CoverageIndex(storage)
+        self.detector = AnomalyDetector(storage)
+        self.rollup = HeartRateRollup(storage)
+        self.changed: set[str] = set()
+
+    def _upsert(self, table: str, rows: pd.DataFrame) -> int:
+        written = self.storage.upsert(table, rows)
+        if written:
+            self.changed.add(table)
+        return written
+
+    @profiled("ingest")
+    def _ingest_stream(self, stream: str, rows: pd.DataFrame) -> int:
+        spec = STREAMS[stream]
+        written = self._upsert(spec.table, rows)
+        if written:
+            self.coverage.record(stream, self.device_name, rows[spec.time_column])
+        return written
+
+    def intraday(self, stream: str, payload: dict[str, Any], date: str) -> pd.DataFrame | None:
+        """Ingest one day of an intraday stream. Returns its rows if any were new or changed."""
+        rows = INTRADAY_TRANSFORMS[stream](payload, date, self.device_name)
+        if not self._ingest_stream(stream, rows):
+            return None
+        if stream == "heart_rate":
+            self.rollup.refresh(rows["timestamp"].min(), rows["timestamp"].max(), self.device_name)
+            refresh_intraday_hr_features(self.storage, self.device_name, date, date)
+        return rows
+
+    @profiled("ingest.daily_aggregates")
+    def daily_aggregates(self, results: dict[str, Any]) -> dict[str, int]:
+        """Ingest the payloads fetch_daily_aggregates collected. Returns rows changed per writer."""
+        device = self.device_name
+        writers: dict[str, Callable[[], int]] = {
+            "hrv": lambda: self._upsert("hrv", transform_hrv(results.get("hrv", []), device)),
+            "breathing_rate": lambda: self._upsert(
+                "breathing_rate",
+                transform_breathing_rate(results.get("breathing_rate", []), device),
+            ),
+            "skin_temperature": lambda: self._upsert(
+                "skin_temperature",
+                transform_skin_temperature(results.get("skin_temperature", []), device),
+            ),
+            "spo2": lambda: self._ingest_stream(
+                "spo2", transform_spo2(results.get("spo2", []), device)
+            ),
+            "spo2_intraday": lambda: self._spo2_intraday(results.get("spo2_intraday", [])),
+            "weight": lambda: self._upsert(
+                "weight", transform_weight(results.get("weight", []), device)
+            ),
+            "sleep": lambda: self._sleep(results.get("sleep", [])),
+            "activity_minutes": lambda: self._upsert(
+                "activity_minutes", transform_activity_minutes(results, device)
+            ),
+            "daily_summary": lambda: self._upsert(
+                "daily_summary", transform_daily_summary(results, device)
+            ),
+            "hr_zones": lambda: self._hr_zones(
+                results.get("heart_rate_zones", []), results.get("active_zone_minutes", [])
+            ),
+        }
+        written = {}
+        for name, write in writers.items():
+            try:
+                written[name] = write()
+                logger.info(f"Ingested {written[name]} new or changed {name} rows")
+            except Exception:
+                logger.exception(f"Failed to ingest {name}")
+        return written
+
+    def _sleep(self, sleep_records: list[dict[str, Any]]) -> int:
+        summary, levels = transform_sleep(sleep_records, self.device_name)
+        written = self._ingest_stream("sleep", summary)
+        if self._upsert("sleep_levels", levels):
+            self._sleep_regularity(summary["date"].min())
+        return written
+
+    def _sleep_regularity(self, start: date) -> None:
+        # A night feeds the windows of the days after it, so refresh through the latest one.
+        latest: date | None = self.storage.execute(
+            "SELECT max(date) FROM sleep_summary WHERE device = ?", [self.device_name]
+        ).fetchone()[0]
+        end = max(start, latest) if latest else start
+        rows = refresh_sleep_regularity(
+            self.storage, self.device_name, start.isoformat(), end.isoformat()
+        )
+        logger.info(f"Sleep regularity changed on {rows} days from {start}")
+
+    def _spo2_intraday(self, records: list[dict[str, Any]] | dict[str, Any]) -> int:
+        rows = transform_spo2_intraday(records, self.device_name)
+        written = self._upsert("spo2_intraday", rows)
+        if written:
+            self.detector.observe("spo2", rows)
+        return written
+
+    def _hr_zones(
+        self, zone_records: list[dict[str, Any]], azm_records: list[dict[str, Any]]
+    ) -> int:
+        zones, resting = transform_hr_zones(zone_records, azm_records, self.device_name)
+        return self._upsert("resting_hr", resting) + self._upsert("hr_zones", zones)
+
+    def refresh_derived(self, start_date: str, end_date: str, today: date) -> bool:
+        """
+        Recompute the derived tables for a date range if any of their inputs
+        changed since the last refresh. Returns whether anything was refreshed.
+        """
+        inputs = self.changed & DERIVED_INPUTS
+        if not inputs:
+            logger.info("No daily inputs changed, skipping derived refresh")
+            return False
+        logger.info(f"Refreshing derived tables after changes to {', '.join(sorted(inputs))}")
+        refresh_daily_features(self.storage, start_date, end_date, device=self.device_name)
+        LaggedFeatures(self.storage).refresh(start_date, end_date, device=self.device_name)
+        BaselineStore(self.storage).refresh(self.device_name, today=today)
+        refresh_dashboard_snapshot(self.storage, self.device_name)
+        self.changed -= inputs
+        return True
@@ -1,25 +1,64 @@
 import logging
-import schedule
 import time
+from collections.abc import Callable
 from datetime import datetime
-from typing import Any, Callable
+from typing import Any
+
+import schedule
+
+from ..telemetry import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+JOB_SECONDS = REGISTRY.histogram("circadia_job_duration_seconds", "Scheduled job run time", ["job"])
+JOB_LATENESS = REGISTRY.gauge(
+    "circadia_job_lateness_seconds", "How long after its due time the last run started", ["job"]
+)
+JOB_RUNS = REGISTRY.counter("circadia_job_runs_total", "Scheduled job runs", ["job", "result"])
+JOB_LAST_SUCCESS = REGISTRY.gauge(
+    "circadia_job_last_success_timestamp_seconds", "Unix time the job last finished", ["job"]
+)
+
 
 class Scheduler:
-    def __init__(self, pipeline: Any, timezone: Any):
+    def __init__(self, pipeline: Any, timezone: Any, model_updater: Any | None = None):
         self.pipeline = pipeline
         self.timezone = timezone
+        self.model_updater = model_updater
 
     def schedule_jobs(self) -> None:
-        schedule.every(1).hours.do(self._refresh_token)
-        schedule.every(3).minutes.do(self._fetch_intraday)
-        schedule.every(20).minutes.do(self._fetch_battery)
-        schedule.every(3).hours.do(self._fetch_daily_30d)
-        schedule.every(4).hours.do(self._fetch_daily_100d)
-        schedule.every(6).hours.do(self._fetch_daily_365d)
-        schedule.every(1).hours.do(self._fetch_activities)
+        self._every(schedule.every(1).hours, self._refresh_token)
+        self._every(schedule.every(3).minutes, self._fetch_intraday)
+        self._every(schedule.every(20).minutes, self._fetch_battery)
+        self._every(schedule.every(3).hours, self._fetch_daily_30d)
+        self._every(schedule.every(4).hours, self._fetch_daily_100d)
+        self._every(schedule.every(6).hours, self._fetch_daily_365d)
+        self._every(schedule.every(1).hours, self._fetch_activities)
+        if self.model_updater is not None:
+            self._every(schedule.every(6).hours, self._update_model)
+
+    def _every(self, job: schedule.Job, func: Callable[[], None]) -> None:
+        name = func.__name__.lstrip("_")
+        job.do(self._timed, name, func).tag(name)
+
+    def _timed(self, name: str, func: Callable[[], None]) -> None:
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            JOB_RUNS.inc(job=name, result="error")
+            raise
+        finally:
+            JOB_SECONDS.observe(time.perf_counter() - start, job=name)
+        JOB_RUNS.inc(job=name, result="success")
+        JOB_LAST_SUCCESS.set(time.time(), job=name)
+
+    def _record_lateness(self) -> None:
+        now = datetime.now()
+        for job in schedule.get_jobs():
+            if job.should_run and job.tags and job.next_run is not None:
+                lateness = (now - job.next_run).total_seconds()
+                JOB_LATENESS.set(lateness, job=next(iter(job.tags)))
 
     def _refresh_token(self) -> None:
         logger.info("Refreshing Fitbit token...")
@@ -53,10 +92,20 @@ class Scheduler:
     def _fetch_activities(self) -> None:
         logger.info("Fetching activities...")
 
+    def _update_model(self) -> None:
+        if self.model_updater is None:
+            return
+        logger.info("Updating model with new days...")
+        try:
+            self.model_updater.update()
+        except Exception:
+            logger.exception("Model update failed")
+
     def run(self) -> None:
         logger.info("Starting scheduler...")
         self.schedule_jobs()
 
         while True:
+            self._record_lateness()
             schedule.run_pending()
             time.sleep(30)
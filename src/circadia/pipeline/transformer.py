@@ -0,0 +1,319 @@
+from typing import Any
+
+import pandas as pd
+
+# Same integer encoding the original fitbit-grafana exporter used for sleep stages.
+SLEEP_LEVELS = {
+    "deep": 0,
+    "light": 1,
+    "asleep": 1,
+    "rem": 2,
+    "restless": 2,
+    "wake": 3,
+    "awake": 3,
+    "unknown": 4,
+}
+
+
+def _intraday_rows(dataset: list[dict[str, Any]], date: str, device: str) -> pd.DataFrame:
+    if not dataset:
+        return pd.DataFrame(columns=["timestamp", "device", "value"])
+
+    frame = pd.DataFrame.from_records(dataset, columns=["time", "value"])
+    timestamps = pd.Timestamp(date) + pd.to_timedelta(frame["time"])
+    return pd.DataFrame(
+        {
+            "timestamp": timestamps,
+            "device": device,
+            "value": pd.to_numeric(frame["value"]),
+        }
+    )
+
+
+def transform_heart_rate_intraday(payload: dict[str, Any], date: str, device: str) -> pd.DataFrame:
+    dataset = payload.get("activities-heart-intraday", {}).get("dataset", [])
+    return _intraday_rows(dataset, date, device)
+
+
+def transform_steps_intraday(payload: dict[str, Any], date: str, device: str) -> pd.DataFrame:
+    dataset = payload.get("activities-steps-intraday", {}).get("dataset", [])
+    return _intraday_rows(dataset, date, device)
+
+
+def transform_sleep(
+    sleep_records: list[dict[str, Any]], device: str
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Split Fitbit sleep logs into sleep_summary and sleep_levels rows."""
+    summaries = []
+    levels = []
+
+    for record in sleep_records:
+        is_main = bool(record.get("isMainSleep", False))
+        summary = record.get("levels", {}).get("summary", {})
+        summaries.append(
+            {
+                "date": record.get("dateOfSleep"),
+                "device": device,
+                "is_main_sleep": is_main,
+                "efficiency": record.get("efficiency", 0),
+                "minutes_after_wakeup": record.get("minutesAfterWakeup", 0),
+                "minutes_asleep": record.get("minutesAsleep", 0),
+                "minutes_to_fall_asleep": record.get("minutesToFallAsleep", 0),
+                "minutes_in_bed": record.get("timeInBed", 0),
+                "minutes_awake": record.get("minutesAwake", 0),
+                "minutes_light": summary.get("light", {}).get("minutes", 0),
+                "minutes_rem": summary.get("rem", {}).get("minutes", 0),
+                "minutes_deep": summary.get("deep", {}).get("minutes", 0),
+            }
+        )
+        for entry in record.get("levels", {}).get("data", []):
+            levels.append(
+                {
+                    "timestamp": entry.get("dateTime"),
+                    "device": device,
+                    "is_main_sleep": is_main,
+                    "level": SLEEP_LEVELS.get(entry.get("level", "unknown"), 4),
+                    "duration_seconds": entry.get("seconds", 0),
+                }
+            )
+
+    summary_df = pd.DataFrame(
+        summaries,
+        columns=[
+            "date",
+            "device",
+            "is_main_sleep",
+            "efficiency",
+            "minutes_after_wakeup",
+            "minutes_asleep",
+            "minutes_to_fall_asleep",
+            "minutes_in_bed",
+            "minutes_awake",
+            "minutes_light",
+            "minutes_rem",
+            "minutes_deep",
+        ],
+    )
+    if not summary_df.empty:
+        summary_df["date"] = pd.to_datetime(summary_df["date"]).dt.date
+        # Several naps can share a (date, is_main_sleep) key; keep the longest.
+        summary_df = summary_df.sort_values("minutes_asleep").drop_duplicates(
+            ["date", "device", "is_main_sleep"], keep="last"
+        )
+
+    levels_df = pd.DataFrame(
+        levels, columns=["timestamp", "device", "is_main_sleep", "level", "duration_seconds"]
+    )
+    if not levels_df.empty:
+        levels_df["timestamp"] = pd.to_datetime(levels_df["timestamp"])
+        levels_df = levels_df.drop_duplicates(["timestamp", "device"], keep="last")
+
+    return summary_df, levels_df
+
+
+def transform_spo2(payload: list[dict[str, Any]] | dict[str, Any], device: str) -> pd.DataFrame:
+    records = payload if isinstance(payload, list) else [payload]
+    rows = [
+        {
+            "date": record["dateTime"],
+            "device": device,
+            "avg": record["value"].get("avg"),
+            "min": record["value"].get("min"),
+            "max": record["value"].get("max"),
+        }
+        for record in records
+        if record.get("dateTime") and record.get("value")
+    ]
+    frame = pd.DataFrame(rows, columns=["date", "device", "avg", "min", "max"])
+    if not frame.empty:
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+    return frame
+
+
+def transform_spo2_intraday(
+    payload: list[dict[str, Any]] | dict[str, Any], device: str
+) -> pd.DataFrame:
+    records = payload if isinstance(payload, list) else [payload]
+    rows = [
+        (minute["minute"], minute["value"])
+        for record in records
+        for minute in record.get("minutes", [])
+        if minute.get("minute") and minute.get("value") is not None
+    ]
+    if not rows:
+        return pd.DataFrame(columns=["timestamp", "device", "value"])
+    frame = pd.DataFrame(rows, columns=["timestamp", "value"])
+    return pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(frame["timestamp"]),
+            "device": device,
+            "value": pd.to_numeric(frame["value"]),
+        }
+    ).drop_duplicates(["timestamp", "device"], keep="last")
+
+
+def _daily_frame(
+    series: dict[str, list[dict[str, Any]]], columns: dict[str, str], device: str
+) -> pd.DataFrame:
+    """Pivot several Fitbit {dateTime, value} time series into one row per date."""
+    merged: dict[str, dict[str, Any]] = {}
+    for key, column in columns.items():
+        for record in series.get(key, []) or []:
+            date = record.get("dateTime")
+            if date is None:
+                continue
+            merged.setdefault(date, {"date": date, "device": device})[column] = record.get("value")
+
+    frame = pd.DataFrame(list(merged.values()), columns=["date", "device", *columns.values()])
+    if not frame.empty:
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+        for column in columns.values():
+            frame[column] = pd.to_numeric(frame[column])
+    return frame
+
+
+def transform_daily_summary(results: dict[str, Any], device: str) -> pd.DataFrame:
+    return _daily_frame(
+        results, {"steps": "steps", "calories": "calories", "distance": "distance"}, device
+    )
+
+
+def transform_activity_minutes(results: dict[str, Any], device: str) -> pd.DataFrame:
+    return _daily_frame(
+        results,
+        {
+            "minutesSedentary": "minutes_sedentary",
+            "minutesLightlyActive": "minutes_lightly_active",
+            "minutesFairlyActive": "minutes_fairly_active",
+            "minutesVeryActive": "minutes_very_active",
+        },
+        device,
+    )
+
+
+def transform_hr_zones(
+    zone_records: list[dict[str, Any]],
+    azm_records: list[dict[str, Any]],
+    device: str,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Split activities-heart range records into hr_zones and resting_hr rows."""
+    zone_columns = {
+        "Out of Range": "normal_minutes",
+        "Rest": "normal_minutes",
+        "Fat Burn": "fat_burn_minutes",
+        "Cardio": "cardio_minutes",
+        "Peak": "peak_minutes",
+    }
+    azm = {
+        record["dateTime"]: record.get("value", {}).get("activeZoneMinutes", 0)
+        for record in azm_records
+        if record.get("dateTime")
+    }
+
+    zones = []
+    resting = []
+    for record in zone_records:
+        date = record.get("dateTime")
+        value = record.get("value", {})
+        if date is None:
+            continue
+        row = {
+            "date": date,
+            "device": device,
+            "normal_minutes": 0,
+            "fat_burn_minutes": 0,
+            "cardio_minutes": 0,
+            "peak_minutes": 0,
+            "active_zone_minutes": azm.get(date, 0),
+        }
+        for zone in value.get("heartRateZones", []):
+            column = zone_columns.get(zone.get("name", ""))
+            if column:
+                row[column] = zone.get("minutes", 0) or 0
+        zones.append(row)
+        if value.get("restingHeartRate") is not None:
+            resting.append({"date": date, "device": device, "value": value["restingHeartRate"]})
+
+    zones_df = pd.DataFrame(
+        zones,
+        columns=[
+            "date",
+            "device",
+            "normal_minutes",
+            "fat_burn_minutes",
+            "cardio_minutes",
+            "peak_minutes",
+            "active_zone_minutes",
+        ],
+    )
+    resting_df = pd.DataFrame(resting, columns=["date", "device", "value"])
+    for frame in (zones_df, resting_df):
+        if not frame.empty:
+            frame["date"] = pd.to_datetime(frame["date"]).dt.date
+    return zones_df, resting_df
+
+
+def transform_hrv(records: list[dict[str, Any]], device: str) -> pd.DataFrame:
+    rows = [
+        {
+            "date": record["dateTime"],
+            "device": device,
+            "daily_rmssd": record["value"].get("dailyRmssd"),
+            "deep_rmssd": record["value"].get("deepRmssd"),
+        }
+        for record in records
+        if record.get("dateTime") and record.get("value")
+    ]
+    frame = pd.DataFrame(rows, columns=["date", "device", "daily_rmssd", "deep_rmssd"])
+    if not frame.empty:
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+    return frame
+
+
+def transform_breathing_rate(records: list[dict[str, Any]], device: str) -> pd.DataFrame:
+    rows = [
+        {
+            "date": record["dateTime"],
+            "device": device,
+            "value": record["value"].get("breathingRate"),
+        }
+        for record in records
+        if record.get("dateTime") and record.get("value")
+    ]
+    frame = pd.DataFrame(rows, columns=["date", "device", "value"])
+    if not frame.empty:
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+    return frame
+
+
+def transform_skin_temperature(records: list[dict[str, Any]], device: str) -> pd.DataFrame:
+    rows = [
+        {
+            "date": record["dateTime"],
+            "device": device,
+            "relative_value": record["value"].get("nightlyRelative"),
+        }
+        for record in records
+        if record.get("dateTime") and record.get("value")
+    ]
+    frame = pd.DataFrame(rows, columns=["date", "device", "relative_value"])
+    if not frame.empty:
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+    return frame
+
+
+def transform_weight(records: list[dict[str, Any]], device: str) -> pd.DataFrame:
+    rows = [
+        {
+            "timestamp": f"{record['date']} {record.get('time', '00:00:00')}",
+            "device": device,
+            "value": record.get("weight"),
+            "bmi": record.get("bmi"),
+        }
+        for record in records
+        if record.get("date")
+    ]
+    frame = pd.DataFrame(rows, columns=["timestamp", "device", "value", "bmi"])
+    if not frame.empty:
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+    return frame
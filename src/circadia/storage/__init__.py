@@ -1,3 +1,14 @@
+from .cache import CacheStats, QueryCache
+from .coverage import CoverageIndex
 from .duckdb import DuckDBStorage
+from .export import ArrowExporter
+from .rollup import HeartRateRollup
 
-__all__ = ["DuckDBStorage"]
+__all__ = [
+    "ArrowExporter",
+    "CacheStats",
+    "CoverageIndex",
+    "DuckDBStorage",
+    "HeartRateRollup",
+    "QueryCache",
+]
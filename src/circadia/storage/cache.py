@@ -0,0 +1,119 @@
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+import pyarrow as pa
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+\"?([A-Za-z_][A-Za-z0-9_]*)\"?", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    return _WHITESPACE.sub(" ", query).strip().rstrip(";").strip()
+
+
+def referenced_tables(query: str) -> tuple[str, ...]:
+    """Best-effort list of tables a query reads, used to pick the data versions it depends on."""
+    return tuple(sorted({m.lower() for m in _TABLE_PATTERN.findall(query)}))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    result: pa.Table
+    tables: tuple[str, ...]
+    nbytes: int
+
+
+class QueryCache:
+    """
+    LRU cache of query results keyed by (normalized query, params, data versions).
+
+    Writers bump a table's version on commit, so an entry computed against an
+    older version can never be served again; invalidate() additionally frees the
+    memory held by those entries right away.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    @staticmethod
+    def make_key(query: str, params: Iterable[Any] | None, versions: dict[str, int]) -> Hashable:
+        return (
+            normalize_query(query),
+            tuple(params) if params is not None else (),
+            tuple(sorted(versions.items())),
+        )
+
+    def get(self, key: Hashable) -> pa.Table | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry.result
+
+    def put(self, key: Hashable, result: pa.Table, tables: tuple[str, ...]) -> None:
+        nbytes = result.nbytes
+        if nbytes > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._stats.bytes -= old.nbytes
+            self._entries[key] = _Entry(result, tables, nbytes)
+            self._stats.bytes += nbytes
+
+            while len(self._entries) > self.max_entries or self._stats.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._stats.bytes -= evicted.nbytes
+                self._stats.evictions += 1
+
+    def invalidate(self, table: str) -> int:
+        table = table.lower()
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if table in e.tables]
+            for key in stale:
+                self._stats.bytes -= self._entries.pop(key).nbytes
+            self._stats.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats.bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                invalidations=self._stats.invalidations,
+                entries=len(self._entries),
+                bytes=self._stats.bytes,
+            )
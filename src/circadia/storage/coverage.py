@@ -0,0 +1,188 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from .duckdb import DuckDBStorage
+
+
+@dataclass(frozen=True)
+class Stream:
+    name: str
+    table: str
+    time_column: str
+    granularity: timedelta
+    # A day counts as complete once this fraction of it is covered. Intraday
+    # heart rate never reaches 100% because the tracker is off-wrist while charging.
+    min_completeness: float
+
+
+STREAMS = {
+    "heart_rate": Stream(
+        "heart_rate", "heart_rate_intraday", "timestamp", timedelta(minutes=1), 0.8
+    ),
+    "steps": Stream("steps", "steps_intraday", "timestamp", timedelta(minutes=1), 1.0),
+    "sleep": Stream("sleep", "sleep_summary", "date", timedelta(days=1), 1.0),
+    "spo2": Stream("spo2", "spo2", "date", timedelta(days=1), 1.0),
+}
+
+
+def _to_runs(timestamps: np.ndarray, step_seconds: int) -> tuple[np.ndarray, np.ndarray]:
+    """Collapse timestamps into half-open [start, end) runs of consecutive buckets."""
+    seconds = timestamps.astype("datetime64[s]").astype(np.int64)
+    buckets = np.unique(seconds - seconds % step_seconds)
+    breaks = np.flatnonzero(np.diff(buckets) > step_seconds) + 1
+    starts = buckets[np.concatenate(([0], breaks))]
+    ends = buckets[np.concatenate((breaks - 1, [len(buckets) - 1]))] + step_seconds
+    return starts.astype("datetime64[s]"), ends.astype("datetime64[s]")
+
+
+def _merge(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    running_end = np.maximum.accumulate(ends)
+    # A new interval begins wherever the start lies beyond everything seen so far.
+    first = np.flatnonzero(np.concatenate(([True], starts[1:] > running_end[:-1])))
+    last = np.concatenate((first[1:] - 1, [len(starts) - 1]))
+    return starts[first], running_end[last]
+
+
+class CoverageIndex:
+    """
+    Per-stream, per-device interval index of which time ranges hold data.
+
+    Ingest records the timestamps it wrote; adjacent and overlapping runs are
+    merged, so the index stays at a handful of rows per device-day and gap or
+    completeness queries never touch the underlying stream tables.
+    """
+
+    def __init__(self, storage: DuckDBStorage):
+        self.storage = storage
+
+    def record(self, stream: str, device: str, timestamps: Iterable[datetime | date]) -> int:
+        """Add ingested timestamps to the index. Returns the number of stored intervals touched."""
+        spec = STREAMS[stream]
+        values = np.asarray(list(timestamps) if not hasattr(timestamps, "dtype") else timestamps)
+        if values.size == 0:
+            return 0
+        starts, ends = _to_runs(values, int(spec.granularity.total_seconds()))
+
+        lo = starts.min().astype(datetime)
+        hi = ends.max().astype(datetime)
+        conn = self.storage.conn
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            existing = conn.execute(
+                """
+                SELECT start_time, end_time FROM coverage
+                WHERE stream = ? AND device = ? AND start_time <= ? AND end_time >= ?
+                """,
+                [stream, device, hi, lo],
+            ).fetchnumpy()
+            if len(existing["start_time"]):
+                stored_starts = np.asarray(existing["start_time"], dtype="datetime64[s]")
+                stored_ends = np.asarray(existing["end_time"], dtype="datetime64[s]")
+                starts = np.concatenate((starts, stored_starts))
+                ends = np.concatenate((ends, stored_ends))
+                conn.execute(
+                    """
+                    DELETE FROM coverage
+                    WHERE stream = ? AND device = ? AND start_time <= ? AND end_time >= ?
+                    """,
+                    [stream, device, hi, lo],
+                )
+            starts, ends = _merge(starts, ends)
+            conn.executemany(
+                "INSERT INTO coverage VALUES (?, ?, ?, ?)",
+                [
+                    [stream, device, s, e]
+                    for s, e in zip(starts.astype(datetime), ends.astype(datetime))
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self.storage.bump_version("coverage")
+        return len(starts)
+
+    def intervals(
+        self, stream: str, device: str, start: datetime, end: datetime
+    ) -> list[tuple[datetime, datetime]]:
+        rows = self.storage.execute(
+            """
+            SELECT greatest(start_time, ?), least(end_time, ?) FROM coverage
+            WHERE stream = ? AND device = ? AND start_time < ? AND end_time > ?
+            ORDER BY start_time
+            """,
+            [start, end, stream, device, end, start],
+        ).fetchall()
+        return [(s, e) for s, e in rows]
+
+    def gaps(
+        self, stream: str, device: str, start: datetime, end: datetime
+    ) -> list[tuple[datetime, datetime]]:
+        """Missing [start, end) ranges of a stream inside the requested window."""
+        gaps = []
+        cursor = start
+        for s, e in self.intervals(stream, device, start, end):
+            if s > cursor:
+                gaps.append((cursor, s))
+            cursor = max(cursor, e)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def completeness(self, stream: str, device: str, start: datetime, end: datetime) -> float:
+        total = (end - start).total_seconds()
+        if total <= 0:
+            return 1.0
+        covered = sum(
+            (e - s).total_seconds() for s, e in self.intervals(stream, device, start, end)
+        )
+        return covered / total
+
+    def daily_completeness(
+        self, stream: str, device: str, start_date: str, end_date: str
+    ) -> dict[str, float]:
+        """Covered fraction of every day in [start_date, end_date], computed in one query."""
+        rows = self.storage.execute(
+            """
+            WITH days AS (
+                SELECT CAST(d AS TIMESTAMP) AS day_start
+                FROM generate_series(CAST(? AS DATE), CAST(? AS DATE), INTERVAL 1 DAY) t(d)
+            )
+            SELECT
+                CAST(days.day_start AS DATE),
+                coalesce(sum(epoch(
+                    least(c.end_time, days.day_start + INTERVAL 1 DAY)
+                    - greatest(c.start_time, days.day_start)
+                )) FILTER (WHERE c.start_time IS NOT NULL), 0) / 86400.0
+            FROM days
+            LEFT JOIN coverage c
+                ON c.stream = ? AND c.device = ?
+                AND c.start_time < days.day_start + INTERVAL 1 DAY
+                AND c.end_time > days.day_start
+            GROUP BY 1
+            ORDER BY 1
+            """,
+            [start_date, end_date, stream, device],
+        ).fetchall()
+        return {d.isoformat(): float(fraction) for d, fraction in rows}
+
+    def missing_dates(
+        self,
+        stream: str,
+        device: str,
+        start_date: str,
+        end_date: str,
+        min_completeness: float | None = None,
+    ) -> list[str]:
+        """Days whose coverage falls below the stream's completeness threshold."""
+        threshold = (
+            STREAMS[stream].min_completeness if min_completeness is None else min_completeness
+        )
+        daily = self.daily_completeness(stream, device, start_date, end_date)
+        return [day for day, fraction in daily.items() if fraction < threshold]
@@ -1,9 +1,31 @@
+import time
+from collections.abc import Iterable
 from datetime import datetime
 from pathlib import Path
-
 from typing import Any
 
 import duckdb
+import pandas as pd
+import pyarrow as pa
+
+from ..telemetry import REGISTRY
+from .cache import QueryCache, referenced_tables
+
+ROWS_WRITTEN = REGISTRY.counter(
+    "circadia_storage_rows_written_total", "Rows inserted or changed by upserts", ["table"]
+)
+WRITE_SECONDS = REGISTRY.histogram(
+    "circadia_storage_write_seconds", "Upsert latency, including the version bump", ["table"]
+)
+WRITE_ROWS_PER_SECOND = REGISTRY.gauge(
+    "circadia_storage_write_rows_per_second", "Throughput of the latest upsert", ["table"]
+)
+QUERY_SECONDS = REGISTRY.histogram(
+    "circadia_storage_query_seconds", "Latency of queries that missed the result cache"
+)
+QUERY_CACHE = REGISTRY.counter(
+    "circadia_storage_query_cache_total", "Result cache lookups", ["result"]
+)
 
 
 def get_schema() -> list[str]:
@@ -17,6 +39,40 @@ def get_schema() -> list[str]:
         );
         """,
         """
+        CREATE TABLE IF NOT EXISTS heart_rate_minute (
+            timestamp TIMESTAMP NOT NULL,
+            device VARCHAR,
+            min INTEGER,
+            min_at TIMESTAMP,
+            max INTEGER,
+            max_at TIMESTAMP,
+            mean DOUBLE,
+            samples INTEGER,
+            PRIMARY KEY (timestamp, device)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS intraday_hr_features (
+            date DATE NOT NULL,
+            device VARCHAR NOT NULL,
+            samples INTEGER,
+            minutes_covered DOUBLE,
+            hr_mean DOUBLE,
+            hr_sd DOUBLE,
+            hr_p5 DOUBLE,
+            hr_p50 DOUBLE,
+            hr_p95 DOUBLE,
+            minutes_above_100 DOUBLE,
+            minutes_above_120 DOUBLE,
+            overnight_min_hr DOUBLE,
+            sdnn_proxy DOUBLE,
+            sdann_proxy DOUBLE,
+            rmssd_proxy DOUBLE,
+            pnn50_proxy DOUBLE,
+            PRIMARY KEY (date, device)
+        );
+        """,
+        """
         CREATE TABLE IF NOT EXISTS steps_intraday (
             timestamp TIMESTAMP NOT NULL,
             device VARCHAR,
@@ -52,6 +108,16 @@ def get_schema() -> list[str]:
         );
         """,
         """
+        CREATE TABLE IF NOT EXISTS sleep_regularity (
+            date DATE NOT NULL,
+            device VARCHAR NOT NULL,
+            sleep_regularity_index DOUBLE,
+            sleep_midpoint_minutes DOUBLE,
+            midpoint_phase_minutes DOUBLE,
+            PRIMARY KEY (date, device)
+        );
+        """,
+        """
         CREATE TABLE IF NOT EXISTS resting_hr (
             date DATE NOT NULL,
             device VARCHAR,
@@ -189,19 +255,132 @@ def get_schema() -> list[str]:
             PRIMARY KEY (date, device)
         );
         """,
+        """
+        CREATE TABLE IF NOT EXISTS dashboard_snapshot (
+            device VARCHAR NOT NULL,
+            metric VARCHAR NOT NULL,
+            as_of DATE,
+            latest_date DATE,
+            latest DOUBLE,
+            status VARCHAR,
+            mean_7d DOUBLE,
+            mean_30d DOUBLE,
+            mean_90d DOUBLE,
+            trend DOUBLE,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (device, metric)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS feature_store (
+            date DATE NOT NULL,
+            device VARCHAR NOT NULL,
+            feature_name VARCHAR NOT NULL,
+            feature_version INTEGER NOT NULL,
+            value DOUBLE,
+            input_hash UBIGINT,
+            computed_at TIMESTAMP,
+            PRIMARY KEY (date, device, feature_name, feature_version)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS tuning_results (
+            data_hash VARCHAR NOT NULL,
+            n_splits INTEGER NOT NULL,
+            model_type VARCHAR NOT NULL,
+            params VARCHAR NOT NULL,
+            fold INTEGER NOT NULL,
+            r2 DOUBLE,
+            mae DOUBLE,
+            fit_seconds DOUBLE,
+            created_at TIMESTAMP,
+            PRIMARY KEY (data_hash, n_splits, model_type, params, fold)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS coverage (
+            stream VARCHAR NOT NULL,
+            device VARCHAR NOT NULL,
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP NOT NULL,
+            PRIMARY KEY (stream, device, start_time)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS baselines (
+            metric VARCHAR NOT NULL,
+            device VARCHAR NOT NULL,
+            count BIGINT,
+            mean DOUBLE,
+            m2 DOUBLE,
+            ewma DOUBLE,
+            ewm_var DOUBLE,
+            last_date DATE,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (metric, device)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS detector_state (
+            metric VARCHAR NOT NULL,
+            device VARCHAR NOT NULL,
+            count BIGINT,
+            level DOUBLE,
+            variance DOUBLE,
+            cusum_high DOUBLE,
+            cusum_low DOUBLE,
+            last_timestamp TIMESTAMP,
+            last_alert TIMESTAMP,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (metric, device)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS alerts (
+            timestamp TIMESTAMP NOT NULL,
+            device VARCHAR NOT NULL,
+            metric VARCHAR NOT NULL,
+            direction VARCHAR NOT NULL,
+            value DOUBLE,
+            expected DOUBLE,
+            zscore DOUBLE,
+            score DOUBLE,
+            created_at TIMESTAMP,
+            PRIMARY KEY (timestamp, device, metric, direction)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name VARCHAR PRIMARY KEY,
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMP
+        );
+        """,
     ]
 
 
 class DuckDBStorage:
-    def __init__(self, db_path: Path):
+    def __init__(
+        self,
+        db_path: Path,
+        cache_max_entries: int = 256,
+        cache_max_bytes: int = 256 * 1024 * 1024,
+        read_only: bool = False,
+    ):
         self.db_path = db_path
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Read-only connections can share the file with other readers but not a writer.
+        self.read_only = read_only
+        if not read_only:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._conn: duckdb.DuckDBPyConnection | None = None
+        self._versions: dict[str, int] | None = None
+        self._primary_keys: dict[str, list[str]] = {}
+        self.cache = QueryCache(max_entries=cache_max_entries, max_bytes=cache_max_bytes)
 
     @property
     def conn(self) -> duckdb.DuckDBPyConnection:
         if self._conn is None:
-            self._conn = duckdb.connect(str(self.db_path))
+            self._conn = duckdb.connect(str(self.db_path), read_only=self.read_only)
         return self._conn
 
     def init_schema(self) -> None:
@@ -212,6 +391,124 @@ class DuckDBStorage:
     def execute(self, query: str, *args) -> Any:
         return self.conn.execute(query, *args)
 
+    def _read_versions(self) -> dict[str, int]:
+        try:
+            rows = self.conn.execute("SELECT table_name, version FROM data_versions").fetchall()
+        except duckdb.CatalogException:
+            rows = []
+        self._versions = versions = {name: version for name, version in rows}
+        return versions
+
+    def _known_versions(self) -> dict[str, int]:
+        return self._versions if self._versions is not None else self._read_versions()
+
+    def reload_versions(self) -> dict[str, int]:
+        """Re-read data versions, picking up commits made by other connections."""
+        return dict(self._read_versions())
+
+    def data_version(self, table: str) -> int:
+        return self._known_versions().get(table.lower(), 0)
+
+    def bump_version(self, *tables: str) -> None:
+        """Mark tables as changed. Every writer calls this after committing rows."""
+        versions = self._known_versions()
+        now = datetime.now()
+        for table in tables:
+            table = table.lower()
+            version = versions.get(table, 0) + 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO data_versions VALUES (?, ?, ?)", [table, version, now]
+            )
+            versions[table] = version
+            self.cache.invalidate(table)
+
+    def _primary_key(self, table: str) -> list[str]:
+        if table not in self._primary_keys:
+            row = self.conn.execute(
+                """
+                SELECT constraint_column_names FROM duckdb_constraints()
+                WHERE table_name = ? AND constraint_type = 'PRIMARY KEY'
+                """,
+                [table],
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Table {table} has no primary key to upsert on")
+            self._primary_keys[table] = list(row[0])
+        return self._primary_keys[table]
+
+    def upsert(self, table: str, rows: pd.DataFrame | pa.Table) -> int:
+        """
+        Idempotently write rows keyed on the table's primary key.
+
+        Rows already stored with the same values are skipped, and the table's
+        version is only bumped when something was inserted or replaced, so
+        re-ingesting an unchanged payload leaves caches and derived tables
+        alone. Returns the number of rows inserted or replaced.
+        """
+        if len(rows) == 0:
+            return 0
+
+        start = time.perf_counter()
+        columns = list(rows.columns) if isinstance(rows, pd.DataFrame) else rows.column_names
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        key_list = ", ".join(f'"{c}"' for c in self._primary_key(table))
+
+        self.conn.register("_upsert_rows", rows)
+        try:
+            written: int = self.execute(
+                f"""
+                INSERT OR REPLACE INTO "{table}" ({column_list})
+                SELECT {column_list} FROM _upsert_rows
+                EXCEPT
+                SELECT {column_list} FROM "{table}" SEMI JOIN _upsert_rows USING ({key_list})
+                """
+            ).fetchone()[0]
+        finally:
+            self.conn.unregister("_upsert_rows")
+
+        if written:
+            self.bump_version(table)
+
+        elapsed = time.perf_counter() - start
+        ROWS_WRITTEN.inc(written, table=table)
+        WRITE_SECONDS.observe(elapsed, table=table)
+        WRITE_ROWS_PER_SECOND.set(len(rows) / elapsed if elapsed > 0 else 0.0, table=table)
+        return written
+
+    def query(
+        self,
+        query: str,
+        params: Iterable[Any] | None = None,
+        tables: Iterable[str] | None = None,
+    ) -> pa.Table:
+        """
+        Run a read-only query through the result cache.
+
+        The cache key includes the current data version of every table the
+        query reads (parsed from FROM/JOIN clauses unless tables is given), so
+        results are reused until a writer bumps one of those versions.
+        """
+        params = list(params) if params is not None else None
+        tables = tuple(sorted({t.lower() for t in tables})) if tables else referenced_tables(query)
+        versions = {table: self.data_version(table) for table in tables}
+        key = self.cache.make_key(query, params, versions)
+
+        result = self.cache.get(key)
+        if result is None:
+            QUERY_CACHE.inc(result="miss")
+            start = time.perf_counter()
+            cursor = self.conn.execute(query, params) if params else self.conn.execute(query)
+            # duckdb>=1.5 deprecates fetch_arrow_table in favour of to_arrow_table.
+            if hasattr(cursor, "to_arrow_table"):
+                result = cursor.to_arrow_table()
+            else:
+                result = cursor.fetch_arrow_table()
+            QUERY_SECONDS.observe(time.perf_counter() - start)
+            self.cache.put(key, result, tables)
+        else:
+            QUERY_CACHE.inc(result="hit")
+        return result
+
     def close(self) -> None:
         if self._conn:
             self._conn.close()
@@ -0,0 +1,252 @@
+import argparse
+import json
+import logging
+import socket
+import socketserver
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import pyarrow as pa
+
+from .duckdb import DuckDBStorage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 65_536
+
+TIME_COLUMNS = ("timestamp", "date", "last_sync_time")
+
+
+def _record_batch_reader(result: Any, batch_size: int) -> pa.RecordBatchReader:
+    # duckdb>=1.5 renamed fetch_record_batch; both stream without materializing.
+    if hasattr(result, "to_arrow_reader"):
+        return result.to_arrow_reader(batch_size)
+    return result.fetch_record_batch(batch_size)
+
+
+class ArrowExporter:
+    """Stream tables or date/device slices out of DuckDB as Arrow record batches."""
+
+    def __init__(self, storage: DuckDBStorage, batch_size: int = DEFAULT_BATCH_SIZE):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.storage = storage
+        self.batch_size = batch_size
+
+    def tables(self) -> list[str]:
+        rows = self.storage.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = 'main' "
+            "ORDER BY table_name"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def columns(self, table: str) -> list[str]:
+        rows = self.storage.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = 'main' AND table_name = ? ORDER BY ordinal_position",
+            [table],
+        ).fetchall()
+        if not rows:
+            raise ValueError(f"Unknown table: {table}")
+        return [row[0] for row in rows]
+
+    def build_query(
+        self,
+        table: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        device: str | None = None,
+        order: bool = False,
+    ) -> tuple[str, list[Any]]:
+        """
+        SELECT for a table slice. Rows come back in storage order unless order
+        is set; sorting by time has to see the whole slice before the first
+        batch can be sent.
+        """
+        columns = self.columns(table)
+        time_column = next((c for c in TIME_COLUMNS if c in columns), None)
+
+        conditions = []
+        params: list[Any] = []
+        if start_date or end_date:
+            if time_column is None:
+                raise ValueError(f"Table {table} has no date column to slice on")
+            if start_date:
+                conditions.append(f"{time_column} >= CAST(? AS DATE)")
+                params.append(start_date)
+            if end_date:
+                conditions.append(f"{time_column} < CAST(? AS DATE) + INTERVAL 1 DAY")
+                params.append(end_date)
+        if device:
+            if "device" not in columns:
+                raise ValueError(f"Table {table} has no device column")
+            conditions.append("device = ?")
+            params.append(device)
+
+        query = f'SELECT * FROM "{table}"'
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if order and time_column:
+            query += f" ORDER BY {time_column}"
+        return query, params
+
+    def reader(
+        self,
+        table: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        device: str | None = None,
+        order: bool = False,
+    ) -> pa.RecordBatchReader:
+        """
+        Open a streaming reader over a table slice.
+
+        Batches are pulled from DuckDB on demand, so memory stays bounded by
+        batch_size regardless of how large the slice is, unless order asks for
+        the slice sorted by time.
+        """
+        query, params = self.build_query(table, start_date, end_date, device, order)
+        # A dedicated cursor keeps concurrent exports from sharing result state.
+        result = self.storage.conn.cursor().execute(query, params)
+        return _record_batch_reader(result, self.batch_size)
+
+    def iter_batches(
+        self, table: str, order: bool = False, **filters: str | None
+    ) -> Iterator[pa.RecordBatch]:
+        yield from self.reader(table, order=order, **filters)
+
+    def write_stream(
+        self,
+        sink: BinaryIO | pa.NativeFile,
+        table: str,
+        order: bool = False,
+        **filters: str | None,
+    ) -> int:
+        """Write the slice to sink in Arrow IPC streaming format. Returns rows written."""
+        reader = self.reader(table, order=order, **filters)
+        rows = 0
+        with pa.ipc.new_stream(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows
+
+    def write_file(self, path: Path, table: str, order: bool = False, **filters: str | None) -> int:
+        """Write the slice to path in Arrow IPC file (Feather v2) format. Returns rows written."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        reader = self.reader(table, order=order, **filters)
+        rows = 0
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        logger.info(f"Exported {rows} rows from {table} to {path}")
+        return rows
+
+    def serve(self, socket_path: Path) -> None:
+        """
+        Serve exports over a local Unix socket.
+
+        Each connection sends one JSON line such as
+        {"table": "heart_rate_intraday", "start_date": "2024-01-01", "device": "Charge 6"}
+        (plus "order": true to sort by time) and receives the slice as an Arrow
+        IPC stream before the socket closes.
+        """
+        exporter = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                try:
+                    request = json.loads(self.rfile.readline())
+                    table = request.pop("table")
+                    filters = {k: request.get(k) for k in ("start_date", "end_date", "device")}
+                    order = bool(request.get("order"))
+                    rows = exporter.write_stream(self.wfile, table, order, **filters)
+                    logger.info(f"Streamed {rows} rows from {table}")
+                except (BrokenPipeError, ConnectionResetError):
+                    logger.warning("Export client disconnected")
+                except Exception:
+                    logger.exception("Export request failed")
+
+        if socket_path.exists():
+            socket_path.unlink()
+        with socketserver.ThreadingUnixStreamServer(str(socket_path), Handler) as server:
+            logger.info(f"Serving Arrow exports on {socket_path}")
+            try:
+                server.serve_forever()
+            finally:
+                socket_path.unlink(missing_ok=True)
+
+
+def read_from_socket(
+    socket_path: Path, table: str, order: bool = False, **filters: str | None
+) -> pa.RecordBatchReader:
+    """Client helper: request a slice from a running export server."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(str(socket_path))
+    request: dict[str, Any] = {"table": table, **{k: v for k, v in filters.items() if v}}
+    if order:
+        request["order"] = True
+    sock.sendall(json.dumps(request).encode() + b"\n")
+    return pa.ipc.open_stream(sock.makefile("rb"))
+
+
+def main(argv: list[str] | None = None) -> None:
+    from ..config import get_config
+
+    parser = argparse.ArgumentParser(
+        prog="circadia-export",
+        description="Export Circadia tables as Arrow IPC streams or files",
+    )
+    parser.add_argument("table", nargs="?", help="Table to export")
+    parser.add_argument("--start-date", help="First date to include (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Last date to include (YYYY-MM-DD)")
+    parser.add_argument("--device", help="Only export rows for this device")
+    parser.add_argument(
+        "--order",
+        action="store_true",
+        help="Sort rows by time (reads the whole slice before writing the first batch)",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="Write an IPC file here (default: stream to stdout)"
+    )
+    parser.add_argument("--socket", type=Path, help="Serve exports on this Unix socket")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--list", action="store_true", help="List exportable tables")
+    args = parser.parse_args(argv)
+
+    config = get_config()
+    # Read-only, so exports can run alongside other readers such as the dashboard.
+    storage = DuckDBStorage(config.database.path, read_only=True)
+    exporter = ArrowExporter(storage, batch_size=args.batch_size)
+
+    try:
+        if args.list:
+            for table in exporter.tables():
+                print(table)
+            return
+
+        if args.socket:
+            exporter.serve(args.socket)
+            return
+
+        if not args.table:
+            parser.error("table is required unless --list or --socket is given")
+
+        filters = {
+            "start_date": args.start_date,
+            "end_date": args.end_date,
+            "device": args.device,
+        }
+        if args.output:
+            exporter.write_file(args.output, args.table, args.order, **filters)
+        else:
+            exporter.write_stream(sys.stdout.buffer, args.table, args.order, **filters)
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
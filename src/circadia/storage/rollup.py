@@ -0,0 +1,143 @@
+import logging
+from datetime import date, datetime
+from typing import Any
+
+import pyarrow as pa
+
+from .duckdb import DuckDBStorage
+
+logger = logging.getLogger(__name__)
+
+# Bucket widths in seconds, finest first. Buckets of a minute or more read the
+# per-minute rollup, finer ones the raw samples.
+RESOLUTIONS = (1, 5, 15, 60, 300, 900, 3600, 3 * 3600, 86400, 7 * 86400)
+ROLLUP_SECONDS = 60
+DEFAULT_MAX_POINTS = 2000
+
+# Per bucket, the samples holding its minimum and maximum, so spikes survive
+# any amount of downsampling.
+DOWNSAMPLE_QUERY = """
+WITH buckets AS (
+    SELECT
+        device,
+        time_bucket(INTERVAL '{width} seconds', timestamp) AS bucket,
+        arg_min({min_at}, {min}) AS min_at,
+        min({min}) AS min,
+        arg_max({max_at}, {max}) AS max_at,
+        max({max}) AS max
+    FROM {table}
+    WHERE timestamp >= ? AND timestamp < ? {device_filter}
+    GROUP BY 1, 2
+)
+SELECT device, min_at AS timestamp, min AS value FROM buckets
+UNION
+SELECT device, max_at AS timestamp, max AS value FROM buckets
+ORDER BY device, timestamp
+"""
+
+
+def pick_resolution(start: datetime, end: datetime, max_points: int = DEFAULT_MAX_POINTS) -> int:
+    """Finest bucket width whose two points per bucket fit in max_points over [start, end)."""
+    span = (end - start).total_seconds()
+    for width in RESOLUTIONS:
+        if 2 * -(-span // width) <= max_points:
+            return width
+    return RESOLUTIONS[-1]
+
+
+class HeartRateRollup:
+    """
+    Min/max downsampling of intraday heart rate for charts.
+
+    heart_rate_minute keeps, per device and minute, the lowest and highest
+    sample with their timestamps. downsample() picks the bucket width that
+    fits the requested window into max_points and returns the minimum and
+    maximum sample of every bucket, read from the raw table for sub-minute
+    buckets and from the rollup otherwise, so a year costs about as much as
+    an hour. Ingest calls refresh() for the range it wrote; call it without
+    arguments once to build the rollup for an existing database.
+    """
+
+    def __init__(self, storage: DuckDBStorage):
+        self.storage = storage
+
+    def refresh(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        device: str | None = None,
+    ) -> int:
+        """Recompute every minute holding samples in [start, end], whole minutes included."""
+        conditions = []
+        params: list[Any] = []
+        if start is not None:
+            conditions.append("timestamp >= time_bucket(INTERVAL 1 MINUTE, CAST(? AS TIMESTAMP))")
+            params.append(start)
+        if end is not None:
+            conditions.append(
+                "timestamp < time_bucket(INTERVAL 1 MINUTE, CAST(? AS TIMESTAMP)) + INTERVAL 1 MINUTE"
+            )
+            params.append(end)
+        if device:
+            conditions.append("device = ?")
+            params.append(device)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        rows: int = self.storage.execute(
+            f"""
+            INSERT OR REPLACE INTO heart_rate_minute
+            SELECT
+                time_bucket(INTERVAL 1 MINUTE, timestamp),
+                device,
+                min(value),
+                arg_min(timestamp, value),
+                max(value),
+                arg_max(timestamp, value),
+                avg(value),
+                count(*)
+            FROM heart_rate_intraday
+            {where}
+            GROUP BY 1, 2
+            """,
+            params,
+        ).fetchone()[0]
+        self.storage.bump_version("heart_rate_minute")
+        logger.info(f"Refreshed {rows} heart rate minutes")
+        return rows
+
+    def downsample(
+        self,
+        start: str | date | datetime,
+        end: str | date | datetime,
+        device: str | None = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+    ) -> pa.Table:
+        """
+        At most max_points (timestamp, value) samples per device covering
+        [start, end); dates cover whole days, so end is exclusive.
+        """
+        start, end = _as_datetime(start), _as_datetime(end)
+        width = pick_resolution(start, end, max_points)
+        if width < ROLLUP_SECONDS:
+            columns = {"table": "heart_rate_intraday", "min_at": "timestamp", "max_at": "timestamp"}
+            columns.update({"min": "value", "max": "value"})
+        else:
+            columns = {"table": "heart_rate_minute", "min_at": "min_at", "max_at": "max_at"}
+            columns.update({"min": "min", "max": "max"})
+
+        params: list[Any] = [start, end]
+        if device:
+            params.append(device)
+        query = DOWNSAMPLE_QUERY.format(
+            width=width, device_filter="AND device = ?" if device else "", **columns
+        )
+        logger.debug(f"Downsampling heart rate {start} to {end} into {width}s buckets")
+        return self.storage.query(query, params)
+
+
+def _as_datetime(value: str | date | datetime) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return datetime.fromisoformat(value)
@@ -0,0 +1,15 @@
+from .metrics import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry
+from .profiling import PROFILER, Profiler, StageStats, parse_modes, profiled
+
+__all__ = [
+    "PROFILER",
+    "REGISTRY",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "Profiler",
+    "StageStats",
+    "parse_modes",
+    "profiled",
+]
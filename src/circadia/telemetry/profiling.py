@@ -0,0 +1,316 @@
+import atexit
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, TypeVar, cast
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "CIRCADIA_PROFILE"
+PROFILE_DIR_ENV = "CIRCADIA_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = Path("./data/profiles")
+MODES = ("cpu", "memory")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def parse_modes(value: str | Iterable[str] | None) -> frozenset[str]:
+    """
+    Profiling modes from a setting: "cpu", "memory" or both comma-separated;
+    1/true/all mean both and 0/false/empty turn profiling off.
+    """
+    if value is None:
+        return frozenset()
+    if not isinstance(value, str):
+        modes = {mode.strip().lower() for mode in value}
+    elif value.strip().lower() in ("", "0", "false", "off", "no"):
+        return frozenset()
+    elif value.strip().lower() in ("1", "true", "on", "yes", "all"):
+        return frozenset(MODES)
+    else:
+        modes = {mode.strip().lower() for mode in value.split(",") if mode.strip()}
+    unknown = modes - set(MODES)
+    if unknown:
+        raise ValueError(f"Unknown profiling modes: {', '.join(sorted(unknown))}")
+    return frozenset(modes)
+
+
+@dataclass
+class StageStats:
+    name: str
+    calls: int = 0
+    # Wall time including nested stages.
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    # Highest traced memory above the level at entry, over all calls.
+    peak_bytes: int = 0
+    # Functions run by this stage itself; nested stages are profiled separately.
+    stats: pstats.Stats | None = None
+    # Allocation sites that grew the most during the call with the highest peak.
+    top_allocations: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _ActiveStage:
+    name: str
+    profile: cProfile.Profile | None = None
+    snapshot: tracemalloc.Snapshot | None = None
+    memory_start: int = 0
+    memory_peak: int = 0
+    start: float = 0.0
+    # Profiler bookkeeping spent entering this stage, and inside nested stages.
+    overhead: float = 0.0
+    nested_overhead: float = 0.0
+
+
+class Profiler:
+    """
+    Opt-in per-stage profiling of the pipeline.
+
+    Pipeline entry points are wrapped with profiled(stage). While no mode is
+    enabled the wrapper only checks a flag. With "cpu", each stage runs under
+    cProfile, pausing its caller's profile so every stage reports its own
+    functions. cProfile can be active once per process, so stages entered on
+    another thread while it is in use record timings only. With "memory",
+    tracemalloc records each stage's peak above its starting level and the
+    allocation sites of its worst call. Profiler bookkeeping is excluded from
+    stage times, but tracemalloc slows everything it traces.
+
+    Results accumulate per stage name across calls. write_report() saves
+    <stage>.prof files (pstats format, for snakeviz and friends) and a text
+    summary to output_dir. It runs at exit and, at most every report_interval
+    seconds, whenever an outermost stage finishes.
+    """
+
+    def __init__(
+        self,
+        modes: str | Iterable[str] | None = None,
+        output_dir: Path = DEFAULT_PROFILE_DIR,
+        top: int = 30,
+        report_interval: float = 60.0,
+    ):
+        self.modes: frozenset[str] = frozenset()
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self.report_interval = report_interval
+        self._stages: dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cpu_thread: int | None = None
+        self._last_report = time.monotonic()
+        self._registered = False
+        self.configure(modes)
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        return cls(
+            os.environ.get(PROFILE_ENV),
+            Path(os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.modes)
+
+    def configure(
+        self,
+        modes: str | Iterable[str] | None,
+        output_dir: Path | None = None,
+        top: int | None = None,
+    ) -> None:
+        self.modes = parse_modes(modes)
+        if output_dir is not None:
+            self.output_dir = Path(output_dir)
+        if top is not None:
+            self.top = top
+        if "memory" in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.enabled and not self._registered:
+            atexit.register(self.write_report)
+            self._registered = True
+        if self.enabled:
+            logger.info(f"Profiling {', '.join(sorted(self.modes))} into {self.output_dir}")
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        stack = self._local.__dict__.setdefault("stack", [])
+        active = self._enter(name, stack)
+        try:
+            yield
+        finally:
+            self._exit(active, stack)
+
+    def _enter(self, name: str, stack: list[_ActiveStage]) -> _ActiveStage:
+        started = time.perf_counter()
+        parent = stack[-1] if stack else None
+        active = _ActiveStage(name)
+        # Pause the caller first so the bookkeeping below never shows in its profile.
+        if parent is not None and parent.profile is not None:
+            parent.profile.disable()
+
+        if "memory" in self.modes and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent.memory_peak = max(parent.memory_peak, peak)
+            tracemalloc.reset_peak()
+            active.memory_start = active.memory_peak = current
+            active.snapshot = tracemalloc.take_snapshot()
+
+        if "cpu" in self.modes:
+            if parent is not None and parent.profile is not None:
+                active.profile = cProfile.Profile()
+            else:
+                with self._lock:
+                    if self._cpu_thread is None:
+                        self._cpu_thread = threading.get_ident()
+                        active.profile = cProfile.Profile()
+
+        stack.append(active)
+        active.start = time.perf_counter()
+        active.overhead = active.start - started
+        if active.profile is not None:
+            try:
+                active.profile.enable()
+            except ValueError:
+                # Another profiler or debugger owns the interpreter hook.
+                active.profile = None
+                if parent is None:
+                    self._cpu_thread = None
+        return active
+
+    def _exit(self, active: _ActiveStage, stack: list[_ActiveStage]) -> None:
+        if active.profile is not None:
+            active.profile.disable()
+        stopped = time.perf_counter()
+        # Time spent profiling nested stages is not this stage's work.
+        elapsed = stopped - active.start - active.nested_overhead
+        stack.pop()
+        parent = stack[-1] if stack else None
+
+        peak_bytes = 0
+        if active.snapshot is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(active.memory_peak, peak)
+            if parent is not None:
+                parent.memory_peak = max(parent.memory_peak, peak)
+            tracemalloc.reset_peak()
+            peak_bytes = peak - active.memory_start
+
+        with self._lock:
+            stage = self._stages.setdefault(active.name, StageStats(active.name))
+            stage.calls += 1
+            stage.seconds += elapsed
+            stage.max_seconds = max(stage.max_seconds, elapsed)
+            if active.profile is not None:
+                if stage.stats is None:
+                    stage.stats = pstats.Stats(active.profile)
+                else:
+                    stage.stats.add(active.profile)
+            record_allocations = peak_bytes > stage.peak_bytes
+            stage.peak_bytes = max(stage.peak_bytes, peak_bytes)
+
+        if record_allocations and active.snapshot is not None:
+            diff = tracemalloc.take_snapshot().compare_to(active.snapshot, "lineno")
+            # The entry snapshot itself is the profiler's allocation, not the stage's.
+            diff = [line for line in diff if line.traceback[0].filename != tracemalloc.__file__]
+            with self._lock:
+                stage.top_allocations = [str(line) for line in diff[:10]]
+
+        if not stack and time.monotonic() - self._last_report >= self.report_interval:
+            self.write_report()
+
+        if parent is not None:
+            parent.nested_overhead += (
+                active.overhead + active.nested_overhead + time.perf_counter() - stopped
+            )
+            if parent.profile is not None:
+                parent.profile.enable()
+        elif active.profile is not None:
+            with self._lock:
+                self._cpu_thread = None
+
+    def stages(self) -> dict[str, StageStats]:
+        with self._lock:
+            return dict(self._stages)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def write_report(self) -> Path | None:
+        """Write <stage>.prof files and report.txt to output_dir. Returns the report path."""
+        self._last_report = time.monotonic()
+        with self._lock:
+            stages = sorted(self._stages.values(), key=lambda s: s.seconds, reverse=True)
+            if not stages:
+                return None
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+
+            lines = [
+                (
+                    f"Profile written {datetime.now():%Y-%m-%d %H:%M:%S}, "
+                    f"modes: {', '.join(sorted(self.modes))}"
+                ),
+                "",
+                (
+                    f"{'stage':<32} {'calls':>7} {'total s':>10} {'mean s':>9} {'max s':>9} "
+                    f"{'peak MiB':>9}"
+                ),
+            ]
+            for stage in stages:
+                lines.append(
+                    f"{stage.name:<32} {stage.calls:>7} {stage.seconds:>10.3f} "
+                    f"{stage.seconds / stage.calls:>9.3f} {stage.max_seconds:>9.3f} "
+                    f"{stage.peak_bytes / 2**20:>9.1f}"
+                )
+
+            for stage in stages:
+                lines.extend(["", f"== {stage.name} =="])
+                if stage.stats is not None:
+                    stage.stats.dump_stats(self.output_dir / f"{stage.name}.prof")
+                    stream = io.StringIO()
+                    report = pstats.Stats(stream=stream).add(stage.stats)
+                    report.sort_stats("cumulative").print_stats(self.top)
+                    lines.append(stream.getvalue().strip())
+                if stage.top_allocations:
+                    lines.append("Largest allocation growth in the call with the highest peak:")
+                    lines.extend(f"  {line}" for line in stage.top_allocations)
+
+        path = self.output_dir / "report.txt"
+        path.write_text("\n".join(lines) + "\n")
+        logger.info(f"Profile report written to {path}")
+        return path
+
+
+# Process-wide profiler, enabled by CIRCADIA_PROFILE.
+PROFILER = Profiler.from_env()
+
+
+def profiled(stage: str) -> Callable[[F], F]:
+    """Run the decorated function as a profiling stage when profiling is enabled."""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with PROFILER.stage(stage):
+                return func(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
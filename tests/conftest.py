@@ -0,0 +1,84 @@
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from circadia.storage import DuckDBStorage
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> Iterator[DuckDBStorage]:
+    storage = DuckDBStorage(tmp_path / "circadia.duckdb")
+    storage.init_schema()
+    yield storage
+    storage.close()
+
+
+def _write_daily_history(
+    storage: DuckDBStorage, days: int, start: str = "2024-01-01", device: str = "test"
+) -> pd.DatetimeIndex:
+    """Plausible random daily aggregates for every table behind daily_features."""
+    rng = np.random.default_rng(days)
+    dates = pd.date_range(start, periods=days, freq="D")
+    base = pd.DataFrame({"date": dates.date, "device": device})
+
+    def ints(low: int, high: int) -> np.ndarray:
+        return rng.integers(low, high, days)
+
+    asleep = ints(300, 540)
+    tables = {
+        "sleep_summary": {
+            "is_main_sleep": True,
+            "efficiency": ints(75, 99),
+            "minutes_after_wakeup": ints(0, 60),
+            "minutes_asleep": asleep,
+            "minutes_to_fall_asleep": ints(0, 40),
+            "minutes_in_bed": asleep + ints(10, 60),
+            "minutes_awake": ints(10, 60),
+            "minutes_light": asleep // 2,
+            "minutes_rem": asleep // 5,
+            "minutes_deep": asleep // 6,
+        },
+        "resting_hr": {"value": ints(52, 68)},
+        "hrv": {"daily_rmssd": rng.normal(40, 8, days), "deep_rmssd": rng.normal(45, 8, days)},
+        "hr_zones": {
+            "normal_minutes": ints(800, 1200),
+            "fat_burn_minutes": ints(0, 60),
+            "cardio_minutes": ints(0, 20),
+            "peak_minutes": ints(0, 5),
+            "active_zone_minutes": ints(0, 60),
+        },
+        "activity_minutes": {
+            "minutes_sedentary": ints(500, 800),
+            "minutes_lightly_active": ints(100, 250),
+            "minutes_fairly_active": ints(0, 40),
+            "minutes_very_active": ints(0, 40),
+        },
+        "daily_summary": {
+            "steps": rng.normal(8000, 2500, days).clip(0),
+            "calories": rng.normal(2200, 200, days),
+            "distance": rng.normal(6, 2, days).clip(0),
+        },
+        "spo2": {
+            "avg": rng.normal(96, 1, days),
+            "min": rng.normal(92, 1, days),
+            "max": rng.normal(99, 0.5, days),
+        },
+        "breathing_rate": {"value": rng.normal(14, 1, days)},
+        "skin_temperature": {"relative_value": rng.normal(0, 0.3, days)},
+    }
+    for table, columns in tables.items():
+        storage.upsert(table, base.assign(**columns))
+    return dates
+
+
+@pytest.fixture
+def daily_history(storage: DuckDBStorage) -> Callable[..., pd.DatetimeIndex]:
+    """Call with a day count (and optionally start/device) to fill storage with daily data."""
+
+    def write(days: int, start: str = "2024-01-01", device: str = "test") -> pd.DatetimeIndex:
+        return _write_daily_history(storage, days, start, device)
+
+    return write
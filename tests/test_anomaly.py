@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from circadia.features.anomaly import AnomalyDetector
+from circadia.features.baseline import BaselineStore
+from circadia.storage import DuckDBStorage
+
+DAY = pd.Timestamp("2024-03-01")
+
+
+@pytest.fixture(autouse=True)
+def resting_baseline(storage: DuckDBStorage) -> None:
+    store = BaselineStore(storage)
+    for offset in range(30, 0, -1):
+        day = DAY.date() - timedelta(days=offset)
+        store.update("resting_hr", "test", day, 60 + offset % 3, today=DAY.date())
+
+
+def _heart_rate(walk_bpm: float) -> pd.DataFrame:
+    """8 hours at about 62 bpm every 10 seconds, with a 20-minute walk from 10:00."""
+    rng = np.random.default_rng(3)
+    timestamps = pd.date_range(DAY + pd.Timedelta(hours=8), periods=8 * 360, freq="10s")
+    values = rng.normal(62, 2, len(timestamps)).round()
+    walk = (timestamps >= DAY + pd.Timedelta(hours=10)) & (
+        timestamps < DAY + pd.Timedelta(hours=10, minutes=20)
+    )
+    values[walk] = rng.normal(walk_bpm, 3, walk.sum()).round()
+    # Heart rate eases back over the few minutes after the walk.
+    after = (timestamps >= DAY + pd.Timedelta(hours=10, minutes=20)) & (
+        timestamps < DAY + pd.Timedelta(hours=10, minutes=25)
+    )
+    values[after] = np.linspace(walk_bpm, 62, after.sum()).round()
+    return pd.DataFrame({"timestamp": timestamps, "device": "test", "value": values})
+
+
+def _walk_steps(storage: DuckDBStorage) -> None:
+    minutes = pd.date_range(DAY + pd.Timedelta(hours=10), periods=20, freq="1min")
+    storage.upsert(
+        "steps_intraday", pd.DataFrame({"timestamp": minutes, "device": "test", "value": 105})
+    )
+
+
+def test_walk_raises_no_heart_rate_alert(storage: DuckDBStorage) -> None:
+    _walk_steps(storage)
+
+    alerts = AnomalyDetector(storage).observe("heart_rate", _heart_rate(walk_bpm=105))
+
+    assert alerts.empty
+
+
+def test_elevated_heart_rate_at_rest_alerts(storage: DuckDBStorage) -> None:
+    alerts = AnomalyDetector(storage).observe("heart_rate", _heart_rate(walk_bpm=105))
+
+    assert len(alerts) >= 1
+    first = alerts["timestamp"].min()
+    assert DAY + pd.Timedelta(hours=10) <= first < DAY + pd.Timedelta(hours=10, minutes=20)
+    assert set(alerts["direction"]) == {"high"}
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from circadia.features.baseline import BaselineStore
+from circadia.storage import DuckDBStorage
+
+
+def _resting_hr(storage: DuckDBStorage, values: dict[str, int]) -> None:
+    storage.upsert(
+        "resting_hr",
+        pd.DataFrame(
+            {
+                "date": pd.to_datetime(list(values)).date,
+                "device": "test",
+                "value": list(values.values()),
+            }
+        ),
+    )
+
+
+def test_refresh_skips_today_until_it_closes(storage: DuckDBStorage) -> None:
+    store = BaselineStore(storage)
+    _resting_hr(storage, {"2024-03-01": 60, "2024-03-02": 62, "2024-03-03": 90})
+
+    state = store.refresh("test", today=date(2024, 3, 3))["resting_hr"]
+    assert state.count == 2
+    assert state.last_date == date(2024, 3, 2)
+
+    # Today's partial value is revised later in the day; the final one is folded once.
+    _resting_hr(storage, {"2024-03-03": 58})
+    state = store.refresh("test", today=date(2024, 3, 4))["resting_hr"]
+    assert state.count == 3
+    assert state.last_date == date(2024, 3, 3)
+    assert state.mean == pytest.approx(60.0)
+
+
+def test_update_ignores_open_day(storage: DuckDBStorage) -> None:
+    store = BaselineStore(storage)
+    state = store.update("resting_hr", "test", date(2024, 3, 3), 90.0, today=date(2024, 3, 3))
+    assert state.count == 0
+    state = store.update("resting_hr", "test", date(2024, 3, 2), 60.0, today=date(2024, 3, 3))
+    assert state.count == 1
@@ -0,0 +1,92 @@
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from circadia.features.cardio import (
+    compute_intraday_hr_features,
+    iter_intraday_hr_features,
+    refresh_intraday_hr_features,
+)
+from circadia.pipeline.ingest import Ingester
+from circadia.storage import DuckDBStorage
+
+
+def _day(start: str = "2024-01-01") -> np.ndarray:
+    return pd.date_range(start, periods=86400, freq="s").to_numpy()
+
+
+def test_day_statistics() -> None:
+    hr = np.full(86400, 60.0)
+    hr[12 * 3600 : 12 * 3600 + 600] = 110  # 10 minutes above 100
+    hr[13 * 3600 : 13 * 3600 + 300] = 130  # 5 minutes above 100 and 120
+
+    features = compute_intraday_hr_features(_day(), hr, "2024-01-01", "test")
+
+    assert features is not None
+    assert features.samples == 86400
+    assert features.minutes_covered == 1440
+    assert features.hr_p50 == 60
+    assert features.minutes_above_100 == 15
+    assert features.minutes_above_120 == 5
+    assert features.overnight_min_hr == 60
+
+
+def test_overnight_minimum_uses_a_rolling_window() -> None:
+    hr = np.full(86400, 70.0)
+    # Five low minutes straddling two fixed 5-minute buckets (02:02:30 to 02:07:30).
+    low = 2 * 3600 + 150
+    hr[low : low + 300] = 50
+
+    features = compute_intraday_hr_features(_day(), hr, "2024-01-01", "test")
+
+    assert features is not None
+    assert features.overnight_min_hr == 50
+
+
+def test_day_without_valid_samples_is_skipped() -> None:
+    empty = np.array([], dtype="datetime64[ns]")
+
+    assert compute_intraday_hr_features(empty, np.array([]), "2024-01-01", "test") is None
+    assert compute_intraday_hr_features(_day(), np.full(86400, np.nan), "2024-01-01", "t") is None
+
+
+def _write_days(storage: DuckDBStorage, starts: list[str]) -> None:
+    for start in starts:
+        timestamps = pd.date_range(start, periods=1440, freq="min")
+        storage.upsert(
+            "heart_rate_intraday",
+            pd.DataFrame({"timestamp": timestamps, "device": "test", "value": 60}),
+        )
+
+
+def test_streams_days_in_time_order(storage: DuckDBStorage) -> None:
+    # Written newest first, so storage order is not time order.
+    _write_days(storage, ["2024-01-03", "2024-01-02", "2024-01-01"])
+
+    days = list(iter_intraday_hr_features(storage, "test", batch_size=1000))
+
+    assert [f.date for f in days] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert [f.samples for f in days] == [1440, 1440, 1440]
+
+
+def test_refresh_writes_one_row_per_day(storage: DuckDBStorage) -> None:
+    _write_days(storage, ["2024-01-01", "2024-01-02"])
+
+    assert refresh_intraday_hr_features(storage, "test") == 2
+    assert refresh_intraday_hr_features(storage, "other") == 0
+
+    rows = storage.execute(
+        "SELECT CAST(date AS VARCHAR), samples, hr_mean FROM intraday_hr_features ORDER BY 1"
+    ).fetchall()
+    assert rows == [("2024-01-01", 1440, 60.0), ("2024-01-02", 1440, 60.0)]
+
+
+def test_ingest_updates_the_day_it_wrote(storage: DuckDBStorage) -> None:
+    dataset = [{"time": f"{h:02d}:{m:02d}:00", "value": 55} for h in range(24) for m in range(60)]
+    payload: dict[str, Any] = {"activities-heart-intraday": {"dataset": dataset}}
+
+    Ingester(storage, "test").intraday("heart_rate", payload, "2024-01-05")
+
+    rows = storage.execute("SELECT date, samples, hr_mean FROM intraday_hr_features").fetchall()
+    assert [(str(d), n, mean) for d, n, mean in rows] == [("2024-01-05", 1440, 55.0)]
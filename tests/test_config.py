@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from circadia.config import get_config
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    # Keep a developer's .env out of the way; tests write their own.
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_metrics_settings_load_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("METRICS_PORT", "9464")
+    monkeypatch.setenv("METRICS_HOST", "0.0.0.0")
+    monkeypatch.setenv("METRICS_PATH", "/var/lib/node_exporter/circadia.prom")
+    monkeypatch.setenv("METRICS_INTERVAL_SECONDS", "30")
+
+    metrics = get_config().metrics
+
+    assert metrics.port == 9464
+    assert metrics.host == "0.0.0.0"
+    assert metrics.path == Path("/var/lib/node_exporter/circadia.prom")
+    assert metrics.interval_seconds == 30.0
+
+
+def test_metrics_settings_load_from_env_file(workdir: Path) -> None:
+    (workdir / ".env").write_text("METRICS_PORT=9100\nMETRICS_PATH=./metrics.prom\n")
+
+    metrics = get_config().metrics
+
+    assert metrics.port == 9100
+    assert metrics.path == Path("./metrics.prom")
+
+
+def test_metrics_disabled_by_default() -> None:
+    metrics = get_config().metrics
+
+    assert metrics.port is None
+    assert metrics.path is None
+
+
+def test_model_update_settings_load_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("MODEL_AUTO_UPDATE", "true")
+    monkeypatch.setenv("MODEL_FULL_REFIT_DAYS", "14")
+    monkeypatch.setenv("MODEL_REFIT_WINDOW_DAYS", "180")
+    monkeypatch.setenv("MODEL_REGISTRY_PATH", "/srv/circadia/models")
+
+    models = get_config().models
+
+    assert models.auto_update is True
+    assert models.full_refit_days == 14
+    assert models.refit_window_days == 180
+    assert models.registry_path == Path("/srv/circadia/models")
+
+
+def test_query_cache_limits_load_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("QUERY_CACHE_MAX_ENTRIES", "32")
+    monkeypatch.setenv("QUERY_CACHE_MAX_BYTES", "1048576")
+
+    database = get_config().database
+
+    assert database.query_cache_max_entries == 32
+    assert database.query_cache_max_bytes == 1048576
+
+
+def test_profiling_settings_load_from_env_file(workdir: Path) -> None:
+    (workdir / ".env").write_text(
+        "CIRCADIA_PROFILE=cpu\nCIRCADIA_PROFILE_DIR=./profiles\nCIRCADIA_PROFILE_TOP=10\n"
+    )
+
+    profiling = get_config().profiling
+
+    assert profiling.modes == "cpu"
+    assert profiling.path == Path("./profiles")
+    assert profiling.top == 10
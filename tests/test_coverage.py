@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pandas as pd
+
+from circadia.storage import DuckDBStorage
+from circadia.storage.coverage import CoverageIndex
+
+
+def _minutes(start: str, end: str) -> pd.DatetimeIndex:
+    return pd.date_range(start, end, freq="min", inclusive="left")
+
+
+def _stored_intervals(storage: DuckDBStorage, stream: str) -> list[tuple[datetime, datetime]]:
+    rows = storage.execute(
+        "SELECT start_time, end_time FROM coverage WHERE stream = ? ORDER BY start_time", [stream]
+    ).fetchall()
+    return [(s, e) for s, e in rows]
+
+
+def test_gaps_between_recorded_runs(storage: DuckDBStorage) -> None:
+    coverage = CoverageIndex(storage)
+    coverage.record("heart_rate", "test", _minutes("2024-01-01 00:00", "2024-01-01 08:00"))
+    coverage.record("heart_rate", "test", _minutes("2024-01-01 09:30", "2024-01-01 20:00"))
+
+    gaps = coverage.gaps("heart_rate", "test", datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+    assert gaps == [
+        (datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 9, 30)),
+        (datetime(2024, 1, 1, 20), datetime(2024, 1, 2)),
+    ]
+    assert coverage.gaps("heart_rate", "other", datetime(2024, 1, 1), datetime(2024, 1, 2)) == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 2))
+    ]
+
+
+def test_adjacent_and_overlapping_runs_are_merged(storage: DuckDBStorage) -> None:
+    coverage = CoverageIndex(storage)
+    coverage.record("steps", "test", _minutes("2024-01-01 00:00", "2024-01-01 06:00"))
+    coverage.record("steps", "test", _minutes("2024-01-01 12:00", "2024-01-01 18:00"))
+    assert len(_stored_intervals(storage, "steps")) == 2
+
+    # Touches the first run and overlaps the second, bridging the gap between them.
+    coverage.record("steps", "test", _minutes("2024-01-01 06:00", "2024-01-01 13:00"))
+
+    assert _stored_intervals(storage, "steps") == [(datetime(2024, 1, 1), datetime(2024, 1, 1, 18))]
+
+
+def test_daily_completeness_and_thresholds(storage: DuckDBStorage) -> None:
+    coverage = CoverageIndex(storage)
+    for stream in ("heart_rate", "steps"):
+        # Day one fully covered, day two 90% covered, day three empty.
+        coverage.record(stream, "test", _minutes("2024-01-01 00:00", "2024-01-02 00:00"))
+        coverage.record(stream, "test", _minutes("2024-01-02 00:00", "2024-01-02 21:36"))
+
+    daily = coverage.daily_completeness("heart_rate", "test", "2024-01-01", "2024-01-03")
+
+    assert daily == {"2024-01-01": 1.0, "2024-01-02": 0.9, "2024-01-03": 0.0}
+    # Heart rate counts a day as complete at 80%, steps only at 100%.
+    assert coverage.missing_dates("heart_rate", "test", "2024-01-01", "2024-01-03") == [
+        "2024-01-03"
+    ]
+    assert coverage.missing_dates("steps", "test", "2024-01-01", "2024-01-03") == [
+        "2024-01-02",
+        "2024-01-03",
+    ]
+    assert coverage.missing_dates(
+        "heart_rate", "test", "2024-01-01", "2024-01-03", min_completeness=0.95
+    ) == ["2024-01-02", "2024-01-03"]
+
+
+def test_daily_streams_cover_whole_days(storage: DuckDBStorage) -> None:
+    coverage = CoverageIndex(storage)
+    coverage.record("sleep", "test", [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-03")])
+
+    assert coverage.missing_dates("sleep", "test", "2024-01-01", "2024-01-03") == ["2024-01-02"]
@@ -0,0 +1,62 @@
+from collections.abc import Callable
+from typing import Any
+
+import duckdb
+import pandas as pd
+import pytest
+
+from circadia.dashboard import DashboardData
+from circadia.storage import DuckDBStorage
+
+
+@pytest.fixture
+def history(storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]) -> None:
+    daily_history(10)
+    storage.close()
+
+
+def _refuse_connections(*args: Any, **kwargs: Any) -> None:
+    raise AssertionError("the database was opened")
+
+
+def test_reruns_are_served_from_the_cache(
+    storage: DuckDBStorage, history: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    data = DashboardData(storage.db_path, refresh_seconds=0)
+    first = data.daily()
+
+    monkeypatch.setattr(duckdb, "connect", _refuse_connections)
+    again = data.daily()
+
+    pd.testing.assert_frame_equal(again, first)
+    assert len(first) == 10
+    stats = data.storage.cache.stats()
+    assert (stats.hits, stats.misses) == (1, 1)
+
+
+def test_versions_are_reloaded_when_the_file_changes(
+    storage: DuckDBStorage, history: None, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    data = DashboardData(storage.db_path, refresh_seconds=0)
+    before = data.storage.data_version("resting_hr")
+    assert len(data.daily()) == 10
+
+    daily_history(5, start="2024-01-11")
+    storage.close()
+
+    assert len(data.daily()) == 15
+    assert data.storage.data_version("resting_hr") > before
+
+
+def test_file_is_not_checked_within_refresh_seconds(
+    storage: DuckDBStorage, history: None, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    data = DashboardData(storage.db_path, refresh_seconds=3600)
+    assert len(data.daily()) == 10
+
+    daily_history(5, start="2024-01-11")
+    storage.close()
+
+    assert len(data.daily()) == 10
+    data.close()
+    assert len(data.daily()) == 15
@@ -0,0 +1,108 @@
+from collections.abc import Callable
+
+import pandas as pd
+import pytest
+
+from circadia.dashboard import SNAPSHOT_METRICS, SNAPSHOT_WINDOWS, refresh_dashboard_snapshot
+from circadia.dashboard.data import DAILY_VIEW_QUERY
+from circadia.dashboard.snapshot import SCORE_METRICS
+from circadia.features.sql import refresh_daily_features
+from circadia.storage import DuckDBStorage
+
+
+@pytest.fixture
+def history(storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]) -> None:
+    daily_history(120, device="a")
+    daily_history(45, start="2024-02-01", device="b")
+    # The latest day without steps: its snapshot reads the day before.
+    storage.execute(
+        "UPDATE daily_summary SET steps = NULL WHERE device = 'a' AND date = '2024-04-29'"
+    )
+    refresh_daily_features(storage)
+
+
+def _snapshot(storage: DuckDBStorage) -> pd.DataFrame:
+    frame: pd.DataFrame = storage.execute("SELECT * FROM dashboard_snapshot").df()
+    return frame.set_index(["device", "metric"]).sort_index()
+
+
+def _expected(storage: DuckDBStorage) -> pd.DataFrame:
+    """The snapshot computed in pandas from the long format of the daily view."""
+    view = storage.execute(DAILY_VIEW_QUERY).df()
+    view["date"] = pd.to_datetime(view["date"])
+    rows = []
+    for device, days in view.groupby("device"):
+        as_of = days["date"].max()
+        for metric in SNAPSHOT_METRICS:
+            values = days.loc[
+                days["date"] > as_of - pd.Timedelta(days=max(SNAPSHOT_WINDOWS)), ["date", metric]
+            ].dropna()
+            latest = values.loc[values["date"].idxmax()]
+            means = {
+                f"mean_{window}d": values.loc[
+                    values["date"] > as_of - pd.Timedelta(days=window), metric
+                ].mean()
+                for window in SNAPSHOT_WINDOWS
+            }
+            rows.append(
+                {
+                    "device": device,
+                    "metric": metric,
+                    "as_of": as_of,
+                    "latest_date": latest["date"],
+                    "latest": float(latest[metric]),
+                    **means,
+                    "trend": means["mean_7d"] - means["mean_30d"],
+                }
+            )
+    return pd.DataFrame(rows).set_index(["device", "metric"]).sort_index()
+
+
+def test_snapshot_has_one_row_per_device_and_metric(storage: DuckDBStorage, history: None) -> None:
+    rows = refresh_dashboard_snapshot(storage)
+
+    snapshot = _snapshot(storage)
+    assert rows == len(snapshot) == 2 * len(SNAPSHOT_METRICS)
+    expected = _expected(storage)
+    columns = list(expected.columns)
+    got = snapshot[columns].assign(
+        as_of=pd.to_datetime(snapshot["as_of"]),
+        latest_date=pd.to_datetime(snapshot["latest_date"]),
+    )
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_latest_skips_missing_values(storage: DuckDBStorage, history: None) -> None:
+    refresh_dashboard_snapshot(storage)
+
+    steps = _snapshot(storage).loc[("a", "steps")]
+    assert str(steps["as_of"])[:10] == "2024-04-29"
+    assert str(steps["latest_date"])[:10] == "2024-04-28"
+
+
+def test_status_is_set_for_scores_only(storage: DuckDBStorage, history: None) -> None:
+    refresh_dashboard_snapshot(storage)
+
+    snapshot = _snapshot(storage)
+    for (_, metric), row in snapshot.iterrows():
+        if metric in SCORE_METRICS:
+            status = storage.execute("SELECT readiness_status(?)", [row["latest"]]).fetchone()[0]
+            assert row["status"] == status
+        else:
+            assert pd.isna(row["status"])
+
+
+def test_refreshing_one_device_leaves_the_others(
+    storage: DuckDBStorage, history: None, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    refresh_dashboard_snapshot(storage)
+    before = _snapshot(storage)
+
+    daily_history(10, start="2024-04-30", device="a")
+    refresh_daily_features(storage, device="a")
+    rows = refresh_dashboard_snapshot(storage, device="a")
+
+    after = _snapshot(storage)
+    assert rows == len(SNAPSHOT_METRICS)
+    assert (after.loc["a", "as_of"].astype(str).str[:10] == "2024-05-09").all()
+    pd.testing.assert_frame_equal(after.loc["b"], before.loc["b"])
@@ -0,0 +1,120 @@
+import io
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from circadia.storage import ArrowExporter, DuckDBStorage
+from circadia.storage.export import main, read_from_socket
+
+
+@pytest.fixture
+def exporter(storage: DuckDBStorage) -> ArrowExporter:
+    # Written newest first so storage order and time order differ.
+    timestamps = pd.date_range("2024-01-01", "2024-01-03 23:59", freq="min")[::-1]
+    for device in ("a", "b"):
+        storage.upsert(
+            "heart_rate_intraday",
+            pd.DataFrame({"timestamp": timestamps, "device": device, "value": 60}),
+        )
+    return ArrowExporter(storage, batch_size=1000)
+
+
+def test_reader_streams_in_batches(exporter: ArrowExporter) -> None:
+    reader = exporter.reader("heart_rate_intraday", device="a")
+
+    sizes = [batch.num_rows for batch in reader]
+
+    assert max(sizes) <= 1000
+    assert sum(sizes) == 3 * 1440
+
+
+def test_query_sorts_only_when_asked(exporter: ArrowExporter) -> None:
+    query, _ = exporter.build_query("heart_rate_intraday", start_date="2024-01-02")
+    assert "ORDER BY" not in query
+
+    query, _ = exporter.build_query("heart_rate_intraday", start_date="2024-01-02", order=True)
+    assert query.endswith("ORDER BY timestamp")
+
+    table = exporter.reader("heart_rate_intraday", device="b", order=True).read_all()
+    assert table.column("timestamp").to_pandas().is_monotonic_increasing
+
+
+def test_date_and_device_filters(exporter: ArrowExporter) -> None:
+    table = exporter.reader(
+        "heart_rate_intraday", start_date="2024-01-02", end_date="2024-01-02", device="b"
+    ).read_all()
+
+    timestamps = table.column("timestamp").to_pandas()
+    assert table.num_rows == 1440
+    assert set(table.column("device").to_pylist()) == {"b"}
+    assert timestamps.min() == pd.Timestamp("2024-01-02 00:00")
+    assert timestamps.max() == pd.Timestamp("2024-01-02 23:59")
+
+
+def test_unknown_table_and_missing_columns_raise(exporter: ArrowExporter) -> None:
+    with pytest.raises(ValueError, match="Unknown table"):
+        exporter.reader("nope")
+    with pytest.raises(ValueError, match="no device column"):
+        exporter.reader("data_versions", device="a")
+
+
+def test_write_stream_round_trips(exporter: ArrowExporter) -> None:
+    sink = io.BytesIO()
+
+    rows = exporter.write_stream(sink, "heart_rate_intraday", device="a")
+
+    table = pa.ipc.open_stream(sink.getvalue()).read_all()
+    assert rows == table.num_rows == 3 * 1440
+    assert table.column_names == ["timestamp", "device", "value"]
+
+
+def test_write_file_round_trips(exporter: ArrowExporter, tmp_path: Path) -> None:
+    path = tmp_path / "exports" / "hr.arrow"
+
+    rows = exporter.write_file(path, "heart_rate_intraday", start_date="2024-01-03")
+
+    table = pa.ipc.open_file(path).read_all()
+    assert rows == table.num_rows == 2 * 1440
+
+
+def test_socket_server_streams_requested_slice(exporter: ArrowExporter, tmp_path: Path) -> None:
+    socket_path = tmp_path / "export.sock"
+    threading.Thread(target=exporter.serve, args=(socket_path,), daemon=True).start()
+    deadline = time.monotonic() + 5
+    while not socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    table = read_from_socket(
+        socket_path, "heart_rate_intraday", order=True, start_date="2024-01-01", device="a"
+    ).read_all()
+
+    assert table.num_rows == 3 * 1440
+    assert table.column("timestamp").to_pandas().is_monotonic_increasing
+
+
+def test_cli_opens_database_read_only(
+    exporter: ArrowExporter,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    db_path = exporter.storage.db_path
+    exporter.storage.close()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DUCKDB_PATH", str(db_path))
+    # A second read-only reader holding the file open at the same time.
+    reader = DuckDBStorage(db_path, read_only=True)
+    reader.execute("SELECT 1")
+
+    try:
+        main(["--list"])
+        main(["heart_rate_intraday", "--output", str(tmp_path / "hr.arrow")])
+    finally:
+        reader.close()
+
+    assert "heart_rate_intraday" in capsys.readouterr().out.split()
+    assert pa.ipc.open_file(tmp_path / "hr.arrow").read_all().num_rows == 2 * 3 * 1440
@@ -0,0 +1,132 @@
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from circadia.features.batch import FeatureBatch, FeatureRow, daily_features_sql
+from circadia.features.sleep import SleepFeatures
+from circadia.storage import DuckDBStorage
+
+
+@pytest.fixture
+def batch() -> FeatureBatch:
+    return FeatureBatch(
+        ["2024-01-01", "2024-01-02", "2024-01-01", "2024-01-02"],
+        ["watch", "watch", "band", "band"],
+        {"steps": [8000, np.nan, 6000, 7000], "resting_hr": [55, 56, np.nan, 58]},
+    )
+
+
+def test_devices_are_stored_as_codes(batch: FeatureBatch) -> None:
+    assert batch.device_names == ["band", "watch"]
+    np.testing.assert_array_equal(batch.device_codes, [1, 1, 0, 0])
+    np.testing.assert_array_equal(batch.devices, ["watch", "watch", "band", "band"])
+
+
+def test_int_index_gives_a_row(batch: FeatureBatch) -> None:
+    row = batch[1]
+    last = batch[-1]
+
+    assert isinstance(row, FeatureRow)
+    assert (row.date, row.device) == ("2024-01-02", "watch")
+    assert row.steps is None
+    assert row.resting_hr == 56.0
+    assert last.as_dict() == {
+        "date": "2024-01-02",
+        "device": "band",
+        "steps": 7000.0,
+        "resting_hr": 58.0,
+    }
+    with pytest.raises(AttributeError):
+        _ = row.hrv_rmssd
+    with pytest.raises(IndexError):
+        batch[4]
+
+
+def test_mask_and_slice_give_batches_sharing_devices(batch: FeatureBatch) -> None:
+    band = batch[batch.devices == "band"]
+    head = batch[:2]
+
+    assert isinstance(band, FeatureBatch)
+    assert len(band) == 2
+    np.testing.assert_array_equal(band["steps"], [6000, 7000])
+    assert band.device_names == batch.device_names
+    assert [row.device for row in head] == ["watch", "watch"]
+
+
+def test_to_matrix_orders_columns_and_fills_missing(batch: FeatureBatch) -> None:
+    raw = batch.to_matrix(["resting_hr", "steps"])
+    filled = batch.to_matrix(["resting_hr", "steps"], fill_value=0)
+
+    assert raw.shape == (4, 2)
+    assert np.isnan(raw[2, 0]) and np.isnan(raw[1, 1])
+    np.testing.assert_array_equal(filled, [[55, 8000], [56, 0], [0, 6000], [58, 7000]])
+
+
+def test_to_matrix_fills_a_slice_of_a_larger_array(batch: FeatureBatch) -> None:
+    out = np.full((6, 1), -1.0)
+
+    batch.to_matrix(["steps"], fill_value=0, out=out[1:5])
+
+    np.testing.assert_array_equal(out[:, 0], [-1, 8000, 0, 6000, 7000, -1])
+    with pytest.raises(ValueError, match="shape"):
+        batch.to_matrix(["steps"], out=out)
+
+
+def test_columns_must_match_rows() -> None:
+    with pytest.raises(ValueError, match="steps"):
+        FeatureBatch(["2024-01-01"], ["watch"], {"steps": [1, 2]})
+
+
+def test_from_records_keeps_numeric_fields() -> None:
+    night = SleepFeatures("2024-01-01", "watch", 420, 460, 91.0, 200, 90, 70, 40, 5, 10, 5)
+
+    batch = FeatureBatch.from_records([night])
+
+    assert "efficiency" in batch
+    assert "date" not in batch
+    assert batch[0].total_minutes_asleep == 420.0
+    assert batch[0].sleep_midpoint_minutes is None
+
+
+def test_daily_features_sql_filters_and_columns() -> None:
+    query, params = daily_features_sql(
+        ["steps", "resting_hr"], start_date="2024-01-01", end_date="2024-01-31", device="watch"
+    )
+
+    assert "SELECT date, device, steps, resting_hr FROM" in query
+    assert "WHERE date >= CAST(? AS DATE) AND date <= CAST(? AS DATE) AND device = ?" in query
+    assert query.rstrip().endswith("ORDER BY device, date")
+    assert params == ["2024-01-01", "2024-01-31", "watch"]
+
+    query, params = daily_features_sql()
+    assert "SELECT * FROM" in query
+    assert "WHERE" not in query
+    assert params == []
+
+
+def test_from_storage_joins_daily_tables(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    daily_history(10)
+    daily_history(5, device="band")
+    storage.upsert(
+        "daily_summary",
+        pd.DataFrame(
+            {"date": [pd.Timestamp("2024-02-01").date()], "device": "test", "steps": [1234.0]}
+        ),
+    )
+
+    batch = FeatureBatch.from_storage(storage, device="test", columns=["steps", "resting_hr"])
+    expected = storage.execute(
+        "SELECT date, value FROM resting_hr WHERE device = 'test' ORDER BY date"
+    ).df()
+
+    assert batch.names == ["steps", "resting_hr"]
+    assert len(batch) == 11
+    assert batch[-1].date == "2024-02-01"
+    assert batch[-1].steps == 1234.0
+    # A day present in one table only still gets a row, with the others missing.
+    assert batch[-1].resting_hr is None
+    np.testing.assert_array_equal(batch["resting_hr"][:10], expected["value"])
@@ -0,0 +1,78 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from circadia.features.batch import FeatureBatch
+from circadia.features.graph import DEFAULT_GRAPH, FeatureGraph, FeatureNode
+
+
+def _graph(calls: Counter[str]) -> FeatureGraph:
+    """a and b read sources x and y; c uses both, d only a; e is unrelated."""
+    graph = FeatureGraph()
+
+    def node(name: str, inputs: tuple[str, ...]) -> None:
+        def compute(**arrays: np.ndarray) -> np.ndarray:
+            calls[name] += 1
+            return np.sum(list(arrays.values()), axis=0)
+
+        graph.add(FeatureNode(name, inputs, compute))
+
+    node("a", ("x",))
+    node("b", ("x", "y"))
+    node("c", ("a", "b"))
+    node("d", ("a",))
+    node("e", ("y",))
+    return graph
+
+
+@pytest.fixture
+def batch() -> FeatureBatch:
+    return FeatureBatch(
+        ["2024-01-01", "2024-01-02"], ["test", "test"], {"x": [1, 2], "y": [10, 20]}
+    )
+
+
+def test_plan_orders_only_the_needed_nodes() -> None:
+    graph = _graph(Counter())
+
+    plan = [node.name for node in graph.plan(["d", "c"])]
+
+    assert plan == ["a", "d", "b", "c"]
+    assert [node.name for node in graph.plan(["c"], available=["a"])] == ["b", "c"]
+    assert graph.sources(["c", "y"]) == ["y", "x"]
+
+
+def test_each_node_is_computed_once(batch: FeatureBatch) -> None:
+    calls: Counter[str] = Counter()
+
+    result = _graph(calls).evaluate(batch, ["c", "d"])
+
+    # a feeds both c and d but runs once; e is never needed.
+    assert calls == Counter({"a": 1, "b": 1, "c": 1, "d": 1})
+    np.testing.assert_array_equal(result["c"], [12, 24])
+    np.testing.assert_array_equal(result["d"], [1, 2])
+    assert "a" not in result
+
+
+def test_reuse_takes_present_columns(batch: FeatureBatch) -> None:
+    calls: Counter[str] = Counter()
+
+    result = _graph(calls).evaluate(batch.with_columns(a=[100, 200]), ["c"], reuse=True)
+
+    assert "a" not in calls
+    np.testing.assert_array_equal(result["c"], [111, 222])
+
+
+def test_cycles_are_rejected() -> None:
+    graph = _graph(Counter())
+    graph.add(FeatureNode("a", ("c",), lambda c: c))
+
+    with pytest.raises(ValueError, match="cycle"):
+        graph.plan(["d"])
+
+
+def test_default_graph_lineage() -> None:
+    assert DEFAULT_GRAPH.lineage("health_score") == (
+        "sleep_score@1,activity_score@1,recovery_score@1,health_score@1"
+    )
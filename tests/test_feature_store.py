@@ -0,0 +1,52 @@
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+
+from circadia.features.sql import refresh_daily_features
+from circadia.features.store import FeatureStore
+from circadia.ml.dataset import DatasetBuilder
+from circadia.storage import DuckDBStorage
+
+
+def test_training_prediction_and_dashboard_share_feature_values(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    daily_history(40)
+    builder = DatasetBuilder(storage, ["sleep_score", "steps"], target="health_score")
+    dataset = builder.build()
+
+    stored = storage.execute(
+        """
+        SELECT feature_name, count(*) FROM feature_store
+        GROUP BY feature_name ORDER BY feature_name
+        """
+    ).fetchall()
+    assert stored == [("health_score", 40), ("sleep_score", 40)]
+
+    loaded = FeatureStore(storage).load(["sleep_score", "health_score"])
+    np.testing.assert_array_equal(dataset.X[:, 0], loaded["sleep_score"].astype(np.float32))
+    np.testing.assert_array_equal(dataset.y, loaded["health_score"].astype(np.float32))
+
+    refresh_daily_features(storage)
+    daily = storage.execute(
+        "SELECT sleep_score, health_score FROM daily_features ORDER BY date"
+    ).fetchnumpy()
+    np.testing.assert_array_equal(daily["sleep_score"], loaded["sleep_score"])
+    np.testing.assert_array_equal(daily["health_score"], loaded["health_score"])
+
+
+def test_builder_reuses_stored_values(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    daily_history(20)
+    builder = DatasetBuilder(storage, ["sleep_score"], target="recovery_score")
+    first = builder.build()
+    computed_at = storage.execute("SELECT max(computed_at) FROM feature_store").fetchone()[0]
+
+    second = builder.build()
+
+    np.testing.assert_array_equal(first.X, second.X)
+    assert storage.execute("SELECT max(computed_at) FROM feature_store").fetchone()[0] == (
+        computed_at
+    )
@@ -0,0 +1,67 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from circadia.ml.dataset import DatasetBuilder
+from circadia.ml.incremental import IncrementalTrainer
+from circadia.ml.model import CircadiaModel
+from circadia.ml.registry import ModelRegistry, hash_training_data
+from circadia.storage import DuckDBStorage
+
+
+def test_update_folds_new_days_into_sgd_model(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex], tmp_path: Path
+) -> None:
+    registry = ModelRegistry(tmp_path / "models")
+    trainer = IncrementalTrainer(storage, registry, model_type="sgd", drift_threshold=1e9)
+    daily_history(60, start="2024-01-01")
+
+    first = trainer.update()
+    assert first is not None
+    assert first.trained_through == "2024-02-29"
+
+    daily_history(10, start="2024-03-01")
+    second = trainer.update()
+
+    assert second is not None
+    # An incremental update, not a fallback refit.
+    assert second.metrics["incremental_rows"] == 10
+    assert second.trained_through == "2024-03-10"
+    assert second.training_end == "2024-03-10"
+    new_rows = DatasetBuilder(storage, target="sleep_score").build(start_date="2024-03-01")
+    assert second.data_hash == hash_training_data(new_rows.X, new_rows.y, first.data_hash)
+    assert trainer.update() is None
+
+
+def test_update_refits_tree_models_on_trailing_window(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex], tmp_path: Path
+) -> None:
+    registry = ModelRegistry(tmp_path / "models")
+    trainer = IncrementalTrainer(
+        storage, registry, model_type="random_forest", refit_window_days=30
+    )
+    daily_history(60, start="2024-01-01")
+    trainer.update()
+
+    daily_history(10, start="2024-03-01")
+    metadata = trainer.update()
+
+    assert metadata is not None
+    assert metadata.training_start == "2024-02-10"
+    assert metadata.trained_through == "2024-03-10"
+    assert metadata.n_samples == 30
+    regressor = registry.load("sleep_score").model.named_steps["regressor"]
+    assert len(regressor.estimators_) == 100
+
+
+def test_partial_fit_rejects_models_without_partial_fit() -> None:
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(40, 3)), rng.normal(size=40)
+    model = CircadiaModel(model_type="gradient_boosting").fit(X, y)
+
+    assert not model.supports_partial_fit
+    with pytest.raises(ValueError):
+        model.partial_fit(X, y)
@@ -0,0 +1,78 @@
+from typing import Any
+
+import pandas as pd
+
+from circadia.pipeline.ingest import Ingester
+from circadia.storage import DuckDBStorage
+
+
+def _heart_rate(values: list[int]) -> dict[str, Any]:
+    dataset = [{"time": f"00:{minute:02d}:00", "value": v} for minute, v in enumerate(values)]
+    return {"activities-heart-intraday": {"dataset": dataset}}
+
+
+def _hrv(rmssd: float) -> list[dict[str, Any]]:
+    return [{"dateTime": "2024-01-01", "value": {"dailyRmssd": rmssd, "deepRmssd": 40.0}}]
+
+
+def test_upsert_skips_unchanged_rows(storage: DuckDBStorage) -> None:
+    rows = pd.DataFrame(
+        {"timestamp": pd.date_range("2024-01-01", periods=3, freq="min"), "device": "test"}
+    ).assign(value=[60, 61, 62])
+    assert storage.upsert("heart_rate_intraday", rows) == 3
+    version = storage.data_version("heart_rate_intraday")
+
+    assert storage.upsert("heart_rate_intraday", rows) == 0
+    assert storage.data_version("heart_rate_intraday") == version
+
+    assert storage.upsert("heart_rate_intraday", rows.assign(value=[60, 61, 70])) == 1
+    assert storage.data_version("heart_rate_intraday") > version
+
+
+def test_intraday_refetch_of_unchanged_day_writes_nothing(storage: DuckDBStorage) -> None:
+    ingester = Ingester(storage, "test")
+
+    first = ingester.intraday("heart_rate", _heart_rate([60, 61, 62]), "2024-01-01")
+    again = ingester.intraday("heart_rate", _heart_rate([60, 61, 62]), "2024-01-01")
+    synced = ingester.intraday("heart_rate", _heart_rate([60, 61, 62, 63]), "2024-01-01")
+
+    assert first is not None and len(first) == 3
+    assert again is None
+    assert synced is not None and len(synced) == 4
+    assert ingester.changed == {"heart_rate_intraday"}
+
+
+def test_derived_tables_refresh_only_after_daily_inputs_change(storage: DuckDBStorage) -> None:
+    ingester = Ingester(storage, "test")
+    today = pd.Timestamp("2024-01-02").date()
+
+    ingester.daily_aggregates({"hrv": _hrv(42.0)})
+    assert "hrv" in ingester.changed
+    assert ingester.refresh_derived("2024-01-01", "2024-01-01", today=today)
+    assert storage.data_version("daily_features") > 0
+    version = storage.data_version("daily_features")
+
+    ingester.daily_aggregates({"hrv": _hrv(42.0)})
+    assert not ingester.refresh_derived("2024-01-01", "2024-01-01", today=today)
+
+    ingester.daily_aggregates({"hrv": _hrv(48.0)})
+    assert ingester.refresh_derived("2024-01-01", "2024-01-01", today=today)
+    assert storage.data_version("daily_features") > version
+
+
+def test_sleep_stages_refresh_sleep_regularity(storage: DuckDBStorage) -> None:
+    night = {
+        "dateOfSleep": "2024-01-02",
+        "isMainSleep": True,
+        "minutesAsleep": 480,
+        "levels": {
+            "data": [{"dateTime": "2024-01-01T23:00:00", "level": "light", "seconds": 28800}]
+        },
+    }
+
+    Ingester(storage, "test").daily_aggregates({"sleep": [night]})
+
+    rows = storage.execute(
+        "SELECT date, sleep_regularity_index, sleep_midpoint_minutes FROM sleep_regularity"
+    ).fetchall()
+    assert [(str(d), sri, midpoint) for d, sri, midpoint in rows] == [("2024-01-02", None, 179.5)]
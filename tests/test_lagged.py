@@ -0,0 +1,107 @@
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from circadia.features.lagged import LaggedFeatures, LagSpec
+from circadia.features.sql import refresh_daily_features
+from circadia.ml.train import ModelTrainer
+from circadia.storage import DuckDBStorage
+
+SPEC = LagSpec(metrics=("resting_hr", "sleep_score"), lags=2, windows=(3,))
+DAILY_TABLES = (
+    "sleep_summary",
+    "resting_hr",
+    "hrv",
+    "hr_zones",
+    "activity_minutes",
+    "daily_summary",
+    "spo2",
+    "breathing_rate",
+    "skin_temperature",
+)
+
+
+@pytest.fixture
+def history(storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]) -> pd.Series:
+    """Ten days of data with 2024-01-05 missing, as resting_hr indexed by date."""
+    daily_history(10)
+    for table in DAILY_TABLES:
+        storage.execute(f"DELETE FROM {table} WHERE date = '2024-01-05'")
+    resting = storage.execute("SELECT date, value FROM resting_hr ORDER BY date").df()
+    return resting.set_index(pd.to_datetime(resting["date"]))["value"].astype(float)
+
+
+def _rows(storage: DuckDBStorage) -> pd.DataFrame:
+    batch = LaggedFeatures(storage, SPEC).load()
+    frame = batch.to_pandas()
+    return frame.set_index(pd.to_datetime(frame["date"]))
+
+
+def _at(series: pd.Series, day: str) -> float:
+    return float(series.loc[pd.Timestamp(day)])
+
+
+def test_lags_follow_calendar_days(storage: DuckDBStorage, history: pd.Series) -> None:
+    rows = _rows(storage)
+
+    assert pd.Timestamp("2024-01-05") not in rows.index
+    # The day after the gap has no t-1 value; t-2 is the day before the gap.
+    assert np.isnan(_at(rows["resting_hr_lag1"], "2024-01-06"))
+    assert _at(rows["resting_hr_lag2"], "2024-01-06") == _at(history, "2024-01-04")
+    assert _at(rows["resting_hr_lag1"], "2024-01-08") == _at(history, "2024-01-07")
+    assert np.isnan(_at(rows["resting_hr_lag1"], "2024-01-01"))
+
+
+def test_rolling_windows_cover_calendar_days(storage: DuckDBStorage, history: pd.Series) -> None:
+    rows = _rows(storage)
+    window = history.rolling("3D")
+
+    np.testing.assert_allclose(rows["resting_hr_mean3"], window.mean())
+    np.testing.assert_allclose(rows["resting_hr_std3"], window.std(), equal_nan=True)
+    # Only 2024-01-04 and 2024-01-06 fall in the window ending on 2024-01-06.
+    expected = history.loc[["2024-01-04", "2024-01-06"]]
+    assert _at(rows["resting_hr_mean3"], "2024-01-06") == pytest.approx(expected.mean())
+
+
+def test_next_day_targets(storage: DuckDBStorage, history: pd.Series) -> None:
+    refresh_daily_features(storage)
+    scores = storage.execute("SELECT date, sleep_score FROM daily_features ORDER BY date").df()
+    sleep_score = scores.set_index(pd.to_datetime(scores["date"]))["sleep_score"]
+
+    rows = _rows(storage)
+
+    assert _at(rows["next_resting_hr"], "2024-01-01") == _at(history, "2024-01-02")
+    assert _at(rows["next_sleep_score"], "2024-01-06") == _at(sleep_score, "2024-01-07")
+    assert _at(rows["sleep_score"], "2024-01-06") == _at(sleep_score, "2024-01-06")
+    # No next day across the gap or after the last day.
+    assert np.isnan(_at(rows["next_sleep_score"], "2024-01-04"))
+    assert np.isnan(_at(rows["next_resting_hr"], "2024-01-10"))
+
+
+def test_refresh_picks_up_changed_days(storage: DuckDBStorage, history: pd.Series) -> None:
+    lagged = LaggedFeatures(storage, SPEC)
+    lagged.load()
+    storage.execute("UPDATE resting_hr SET value = 99 WHERE date = '2024-01-07'")
+
+    lagged.refresh("2024-01-07", "2024-01-07")
+
+    rows = _rows(storage)
+    assert _at(rows["next_resting_hr"], "2024-01-06") == 99
+    assert _at(rows["resting_hr"], "2024-01-07") == 99
+    assert _at(rows["resting_hr_lag2"], "2024-01-09") == 99
+
+
+def test_next_day_sleep_score_model_trains_on_sleep_score(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    daily_history(30)
+
+    result = ModelTrainer(storage).train_next_day("sleep_score", model_type="ridge", spec=SPEC)
+
+    # The target is tomorrow's score, so the last day has none and is skipped.
+    assert result["n_samples"] == 29
+    assert result["model"].lag_spec["metrics"] == ("resting_hr", "sleep_score")
+    with pytest.raises(ValueError, match="lagged metrics"):
+        ModelTrainer(storage).train_next_day("health_score", spec=SPEC)
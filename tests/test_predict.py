@@ -0,0 +1,35 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from circadia.ml.predict import Predictor
+from circadia.ml.train import ModelTrainer
+from circadia.storage import DuckDBStorage
+
+
+def test_prediction_inputs_match_training_inputs(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex], tmp_path: Path
+) -> None:
+    daily_history(40)
+    # A rest day with no steps is a real zero, not a missing value.
+    storage.execute("UPDATE daily_summary SET steps = 0 WHERE date = '2024-01-05'")
+    storage.execute("DELETE FROM spo2 WHERE date = '2024-01-06'")
+    trainer = ModelTrainer(storage)
+    result = trainer.train(model_type="ridge")
+    result["model"].save(tmp_path / "model.joblib")
+    training = trainer.load_training_set()
+
+    predictor = Predictor(storage, tmp_path / "model.joblib")
+    predictor.load_model()
+    batch = predictor.load_features()
+    X = predictor._feature_matrix(batch)
+
+    np.testing.assert_array_equal(batch.dates, training.dates)
+    np.testing.assert_allclose(X, training.X, rtol=1e-6)
+    assert X[4, predictor.feature_names.index("steps")] == 0
+    assert X[5, predictor.feature_names.index("spo2_avg")] == 0
+    np.testing.assert_allclose(
+        predictor.predict_dates()["prediction"], result["model"].predict(training.X), rtol=1e-4
+    )
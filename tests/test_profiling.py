@@ -0,0 +1,117 @@
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from circadia.telemetry import Profiler, parse_modes
+
+
+def _sleep_calls(stats: pstats.Stats | None) -> int:
+    assert stats is not None
+    return sum(
+        calls for (_, _, function), (calls, *_) in stats.stats.items() if "time.sleep" in function
+    )
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (None, set()),
+        ("", set()),
+        ("off", set()),
+        ("cpu", {"cpu"}),
+        (" CPU , memory ", {"cpu", "memory"}),
+        ("all", {"cpu", "memory"}),
+        ("1", {"cpu", "memory"}),
+        (["memory"], {"memory"}),
+    ],
+)
+def test_parse_modes(value: str | list[str] | None, expected: set[str]) -> None:
+    assert parse_modes(value) == expected
+
+
+def test_parse_modes_rejects_unknown_modes() -> None:
+    with pytest.raises(ValueError, match="gpu"):
+        parse_modes("cpu,gpu")
+
+
+def test_disabled_profiler_records_nothing(tmp_path: Path) -> None:
+    profiler = Profiler(None, tmp_path)
+
+    with profiler.stage("fetch"):
+        pass
+
+    assert profiler.stages() == {}
+    assert profiler.write_report() is None
+
+
+def test_nested_stage_pauses_its_parent(tmp_path: Path) -> None:
+    profiler = Profiler("cpu", tmp_path, report_interval=float("inf"))
+
+    with profiler.stage("outer"):
+        time.sleep(0.05)
+        with profiler.stage("inner"):
+            time.sleep(0.1)
+
+    stages = profiler.stages()
+    outer, inner = stages["outer"], stages["inner"]
+    assert outer.calls == inner.calls == 1
+    # Wall time includes nested stages; the profiles do not.
+    assert inner.seconds >= 0.1
+    assert outer.seconds >= inner.seconds + 0.05
+    assert _sleep_calls(outer.stats) == 1
+    assert _sleep_calls(inner.stats) == 1
+
+
+def test_stages_accumulate_across_calls(tmp_path: Path) -> None:
+    profiler = Profiler("cpu", tmp_path, report_interval=float("inf"))
+
+    for _ in range(3):
+        with profiler.stage("fetch"):
+            time.sleep(0.01)
+
+    stage = profiler.stages()["fetch"]
+    assert stage.calls == 3
+    assert stage.seconds >= 0.03
+    assert stage.max_seconds <= stage.seconds
+    assert _sleep_calls(stage.stats) == 3
+
+
+def test_memory_mode_records_peak_above_entry(tmp_path: Path) -> None:
+    was_tracing = tracemalloc.is_tracing()
+    profiler = Profiler("memory", tmp_path, report_interval=float("inf"))
+    try:
+        with profiler.stage("allocate"):
+            block = bytearray(4 * 2**20)
+            del block
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    stage = profiler.stages()["allocate"]
+    assert stage.peak_bytes >= 4 * 2**20
+    assert stage.stats is None
+    assert stage.top_allocations
+
+
+def test_write_report(tmp_path: Path) -> None:
+    profiler = Profiler("cpu", tmp_path / "profiles", report_interval=float("inf"))
+    with profiler.stage("fetch"):
+        time.sleep(0.01)
+    with profiler.stage("train"):
+        time.sleep(0.02)
+
+    path = profiler.write_report()
+
+    assert path == tmp_path / "profiles" / "report.txt"
+    report = path.read_text()
+    assert report.startswith("Profile written ")
+    assert "modes: cpu" in report
+    # Stages are listed slowest first, then each one's own functions.
+    assert report.index("\ntrain ") < report.index("\nfetch ")
+    assert "== fetch ==" in report and "== train ==" in report
+    assert "time.sleep" in report
+    loaded = pstats.Stats(str(tmp_path / "profiles" / "fetch.prof"))
+    assert _sleep_calls(loaded) == 1
@@ -0,0 +1,80 @@
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+
+from circadia.storage import DuckDBStorage, QueryCache
+from circadia.storage.cache import referenced_tables
+
+
+def _table(rows: int) -> pa.Table:
+    return pa.table({"value": pa.array(range(rows), type=pa.int64())})
+
+
+def test_referenced_tables_reads_from_and_join_clauses() -> None:
+    query = """
+        SELECT * FROM sleep_summary s
+        LEFT JOIN "resting_hr" r ON r.date = s.date
+        join HRV h USING (date)
+        WHERE s.date IN (SELECT date FROM daily_summary)
+    """
+
+    assert referenced_tables(query) == ("daily_summary", "hrv", "resting_hr", "sleep_summary")
+
+
+def test_least_recently_used_entry_is_evicted_first() -> None:
+    cache = QueryCache(max_entries=2)
+    cache.put("a", _table(1), ("t",))
+    cache.put("b", _table(1), ("t",))
+    assert cache.get("a") is not None
+
+    cache.put("c", _table(1), ("t",))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats().evictions == 1
+
+
+def test_byte_bound_evicts_until_under_limit() -> None:
+    size = _table(100).nbytes
+    cache = QueryCache(max_entries=100, max_bytes=size * 2)
+    for key in "abc":
+        cache.put(key, _table(100), ("t",))
+
+    stats = cache.stats()
+    assert stats.entries == 2
+    assert stats.bytes == size * 2
+    assert cache.get("a") is None
+
+    # Results larger than the whole budget are never stored.
+    cache.put("big", _table(1000), ("t",))
+    assert cache.get("big") is None
+
+
+def test_invalidate_drops_only_entries_reading_the_table() -> None:
+    cache = QueryCache()
+    cache.put("a", _table(1), ("resting_hr", "hrv"))
+    cache.put("b", _table(1), ("sleep_summary",))
+
+    assert cache.invalidate("HRV") == 1
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def _resting_hr(value: int) -> pd.DataFrame:
+    return pd.DataFrame({"date": [date(2024, 1, 1)], "device": ["test"], "value": [value]})
+
+
+def test_bump_version_invalidates_cached_queries(storage: DuckDBStorage) -> None:
+    storage.upsert("resting_hr", _resting_hr(60))
+    query = "SELECT value FROM resting_hr WHERE device = ?"
+
+    assert storage.query(query, ["test"]).column("value").to_pylist() == [60]
+    assert storage.query(query, ["test"]).column("value").to_pylist() == [60]
+    assert storage.cache.stats().hits == 1
+
+    storage.upsert("resting_hr", _resting_hr(55))
+
+    assert storage.cache.stats().invalidations == 1
+    assert storage.query(query, ["test"]).column("value").to_pylist() == [55]
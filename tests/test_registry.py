@@ -0,0 +1,115 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from circadia.ml.model import CircadiaModel
+from circadia.ml.registry import (
+    ARTIFACT_NAME,
+    METADATA_NAME,
+    ModelRegistry,
+    _ModelCache,
+    hash_training_data,
+)
+
+
+def _model(seed: int = 0) -> CircadiaModel:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(30, 3))
+    model = CircadiaModel(model_type="ridge").fit(X, X @ [1.0, 2.0, 3.0])
+    model.feature_names = ["a", "b", "c"]
+    return model
+
+
+def _save(path: Path, seed: int = 0) -> Path:
+    _model(seed).save(path)
+    return path
+
+
+def test_register_writes_consecutive_version_directories(tmp_path: Path) -> None:
+    registry = ModelRegistry(tmp_path / "models")
+
+    first = registry.register(_model(), "sleep_score", target="sleep_score", n_samples=30)
+    second = registry.register(_model(1), "sleep_score", metrics={"r2": 0.9})
+    registry.register(_model(), "health_score")
+
+    assert (first.version, second.version) == (1, 2)
+    assert registry.versions("sleep_score") == [1, 2]
+    assert registry.names() == ["health_score", "sleep_score"]
+    assert registry.artifact_path("sleep_score") == (
+        tmp_path / "models" / "sleep_score" / "2" / ARTIFACT_NAME
+    )
+    # Directories without an artifact, e.g. a failed write, are not versions.
+    (tmp_path / "models" / "sleep_score" / "3").mkdir()
+    assert registry.latest_version("sleep_score") == 2
+    with pytest.raises(FileNotFoundError):
+        registry.latest_version("missing")
+
+
+def test_metadata_round_trips_through_json(tmp_path: Path) -> None:
+    registry = ModelRegistry(tmp_path)
+    registry.register(_model(), "sleep_score", target="sleep_score", data_hash="abc")
+
+    raw = json.loads((tmp_path / "sleep_score" / "1" / METADATA_NAME).read_text())
+    metadata = registry.metadata("sleep_score")
+
+    assert raw["model_type"] == "ridge"
+    assert raw["feature_names"] == ["a", "b", "c"]
+    assert metadata.version == 1
+    assert metadata.target == "sleep_score"
+    assert metadata.data_hash == "abc"
+
+
+def test_load_returns_the_registered_model(tmp_path: Path) -> None:
+    registry = ModelRegistry(tmp_path)
+    model = _model()
+    registry.register(model, "sleep_score")
+    X = np.ones((2, 3))
+
+    loaded = registry.load("sleep_score", version=1)
+
+    np.testing.assert_allclose(loaded.predict(X), model.predict(X))
+
+
+def test_cache_reuses_loaded_models(tmp_path: Path) -> None:
+    cache = _ModelCache(max_models=2)
+    path = _save(tmp_path / "a.joblib")
+
+    assert cache.load(path) is cache.load(path)
+    assert len(cache) == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = _ModelCache(max_models=2)
+    a, b, c = (_save(tmp_path / f"{name}.joblib") for name in "abc")
+    first_a, first_b = cache.load(a), cache.load(b)
+    cache.load(a)
+
+    cache.load(c)
+
+    assert len(cache) == 2
+    assert cache.load(a) is first_a
+    # b was least recently used, so it was evicted and is read from disk again.
+    assert cache.load(b) is not first_b
+
+
+def test_cache_reloads_a_rewritten_artifact(tmp_path: Path) -> None:
+    cache = _ModelCache()
+    path = _save(tmp_path / "model.joblib")
+    before = cache.load(path)
+
+    _save(path, seed=1)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert cache.load(path) is not before
+
+
+def test_hash_training_data() -> None:
+    X, y = np.arange(12.0).reshape(4, 3), np.arange(4.0)
+
+    assert hash_training_data(X, y) == hash_training_data(X.astype(np.float32), y)
+    assert hash_training_data(X, y) != hash_training_data(X[:3], y[:3])
+    assert hash_training_data(X, y, previous="abc") != hash_training_data(X, y)
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from circadia.storage import DuckDBStorage, HeartRateRollup
+from circadia.storage.rollup import RESOLUTIONS, pick_resolution
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def rollup(storage: DuckDBStorage) -> HeartRateRollup:
+    # A day of 5-second samples for two devices, with spikes the chart must keep.
+    rng = np.random.default_rng(0)
+    timestamps = pd.date_range(START, START + timedelta(days=1), freq="5s", inclusive="left")
+    for device in ("a", "b"):
+        values = rng.integers(55, 90, len(timestamps))
+        values[rng.choice(len(values), 20, replace=False)] = 190
+        values[rng.choice(len(values), 20, replace=False)] = 35
+        storage.upsert(
+            "heart_rate_intraday",
+            pd.DataFrame({"timestamp": timestamps, "device": device, "value": values}),
+        )
+    rollup = HeartRateRollup(storage)
+    rollup.refresh()
+    return rollup
+
+
+@pytest.mark.parametrize(
+    ("span", "max_points", "width"),
+    [
+        (timedelta(seconds=1000), 2000, 1),
+        # 1001 one-second buckets would need 2002 points.
+        (timedelta(seconds=1001), 2000, 5),
+        (timedelta(hours=1), 2000, 5),
+        (timedelta(days=1), 2000, 300),
+        (timedelta(days=365), 2000, 86400),
+        (timedelta(days=365), 200, 7 * 86400),
+        # Nothing fits, so the coarsest width is used anyway.
+        (timedelta(days=100 * 365), 200, RESOLUTIONS[-1]),
+    ],
+)
+def test_pick_resolution(span: timedelta, max_points: int, width: int) -> None:
+    assert pick_resolution(START, START + span, max_points) == width
+
+
+def test_pick_resolution_is_the_finest_width_that_fits() -> None:
+    for hours in (1, 7, 30, 24 * 9, 24 * 400):
+        span = timedelta(hours=hours).total_seconds()
+        width = pick_resolution(START, START + timedelta(hours=hours), 500)
+
+        assert 2 * np.ceil(span / width) <= 500
+        finer = [w for w in RESOLUTIONS if w < width]
+        assert all(2 * np.ceil(span / w) > 500 for w in finer)
+
+
+def _raw(storage: DuckDBStorage, start: datetime, end: datetime, device: str) -> pd.DataFrame:
+    frame: pd.DataFrame = storage.execute(
+        """
+        SELECT timestamp, value FROM heart_rate_intraday
+        WHERE device = ? AND timestamp >= ? AND timestamp < ?
+        """,
+        [device, start, end],
+    ).df()
+    return frame
+
+
+@pytest.mark.parametrize(
+    ("span", "max_points"),
+    # Fifteen-second buckets from the raw samples, fifteen-minute ones from the rollup.
+    [(timedelta(minutes=10), 100), (timedelta(days=1), 200)],
+)
+def test_downsample_keeps_each_buckets_raw_min_and_max(
+    storage: DuckDBStorage, rollup: HeartRateRollup, span: timedelta, max_points: int
+) -> None:
+    start = START + timedelta(hours=6)
+    end = start + span
+    width = pick_resolution(start, end, max_points)
+
+    result = rollup.downsample(start, end, device="a", max_points=max_points).to_pandas()
+
+    assert len(result) <= max_points
+    assert set(result["device"]) == {"a"}
+    assert result["timestamp"].is_monotonic_increasing
+    raw = _raw(storage, start, end, "a")
+    expected = raw.groupby(raw["timestamp"].dt.floor(f"{width}s"))["value"].agg(["min", "max"])
+    got = result.groupby(result["timestamp"].dt.floor(f"{width}s"))["value"].agg(["min", "max"])
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    # Every point is a stored sample, not an aggregate.
+    merged = result.merge(raw, on=["timestamp", "value"], how="left", indicator=True)
+    assert (merged["_merge"] == "both").all()
+
+
+def test_downsample_returns_a_sample_once_when_it_is_both_min_and_max(
+    storage: DuckDBStorage, rollup: HeartRateRollup
+) -> None:
+    # One-second buckets hold at most one 5-second sample each.
+    start, end = START, START + timedelta(minutes=5)
+
+    result = rollup.downsample(start, end, device="b").to_pandas()
+
+    raw = _raw(storage, start, end, "b").sort_values("timestamp", ignore_index=True)
+    pd.testing.assert_frame_equal(result[["timestamp", "value"]], raw, check_dtype=False)
+
+
+def test_downsample_covers_every_device_without_a_filter(rollup: HeartRateRollup) -> None:
+    result = rollup.downsample("2024-01-01", "2024-01-02", max_points=200).to_pandas()
+
+    assert set(result["device"]) == {"a", "b"}
+    assert result.groupby("device").size().max() <= 200
+    assert result["value"].max() == 190
+    assert result["value"].min() == 35
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from circadia.ml.predict import Predictor
+from circadia.ml.registry import ModelRegistry
+from circadia.ml.service import ScoringClient, ScoringService
+from circadia.ml.train import ModelTrainer
+from circadia.storage import DuckDBStorage
+
+DATES = [f"2024-01-{day:02d}" for day in range(10, 20)]
+
+
+@pytest.fixture
+def feature_loads(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """Number of rows requested by each Predictor.load_features call."""
+    loads: list[int] = []
+    original = Predictor.load_features
+
+    def counting(self: Predictor, dates: Any = None, **kwargs: Any) -> Any:
+        dates = list(dates) if dates is not None else None
+        loads.append(len(dates) if dates is not None else 0)
+        return original(self, dates, **kwargs)
+
+    monkeypatch.setattr(Predictor, "load_features", counting)
+    return loads
+
+
+@pytest.fixture
+def service(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex], tmp_path: Path
+) -> Iterator[ScoringService]:
+    daily_history(40)
+    registry = ModelRegistry(tmp_path / "models")
+    registry.register_training(ModelTrainer(storage).train(model_type="ridge"))
+    service = ScoringService(storage, registry, default_device="test", refresh_seconds=0)
+    yield service
+    service.stop()
+
+
+def test_queued_requests_are_scored_in_one_batch(
+    service: ScoringService, feature_loads: list[int]
+) -> None:
+    futures = [service.submit("sleep_score", date) for date in DATES]
+
+    service.start()
+
+    assert all(isinstance(future.result(5), float) for future in futures)
+    assert feature_loads == [len(DATES)]
+    assert service.stats()["requests"] == len(DATES)
+
+
+def test_predictions_are_cached_until_data_changes(
+    service: ScoringService, storage: DuckDBStorage, feature_loads: list[int]
+) -> None:
+    service.start()
+    first = service.predict("sleep_score", "2024-01-15")
+    assert service.predict("sleep_score", "2024-01-15") == first
+    assert feature_loads == [1]
+    assert service.stats()["cached_predictions"] == 1
+
+    storage.execute("UPDATE resting_hr SET value = value + 30 WHERE date = '2024-01-15'")
+    storage.bump_version("resting_hr")
+
+    assert service.predict("sleep_score", "2024-01-15") != first
+    assert feature_loads == [1, 1]
+
+
+def test_bad_requests_get_error_replies(service: ScoringService) -> None:
+    service.start()
+
+    results = service.predict_many(
+        [
+            {"model": "sleep_score", "date": "2024-01-15"},
+            {"model": "sleep_score", "date": "2031-01-01"},
+            {"model": "no_such_model", "date": "2024-01-15"},
+        ]
+    )
+
+    assert "prediction" in results[0]
+    assert results[1]["error"] == "No features for test on 2031-01-01"
+    assert "no_such_model" in results[2]["error"]
+
+
+def test_unix_socket_answers_every_line(service: ScoringService, tmp_path: Path) -> None:
+    socket_path = tmp_path / "scoring.sock"
+    threading.Thread(target=service.serve_unix, args=(socket_path,), daemon=True).start()
+    deadline = time.monotonic() + 5
+    while not socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    client = ScoringClient(socket_path)
+
+    try:
+        prediction = client.predict("sleep_score", "2024-01-15")
+        client.sock.sendall(b"not json\n")
+        malformed = json.loads(client._reader.readline())
+        missing = client.request({"date": "2024-01-15"})
+        stats = client.stats()
+    finally:
+        client.close()
+
+    assert isinstance(prediction["prediction"], float)
+    assert "error" in malformed
+    assert missing == {"error": "'model'"}
+    assert stats["requests"] == 1
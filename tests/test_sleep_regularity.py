@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from circadia.features.sleep import (
+    MINUTES_PER_DAY,
+    SleepRegularityTracker,
+    _rolling_sum,
+    build_sleep_wake_matrix,
+    calculate_sleep_regularity,
+    load_sleep_wake_matrix,
+    refresh_sleep_regularity,
+)
+from circadia.storage import DuckDBStorage
+
+
+def _nights(days: int) -> tuple[np.ndarray, np.ndarray]:
+    """Identical nights asleep from 23:00 to 07:00 on a noon-to-noon grid."""
+    asleep = np.zeros((days, MINUTES_PER_DAY), dtype=bool)
+    asleep[:, 11 * 60 : 19 * 60] = True
+    return asleep, np.ones(days, dtype=bool)
+
+
+def test_rolling_sum_is_aligned_with_input() -> None:
+    values = np.arange(1.0, 6.0)
+    np.testing.assert_array_equal(_rolling_sum(values, 1), values)
+    np.testing.assert_array_equal(_rolling_sum(values, 3), [np.nan, np.nan, 6.0, 9.0, 12.0])
+    assert np.isnan(_rolling_sum(values, 7)).all()
+    assert len(_rolling_sum(values, 7)) == len(values)
+
+
+def test_rolling_sum_rejects_empty_window() -> None:
+    with pytest.raises(ValueError):
+        _rolling_sum(np.ones(3), 0)
+
+
+@pytest.mark.parametrize("days", [0, 1, 2, 4, 6])
+def test_regularity_with_history_shorter_than_window(days: int) -> None:
+    asleep, has_data = _nights(days)
+    dates = [f"2024-01-{day + 1:02d}" for day in range(days)]
+
+    result = calculate_sleep_regularity(asleep, has_data, dates, window_days=7)
+
+    assert list(result["date"]) == dates
+    assert result["sleep_midpoint_minutes"].notna().all()
+    # No 7-day window is complete yet.
+    assert result["sleep_regularity_index"].isna().all()
+    assert result["midpoint_phase_minutes"].isna().all()
+
+
+def test_regularity_full_window() -> None:
+    asleep, has_data = _nights(9)
+    dates = [f"2024-01-{day + 1:02d}" for day in range(9)]
+
+    result = calculate_sleep_regularity(asleep, has_data, dates, window_days=2)
+
+    assert result["sleep_regularity_index"].iloc[1:].eq(100.0).all()
+    np.testing.assert_allclose(result["midpoint_phase_minutes"].iloc[1:], 179.5, atol=1e-6)
+
+
+def _irregular_nights(days: int) -> tuple[np.ndarray, np.ndarray]:
+    """Nights with shifting bed and wake times and a few missing."""
+    rng = np.random.default_rng(7)
+    asleep = np.zeros((days, MINUTES_PER_DAY), dtype=bool)
+    for day, (onset, length) in enumerate(
+        zip(rng.integers(540, 780, days), rng.integers(360, 540, days))
+    ):
+        asleep[day, onset : onset + length] = True
+    has_data = np.ones(days, dtype=bool)
+    has_data[[3, 10, 11]] = False
+    asleep[~has_data] = False
+    return asleep, has_data
+
+
+def test_tracker_matches_batch() -> None:
+    asleep, has_data = _irregular_nights(20)
+    dates = [f"2024-01-{day + 1:02d}" for day in range(20)]
+    batch = calculate_sleep_regularity(asleep, has_data, dates, window_days=7)
+    tracker = SleepRegularityTracker(window_days=7)
+
+    for (_, expected), night, present in zip(batch.iterrows(), asleep, has_data):
+        result = tracker.update(night if present else None)
+
+        for column in (
+            "sleep_regularity_index",
+            "sleep_midpoint_minutes",
+            "midpoint_phase_minutes",
+        ):
+            if np.isnan(expected[column]):
+                assert result[column] is None
+            else:
+                assert result[column] == pytest.approx(expected[column])
+
+
+def test_tracker_reports_nothing_before_window_is_full() -> None:
+    asleep, _ = _nights(7)
+    tracker = SleepRegularityTracker(window_days=7)
+
+    warmup = [tracker.update(night) for night in asleep[:6]]
+    full = tracker.update(asleep[6])
+
+    assert all(r["sleep_regularity_index"] is None for r in warmup)
+    assert all(r["midpoint_phase_minutes"] is None for r in warmup)
+    assert full["sleep_regularity_index"] == 100.0
+
+
+def test_build_sleep_wake_matrix() -> None:
+    timestamps = np.array(
+        ["2024-01-01T23:00", "2024-01-02T07:00", "2024-01-03T10:00"], dtype="datetime64[m]"
+    )
+    levels = np.array([1, 3, 2])  # light, wake, rem
+    durations = np.array([8 * 3600, 1800, 4 * 3600], dtype=np.float64)
+
+    asleep, has_data = build_sleep_wake_matrix(
+        timestamps, levels, durations, "2024-01-01", "2024-01-04"
+    )
+
+    assert asleep.shape == (4, MINUTES_PER_DAY)
+    np.testing.assert_array_equal(has_data, [False, True, True, True])
+    # Row 1 runs from noon on Jan 1: asleep 23:00 to 07:00, the wake segment is not sleep.
+    assert np.flatnonzero(asleep[1]).tolist() == list(range(11 * 60, 19 * 60))
+    # A segment crossing noon is split between the two sleep days.
+    assert np.flatnonzero(asleep[2]).tolist() == list(range(22 * 60, MINUTES_PER_DAY))
+    assert np.flatnonzero(asleep[3]).tolist() == list(range(2 * 60))
+    assert not asleep[0].any()
+
+
+def test_refresh_stores_tracker_output(storage: DuckDBStorage) -> None:
+    asleep, _ = _irregular_nights(20)
+    rows = []
+    origin = np.datetime64("2024-01-01T00:00") - np.timedelta64(12, "h")
+    for day, night in enumerate(asleep):
+        minutes = np.flatnonzero(night)
+        if minutes.size:
+            start = origin + np.timedelta64(day * MINUTES_PER_DAY + int(minutes[0]), "m")
+            rows.append((start, int(minutes.size) * 60))
+    storage.upsert(
+        "sleep_levels",
+        pd.DataFrame(
+            {
+                "timestamp": [start for start, _ in rows],
+                "device": "test",
+                "is_main_sleep": True,
+                "level": 1,
+                "duration_seconds": [seconds for _, seconds in rows],
+            }
+        ),
+    )
+
+    # Batch over the same history padded with the empty week before it.
+    padded, padded_has_data = load_sleep_wake_matrix(storage, "test", "2023-12-26", "2024-01-20")
+    dates = [str(np.datetime64("2023-12-26") + np.timedelta64(day, "D")) for day in range(26)]
+    batch = calculate_sleep_regularity(padded, padded_has_data, dates, window_days=7).iloc[6:]
+
+    # Split in two so the second call has to seed its tracker from stored nights.
+    refresh_sleep_regularity(storage, "test", "2024-01-01", "2024-01-09")
+    refresh_sleep_regularity(storage, "test", "2024-01-10", "2024-01-20")
+
+    stored = storage.execute(
+        "SELECT sleep_regularity_index, midpoint_phase_minutes FROM sleep_regularity ORDER BY date"
+    ).df()
+    np.testing.assert_allclose(stored["sleep_regularity_index"], batch["sleep_regularity_index"])
+    np.testing.assert_allclose(stored["midpoint_phase_minutes"], batch["midpoint_phase_minutes"])
@@ -0,0 +1,236 @@
+import math
+import random
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from circadia.features.activity import ActivityFeatures, calculate_activity_score
+from circadia.features.composite import (
+    RecoveryFeatures,
+    calculate_health_score,
+    calculate_recovery_score,
+    get_readiness_status,
+)
+from circadia.features.sleep import SleepFeatures, calculate_sleep_score
+from circadia.features.sql import install_scoring_macros
+from circadia.features.vectorized import calculate_health_score_batch, calculate_scores_batch
+from circadia.storage import DuckDBStorage
+
+ROWS = 2000
+SLEEP_COLUMNS = [
+    "efficiency",
+    "total_minutes_asleep",
+    "minutes_rem",
+    "minutes_deep",
+    "minutes_to_fall_asleep",
+    "waso",
+]
+ACTIVITY_COLUMNS = ["steps", "active_minutes_total", "minutes_very_active", "active_zone_minutes"]
+RECOVERY_COLUMNS = ["hrv_rmssd", "resting_hr", "spo2_avg", "breathing_rate"]
+
+
+@pytest.fixture(autouse=True)
+def macros(storage: DuckDBStorage) -> None:
+    install_scoring_macros(storage)
+
+
+def _maybe_null(rng: random.Random, value: float, rate: float) -> float | int | None:
+    return None if rng.random() < rate else value
+
+
+def _random_inputs(seed: int = 7) -> dict[str, list[Any]]:
+    rng = random.Random(seed)
+    columns: dict[str, list[Any]] = {name: [] for name in SLEEP_COLUMNS + ACTIVITY_COLUMNS}
+    columns.update({name: [] for name in RECOVERY_COLUMNS})
+    for _ in range(ROWS):
+        asleep = rng.choice([0, rng.randint(1, 600)])
+        row = {
+            # Half-point efficiencies and minute counts put many totals on x.x5.
+            "efficiency": rng.randint(0, 200) / 2,
+            "total_minutes_asleep": asleep,
+            "minutes_rem": rng.randint(0, max(asleep, 1)),
+            "minutes_deep": rng.randint(0, max(asleep, 1)),
+            "minutes_to_fall_asleep": rng.randint(0, 60),
+            "waso": rng.randint(0, 90),
+            "steps": rng.randint(0, 20000),
+            "active_minutes_total": rng.choice([0, rng.randint(1, 180)]),
+            "minutes_very_active": rng.randint(0, 60),
+            "active_zone_minutes": rng.randint(0, 90),
+            "hrv_rmssd": rng.choice([19.5, 20, 30, 50, rng.uniform(5, 90)]),
+            "resting_hr": rng.randint(40, 90),
+            "spo2_avg": rng.choice([93, 95, 97, rng.uniform(88, 100)]),
+            "breathing_rate": rng.choice([10, 12, 16, 18, rng.uniform(8, 22)]),
+        }
+        for name, value in row.items():
+            rate = 0.2 if name in RECOVERY_COLUMNS else 0.03
+            columns[name].append(_maybe_null(rng, value, rate))
+    return columns
+
+
+def _macro_scores(storage: DuckDBStorage, table: pa.Table) -> list[tuple[Any, ...]]:
+    storage.conn.register("inputs", table)
+    rows: list[tuple[Any, ...]] = storage.execute(
+        """
+        WITH scored AS (
+            SELECT
+                row_number() OVER () AS i,
+                *,
+                calculate_sleep_score(
+                    efficiency, total_minutes_asleep, minutes_rem, minutes_deep,
+                    minutes_to_fall_asleep, waso
+                ) AS sleep_score,
+                calculate_activity_score(
+                    steps, active_minutes_total, minutes_very_active, active_zone_minutes
+                ) AS activity_score
+            FROM inputs
+        ),
+        recovered AS (
+            SELECT
+                *,
+                calculate_recovery_score(
+                    hrv_rmssd, resting_hr, sleep_score, spo2_avg, breathing_rate
+                ) AS recovery_score
+            FROM scored
+        )
+        SELECT
+            sleep_score,
+            activity_score,
+            recovery_score,
+            calculate_health_score(sleep_score, activity_score, recovery_score)
+        FROM recovered
+        ORDER BY i
+        """
+    ).fetchall()
+    return rows
+
+
+def _scalar_scores(row: dict[str, Any]) -> tuple[float, ...] | None:
+    """Scores from the Python scorers, or None when they cannot score the row."""
+    if any(row[name] is None for name in SLEEP_COLUMNS + ACTIVITY_COLUMNS):
+        return None
+    sleep = SleepFeatures(
+        date="2024-01-01",
+        device="test",
+        total_minutes_asleep=row["total_minutes_asleep"],
+        total_minutes_in_bed=0,
+        efficiency=row["efficiency"],
+        minutes_light=0,
+        minutes_rem=row["minutes_rem"],
+        minutes_deep=row["minutes_deep"],
+        minutes_awake=0,
+        minutes_after_wakeup=row["waso"],
+        minutes_to_fall_asleep=row["minutes_to_fall_asleep"],
+        waso=row["waso"],
+    )
+    activity = ActivityFeatures(
+        date="2024-01-01",
+        device="test",
+        steps=row["steps"],
+        calories=0.0,
+        distance=0.0,
+        minutes_sedentary=0,
+        minutes_lightly_active=0,
+        minutes_fairly_active=0,
+        minutes_very_active=row["minutes_very_active"],
+        active_minutes_total=row["active_minutes_total"],
+        hr_zone_normal=0,
+        hr_zone_fat_burn=0,
+        hr_zone_cardio=0,
+        hr_zone_peak=0,
+        active_zone_minutes=row["active_zone_minutes"],
+    )
+    sleep_score = calculate_sleep_score(sleep)
+    recovery = RecoveryFeatures(
+        date="2024-01-01",
+        device="test",
+        resting_hr=row["resting_hr"],
+        hrv_rmssd=row["hrv_rmssd"],
+        hrv_deep=None,
+        sleep_score=sleep_score,
+        spo2_avg=row["spo2_avg"],
+        breathing_rate=row["breathing_rate"],
+        skin_temp_variation=None,
+    )
+    return (
+        sleep_score,
+        calculate_activity_score(activity),
+        calculate_recovery_score(recovery),
+        calculate_health_score(sleep, activity, recovery),
+    )
+
+
+def test_macros_match_scalar_and_batch_scorers(storage: DuckDBStorage) -> None:
+    columns = _random_inputs()
+    table = pa.table(columns)
+    macro = _macro_scores(storage, table)
+    batch = calculate_scores_batch(table)
+    batch_rows = zip(
+        batch["sleep_score"],
+        batch["activity_score"],
+        batch["recovery_score"],
+        batch["health_score"],
+    )
+
+    scalar_checked = 0
+    for i, (from_sql, from_batch) in enumerate(zip(macro, batch_rows)):
+        # NULL from SQL and NaN from the batch scorer both mean "not scorable".
+        expected = [None if math.isnan(v) else float(v) for v in from_batch]
+        assert list(from_sql) == expected, f"row {i}: {columns_row(columns, i)}"
+
+        scalar = _scalar_scores(columns_row(columns, i))
+        if scalar is not None:
+            assert list(from_sql) == list(scalar), f"row {i}: {columns_row(columns, i)}"
+            scalar_checked += 1
+    assert scalar_checked > ROWS // 2
+
+
+def test_recovery_macro_without_hrv_or_resting_hr(storage: DuckDBStorage) -> None:
+    score = storage.execute("SELECT calculate_recovery_score(NULL, NULL, 80.0, 97, 14)").fetchone()[
+        0
+    ]
+    assert score == 50.0
+
+
+def test_round1_matches_python_round_on_ties(storage: DuckDBStorage) -> None:
+    values = [n / 100 + 0.005 for n in range(-2000, 12000)] + [n / 20 for n in range(2000)]
+    got = storage.execute(
+        "SELECT circadia_round1(x) FROM unnest(CAST(? AS DOUBLE[])) t(x)", [values]
+    ).fetchall()
+    assert [row[0] for row in got] == [round(v, 1) for v in values]
+
+
+def test_health_macro_matches_scorers_on_tenth_grid(storage: DuckDBStorage) -> None:
+    # Component scores are stored to one decimal, so weight them on that grid.
+    rng = np.random.default_rng(11)
+    sleep, activity, recovery = (rng.integers(0, 1001, 5000) / 10 for _ in range(3))
+    got = storage.execute(
+        """
+        SELECT calculate_health_score(s, a, r)
+        FROM (
+            SELECT
+                unnest(CAST(? AS DOUBLE[])) AS s,
+                unnest(CAST(? AS DOUBLE[])) AS a,
+                unnest(CAST(? AS DOUBLE[])) AS r
+        )
+        """,
+        [sleep.tolist(), activity.tolist(), recovery.tolist()],
+    ).fetchall()
+    expected = [
+        round(r * 0.4 + s * 0.35 + a * 0.25, 1)
+        for s, a, r in zip(sleep.tolist(), activity.tolist(), recovery.tolist())
+    ]
+    assert [row[0] for row in got] == expected
+    batch = calculate_health_score_batch(sleep, activity, recovery)
+    assert [row[0] for row in got] == batch.tolist()
+
+
+@pytest.mark.parametrize("score", [None, 0.0, 19.9, 20.0, 39.95, 40.0, 60.0, 79.9, 80.0, 100.0])
+def test_readiness_status_macro(storage: DuckDBStorage, score: float | None) -> None:
+    got = storage.execute("SELECT readiness_status(CAST(? AS DOUBLE))", [score]).fetchone()[0]
+    assert got == (None if score is None else get_readiness_status(score))
+
+
+def columns_row(columns: dict[str, list[Any]], i: int) -> dict[str, Any]:
+    return {name: values[i] for name, values in columns.items()}
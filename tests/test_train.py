@@ -0,0 +1,44 @@
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+
+from circadia.ml.train import ModelTrainer
+from circadia.storage import DuckDBStorage
+
+TARGETS = ["sleep_score", "recovery_score", "health_score"]
+
+
+def test_train_many_fits_one_independent_model_per_target(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    daily_history(40)
+    trainer = ModelTrainer(storage)
+
+    results = trainer.train_many(TARGETS, model_type="ridge", cv=3, max_workers=2)
+
+    assert list(results) == TARGETS
+    models = [results[target]["model"] for target in TARGETS]
+    steps = [model.model.named_steps for model in models]
+    assert len({id(model) for model in models}) == len(TARGETS)
+    assert len({id(step["regressor"]) for step in steps}) == len(TARGETS)
+    assert len({id(step["scaler"]) for step in steps}) == len(TARGETS)
+    X = trainer.load_training_set(TARGETS[0]).X
+    for target, model in zip(TARGETS, models, strict=True):
+        alone = trainer.train(target, model_type="ridge")["model"]
+        np.testing.assert_allclose(model.predict(X), alone.predict(X), rtol=1e-5)
+        assert len(results[target]["cv_results"]["scores"]) == 3
+
+
+def test_train_many_scalers_are_not_shared(
+    storage: DuckDBStorage, daily_history: Callable[..., pd.DatetimeIndex]
+) -> None:
+    daily_history(40)
+    trainer = ModelTrainer(storage)
+    results = trainer.train_many(TARGETS[:2], model_type="ridge", cv=3)
+    X = trainer.load_training_set(TARGETS[0]).X
+    before = results[TARGETS[1]]["model"].predict(X)
+
+    results[TARGETS[0]]["model"].model.named_steps["scaler"].partial_fit(X * 10)
+
+    np.testing.assert_array_equal(results[TARGETS[1]]["model"].predict(X), before)
@@ -0,0 +1,97 @@
+import itertools
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import pytest
+
+from circadia.ml import tuning
+from circadia.ml.tuning import HyperparameterSearch, expand_grid
+from circadia.storage import DuckDBStorage
+
+RIDGE_GRID = {"ridge": {"alpha": [0.1, 10.0]}}
+
+
+def _data(rows: int = 60) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(rows, 3))
+    return X, X @ [1.0, -2.0, 0.5] + rng.normal(scale=0.1, size=rows)
+
+
+@pytest.fixture
+def created_blocks(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Names of the shared memory blocks the search creates."""
+    names: list[str] = []
+
+    class Recording(shared_memory.SharedMemory):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                names.append(self.name)
+
+    monkeypatch.setattr(tuning.shared_memory, "SharedMemory", Recording)
+    return names
+
+
+def _assert_unlinked(names: list[str]) -> None:
+    assert len(names) == 2
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_expand_grid() -> None:
+    grid = expand_grid({"max_depth": [3, 5], "learning_rate": [0.05, 0.1, 0.2]})
+
+    assert len(grid) == 6
+    assert grid[0] == {"learning_rate": 0.05, "max_depth": 3}
+    assert {tuple(sorted(p.items())) for p in grid} == {
+        (("learning_rate", lr), ("max_depth", depth)) for lr in (0.05, 0.1, 0.2) for depth in (3, 5)
+    }
+    assert expand_grid({}) == [{}]
+
+
+def test_folds_train_on_a_prefix_and_score_what_follows() -> None:
+    folds = HyperparameterSearch(n_splits=4)._folds(50)
+
+    assert len(folds) == 4
+    assert folds[-1][1] == 50
+    for (train_stop, test_stop), (next_train_stop, _) in itertools.pairwise(folds):
+        assert train_stop < test_stop == next_train_stop
+
+
+def test_search_ranks_candidates_and_frees_shared_memory(created_blocks: list[str]) -> None:
+    X, y = _data()
+
+    summary = HyperparameterSearch(n_splits=3, max_workers=2).search(
+        X, y, model_types=["ridge"], grids=RIDGE_GRID
+    )
+
+    assert list(summary["params"]) == ['{"alpha": 0.1}', '{"alpha": 10.0}']
+    assert summary["mean_r2"].is_monotonic_decreasing
+    assert HyperparameterSearch.best(summary) == ("ridge", {"alpha": 0.1})
+    _assert_unlinked(created_blocks)
+
+
+def test_failed_fit_still_frees_shared_memory(created_blocks: list[str]) -> None:
+    X, y = _data()
+
+    with pytest.raises(ValueError):
+        HyperparameterSearch(n_splits=2, max_workers=1).search(
+            X, y, model_types=["ridge"], grids={"ridge": {"no_such_param": [1]}}
+        )
+
+    _assert_unlinked(created_blocks)
+
+
+def test_stored_fold_scores_are_reused(storage: DuckDBStorage, created_blocks: list[str]) -> None:
+    X, y = _data()
+    search = HyperparameterSearch(storage, n_splits=3, max_workers=1)
+    first = search.search(X, y, model_types=["ridge"], grids=RIDGE_GRID)
+
+    again = search.search(X, y, model_types=["ridge"], grids=RIDGE_GRID)
+
+    # Only the first search ran any fits.
+    assert len(created_blocks) == 2
+    assert storage.execute("SELECT count(*) FROM tuning_results").fetchone()[0] == 6
+    np.testing.assert_allclose(again["mean_r2"], first["mean_r2"])